@@ -14,11 +14,14 @@ expose familiar commands similar to the existing Kaggle helpers:
 * **grade-sample** – local scoring of a single competition via
   `mlebench grade-sample`
 
+* **run** – run the MLE agent across a set of competitions in parallel
+
 Place this single file under `<repo‑root>/exp/` to keep the core project
 untouched while enabling fast experimentation.
 """
 from __future__ import annotations
 
+import importlib.util
 import json
 import sys
 from pathlib import Path
@@ -29,19 +32,19 @@ from exp.init import init as init_api, is_init
 import click
 
 
-try:
-    import mlebench
-except ImportError:
-    click.echo("mlebench package not found. Please install it first.", err=True)
-    sys.exit(1)
+# only check that mlebench is installed here, the registry is loaded when a bench command runs,
+# so the `mle` CLI does not pay for it on every invocation
+if importlib.util.find_spec("mlebench") is None:
+    raise ImportError("mlebench package not found. Please install it first.")
 
 
-from mlebench.registry import registry
-from exp.mlebench_api import (
-    grade as grade_api,
-    grade_sample as grade_sample_api,
-    prepare as prepare_api
-)
+def default_data_dir() -> str:
+    """
+    The default data directory of the MLE-bench registry (loads the registry).
+    """
+    from mlebench.registry import registry
+
+    return str(registry.get_data_dir())
 
 
 def require_init(f):
@@ -64,7 +67,7 @@ def bench(ctx: click.Context):
     """
     MLE-Exp: The Experimental CLI tool for MLE-agent.
     """
-    ctx.obj = {"registry": registry}
+    ctx.obj = {}
 
 
 @bench.command(
@@ -92,8 +95,7 @@ def init(force: bool):
     "--competition-id",
     metavar="ID",
     type=str,
-    help=f"ID of the competition to prepare. "
-    f"Valid options: {registry.list_competition_ids()}",
+    help="ID of the competition to prepare (see the MLE-bench registry for the valid options).",
 )
 @click.option(
     "-a",
@@ -122,8 +124,8 @@ def init(force: bool):
 @click.option(
     "--data-dir",
     type=click.Path(file_okay=False),
-    default=registry.get_data_dir(),
-    show_default=True,
+    default=None,
+    show_default="the MLE-bench data directory",
     help="Directory where the data should live.",
 )
 @click.option(
@@ -133,6 +135,13 @@ def init(force: bool):
     "--overwrite-leaderboard", is_flag=True, help="[Dev] Overwrite leaderboard."
 )
 @click.option("--skip-verification", is_flag=True, help="[Dev] Skip checksum checks.")
+@click.option(
+    "--concurrency",
+    type=int,
+    default=4,
+    show_default=True,
+    help="Number of competitions downloaded and prepared at the same time.",
+)
 @click.pass_context
 @require_init
 def prepare(
@@ -146,6 +155,7 @@ def prepare(
     overwrite_checksums: bool,
     overwrite_leaderboard: bool,
     skip_verification: bool,
+    concurrency: int,
 ) -> None:
     # Set PYTHONUTF8 for Windows to ensure UTF-8 encoding for file operations
     from pathlib import Path as _Path
@@ -162,7 +172,7 @@ def prepare(
         _restore_patch = lambda: setattr(_Path, "read_text", _orig_read_text)
 
     try:
-        ctx.obj["registry"].set_data_dir(Path(data_dir))
+        from exp.mlebench_api import prepare as prepare_api
 
         prepare_api(
             competition_id=competition_id,
@@ -173,6 +183,8 @@ def prepare(
             overwrite_checksums=overwrite_checksums,
             overwrite_leaderboard=overwrite_leaderboard,
             skip_verification=skip_verification,
+            concurrency=concurrency,
+            data_dir=data_dir,
         )
     except Exception as e:
         # Use traceback to provide more context on the error
@@ -203,9 +215,16 @@ def prepare(
 @click.option(
     "--data-dir",
     type=click.Path(file_okay=False),
-    default=registry.get_data_dir(),
-    show_default=True,
+    default=None,
+    show_default="the MLE-bench data directory",
+)
+@click.option(
+    "--workers",
+    type=int,
+    default=None,
+    help="Number of grading processes (defaults to the number of CPUs).",
 )
+@click.option("--no-cache", is_flag=True, help="Re-grade all the submissions, ignoring the grade cache.")
 @click.pass_context
 @require_init
 def grade(
@@ -213,6 +232,8 @@ def grade(
     submission: str,
     output_dir: str,
     data_dir: str,
+    workers: int | None,
+    no_cache: bool,
 ) -> None:
     # Check if the submission file follows the expected JSONL format
     # with 'submission_path' and 'competition_id'
@@ -246,8 +267,9 @@ def grade(
                 sys.exit(1)
 
     try:
-        ctx.obj["registry"].set_data_dir(Path(data_dir))
-        grade_api(submission, output_dir)
+        from exp.mlebench_api import grade as grade_api
+
+        summary = grade_api(submission, output_dir, data_dir=data_dir, workers=workers, use_cache=not no_cache)
     except Exception as e:
         # Use traceback to provide more context on the error
         name = e.__traceback__.tb_frame.f_globals['__name__']
@@ -255,6 +277,25 @@ def grade(
         click.echo(f"Error during grading at [{name}:{lineno}]: {e}", err=True)
         sys.exit(1)
 
+    click.echo(f"{'competition':<50} {'medal':<8} {'score':>12}  graded")
+    for report in summary["competition_reports"]:
+        medal = next(
+            (name for name in ("gold", "silver", "bronze") if report.get(f"{name}_medal")),
+            "median+" if report.get("above_median") else "-",
+        )
+        score = report.get("score")
+        click.echo(
+            f"{report['competition_id']:<50} {medal:<8} "
+            f"{score if score is not None else 'invalid':>12}  {'cached' if report['cached'] else 'now'}"
+        )
+    click.echo(
+        f"\nMedals: {summary['total_medals']}/{summary['total_runs']} "
+        f"(gold {summary['total_gold_medals']}, silver {summary['total_silver_medals']}, "
+        f"bronze {summary['total_bronze_medals']}), above median: {summary['total_above_median']}\n"
+        f"Graded {summary['graded']} submissions ({summary['cached']} cached) in {summary['grading_seconds']}s\n"
+        f"Report: {summary['report_path']}"
+    )
+
 
 @bench.command(
     "grade-sample",
@@ -268,28 +309,135 @@ def grade(
 @click.option(
     "--data-dir",
     type=click.Path(file_okay=False),
-    default=registry.get_data_dir(),
-    show_default=True,
+    default=None,
+    show_default="the MLE-bench data directory",
 )
+@click.option("--no-cache", is_flag=True, help="Re-grade the submission, ignoring the grade cache.")
 @click.pass_context
 def grade_sample(
     ctx: click.Context,
     submission: str,
     competition_id: str,
     data_dir: str,
+    no_cache: bool,
 ) -> None:
     try:
-        ctx.obj["registry"].set_data_dir(Path(data_dir))
+        from exp.mlebench_api import grade_sample as grade_sample_api
 
         report = grade_sample_api(
-            submission, competition_id,
+            submission, competition_id, data_dir=data_dir, use_cache=not no_cache,
         )
         click.echo(
-            f"Competition report:\n {json.dumps(report.to_dict(), indent=4)}",
+            f"Competition report:\n {json.dumps(report, indent=4, default=str)}",
         )
     except Exception as e:
         # Use traceback to provide more context on the error
         name = e.__traceback__.tb_frame.f_globals['__name__']
         lineno = e.__traceback__.tb_lineno
         click.echo(f"Error during grading at [{name}:{lineno}]: {e}", err=True)
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
+
+
+@bench.command("run", help="Run the MLE agent across one or more competitions in parallel.")
+@click.option(
+    "-c",
+    "--competition-id",
+    "competition_ids",
+    metavar="ID",
+    type=str,
+    multiple=True,
+    help="ID of a competition to run, can be given multiple times.",
+)
+@click.option("-a", "--all", "run_all", is_flag=True, help="Run **all** competitions.")
+@click.option("--lite", is_flag=True, help="Run only the low-complexity (Lite) set of competitions.")
+@click.option(
+    "-l",
+    "--list",
+    "list_file",
+    type=click.Path(exists=True, dir_okay=False, readable=True),
+    help="Text file containing one competition ID per line.",
+)
+@click.option(
+    "--runs-dir",
+    type=click.Path(file_okay=False),
+    default="bench-runs",
+    show_default=True,
+    help="Directory of the run working directories, the checkpoint and the submissions.",
+)
+@click.option(
+    "--data-dir",
+    type=click.Path(file_okay=False),
+    default=None,
+    show_default="the MLE-bench data directory",
+    help="Directory where the prepared data lives.",
+)
+@click.option("--workers", type=int, default=2, show_default=True, help="Number of competitions run at the same time.")
+@click.option("--time-limit", type=float, default=None, help="Wall-clock limit of each run in seconds.")
+@click.option("--token-budget", type=int, default=None, help="Model token budget of each run.")
+@click.option("--run-timeout", type=float, default=None, help="Wall-clock timeout of each code execution in seconds.")
+@click.option("--model", default=None, help="The model to use.")
+@click.option("--debug-max-attempt", type=int, default=5, show_default=True, help="The max attempt for debugging.")
+@click.option(
+    "--candidates",
+    type=int,
+    default=1,
+    show_default=True,
+    help="Number of candidate solutions developed and evaluated in parallel in each run.",
+)
+@click.option("--retry-failed", is_flag=True, help="Re-run the finished competitions without a submission.")
+@click.pass_context
+@require_init
+def run(
+    ctx: click.Context,
+    competition_ids: tuple,
+    run_all: bool,
+    lite: bool,
+    list_file: str | None,
+    runs_dir: str,
+    data_dir: str,
+    workers: int,
+    time_limit: float | None,
+    token_budget: int | None,
+    run_timeout: float | None,
+    model: str | None,
+    debug_max_attempt: int,
+    candidates: int,
+    retry_failed: bool,
+) -> None:
+    from mle.utils.system import check_config, get_config
+    from exp.runner import run_sweep, SUBMISSIONS_FILE
+
+    if not check_config():
+        sys.exit(1)
+
+    try:
+        from exp.mlebench_api import resolve_competition_ids
+
+        ids = resolve_competition_ids(list(competition_ids) or None, run_all, lite, list_file)
+        records = run_sweep(
+            ids,
+            runs_dir,
+            data_dir or default_data_dir(),
+            get_config(),
+            workers=workers,
+            time_limit=time_limit,
+            token_budget=token_budget,
+            model=model,
+            debug_max_attempt=debug_max_attempt,
+            run_timeout=run_timeout,
+            candidates=candidates,
+            retry_failed=retry_failed,
+        )
+    except Exception as e:
+        # Use traceback to provide more context on the error
+        name = e.__traceback__.tb_frame.f_globals['__name__']
+        lineno = e.__traceback__.tb_lineno
+        click.echo(f"Error during the run at [{name}:{lineno}]: {e}", err=True)
+        sys.exit(1)
+
+    for competition_id in ids:
+        record = records.get(competition_id, {})
+        click.echo(f"{competition_id:<50} {record.get('status', 'skipped'):<16} {record.get('tokens') or '-'} tokens")
+    submission = Path(runs_dir) / SUBMISSIONS_FILE
+    click.echo(f"\nSubmissions: {submission}\n"
+               f"Grade them with: mle bench grade --submission {submission} --output-dir <OUTPUT_DIR>")
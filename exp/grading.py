@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Cached, parallel grading of MLE-bench submissions.
+
+A competition report is cached under the hash of the competition ID and the submission CSV content,
+so re-grading a sweep only grades the submissions which have changed, and those are graded in
+parallel across processes.
+"""
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from exp.utils import get_logger
+
+if TYPE_CHECKING:
+    from typing import Dict, List, Optional, Any
+
+logger = get_logger(__name__)
+GRADE_CACHE_DIR = Path(os.environ.get("MLE_BENCH_GRADE_CACHE", Path.home() / ".mle" / "bench" / "grades"))
+# bump when the cached report format changes, so the stale entries are never served
+GRADE_CACHE_VERSION = 1
+
+
+def submission_key(submission_path: "str | Path", competition_id: str) -> "Optional[str]":
+    """
+    The cache key of a submission: the hash of the competition ID and the CSV content.
+
+    Returns:
+        str: The key, or None if the submission file does not exist.
+    """
+    path = Path(submission_path)
+    if not path.is_file():
+        return None
+    digest = hashlib.sha256(f"{GRADE_CACHE_VERSION}:{competition_id}:".encode("utf-8"))
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class GradeCache:
+    """
+    The competition reports by submission key, one JSON file per report.
+    """
+
+    def __init__(self, cache_dir: "str | Path" = GRADE_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key: "Optional[str]") -> "Optional[Dict[str, Any]]":
+        if key is None:
+            return None
+        try:
+            return json.loads((self.cache_dir / f"{key}.json").read_text())
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key: "Optional[str]", entry: "Dict[str, Any]") -> None:
+        if key is None:
+            return
+        temp_path = self.cache_dir / f"{key}.{os.getpid()}.tmp"
+        temp_path.write_text(json.dumps(entry, default=str))
+        os.replace(temp_path, self.cache_dir / f"{key}.json")
+
+
+def _grade_one(submission_path: str, competition_id: str, data_dir: "Optional[str]") -> "Dict[str, Any]":
+    """
+    Grade a submission, in a worker process.
+    """
+    from mlebench.grade import grade_csv
+    from mlebench.registry import registry
+
+    if data_dir:
+        registry = registry.set_data_dir(Path(data_dir))
+    start = time.perf_counter()
+    report = grade_csv(Path(submission_path), registry.get_competition(competition_id))
+    return {"report": report.to_dict(), "grade_seconds": round(time.perf_counter() - start, 3)}
+
+
+def grade_submissions(
+    submissions: "List[Dict[str, str]]",
+    data_dir: "Optional[str | Path]" = None,
+    workers: "Optional[int]" = None,
+    cache_dir: "str | Path" = GRADE_CACHE_DIR,
+    use_cache: bool = True,
+) -> "List[Dict[str, Any]]":
+    """
+    Grade the submissions, reusing the cached reports of the unchanged ones.
+
+    Args:
+        submissions: the submissions, each with the `submission_path` and `competition_id` keys.
+        data_dir: the MLE-bench data directory, the registry default if not given.
+        workers: the number of grading processes, the number of CPUs if not given.
+        cache_dir: the directory of the grade cache.
+        use_cache: whether to reuse the cached reports (the new reports are cached anyway).
+
+    Returns:
+        list: The competition reports (as dicts) in the submission order, each with the `cached` flag
+         and the `grade_seconds` it took to grade.
+    """
+    cache = GradeCache(cache_dir)
+    results: "List[Optional[Dict[str, Any]]]" = [None] * len(submissions)
+    keys, pending = [], []
+    for i, submission in enumerate(submissions):
+        key = submission_key(submission["submission_path"], submission["competition_id"])
+        keys.append(key)
+        entry = cache.get(key) if use_cache else None
+        if entry is not None:
+            # the same content may have been graded under another path
+            entry["report"]["submission_path"] = str(submission["submission_path"])
+            results[i] = {**entry["report"], "cached": True, "grade_seconds": entry["grade_seconds"]}
+        else:
+            pending.append(i)
+
+    logger.info(f"Grading {len(pending)} submissions ({len(submissions) - len(pending)} cached).")
+    workers = min(workers or os.cpu_count() or 1, len(pending))
+    if workers == 1:
+        # not worth starting a process pool
+        for i in pending:
+            entry = _grade_one(
+                str(submissions[i]["submission_path"]),
+                submissions[i]["competition_id"],
+                str(data_dir) if data_dir else None,
+            )
+            cache.set(keys[i], entry)
+            results[i] = {**entry["report"], "cached": False, "grade_seconds": entry["grade_seconds"]}
+    elif pending:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(
+                    _grade_one,
+                    str(submissions[i]["submission_path"]),
+                    submissions[i]["competition_id"],
+                    str(data_dir) if data_dir else None,
+                ): i
+                for i in pending
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                entry = future.result()
+                cache.set(keys[i], entry)
+                results[i] = {**entry["report"], "cached": False, "grade_seconds": entry["grade_seconds"]}
+    return results
+
+
+def summarize_reports(reports: "List[Dict[str, Any]]", wall_seconds: float) -> "Dict[str, Any]":
+    """
+    Aggregate the competition reports into a leaderboard summary.
+
+    Args:
+        reports: the competition reports.
+        wall_seconds: the wall-clock time of the grading.
+
+    Returns:
+        dict: The summary with the medal counts, the timing and the ranked competition reports.
+    """
+    def count(field: str) -> int:
+        return sum(1 for report in reports if report.get(field))
+
+    total = len(reports)
+    # rank by the medal, then the valid submissions first
+    medal_rank = {"gold_medal": 0, "silver_medal": 1, "bronze_medal": 2, "above_median": 3}
+    ranked = sorted(
+        reports,
+        key=lambda report: (
+            next((rank for field, rank in medal_rank.items() if report.get(field)), len(medal_rank)),
+            not report.get("valid_submission"),
+            report.get("competition_id"),
+        ),
+    )
+    return {
+        "created_at": datetime.now().isoformat(),
+        "total_runs": total,
+        "total_runs_with_submissions": count("submission_exists"),
+        "total_valid_submissions": count("valid_submission"),
+        "total_medals": count("any_medal"),
+        "total_gold_medals": count("gold_medal"),
+        "total_silver_medals": count("silver_medal"),
+        "total_bronze_medals": count("bronze_medal"),
+        "total_above_median": count("above_median"),
+        "medal_rate": round(count("any_medal") / total, 4) if total else 0.0,
+        "graded": sum(1 for report in reports if not report.get("cached")),
+        "cached": count("cached"),
+        "grading_seconds": round(wall_seconds, 3),
+        "grading_cpu_seconds": round(sum(report.get("grade_seconds") or 0 for report in reports), 3),
+        "competition_reports": ranked,
+    }
+
+
+def grade_jsonl_cached(
+    submission: "str | Path",
+    output_dir: "str | Path",
+    data_dir: "Optional[str | Path]" = None,
+    workers: "Optional[int]" = None,
+    cache_dir: "str | Path" = GRADE_CACHE_DIR,
+    use_cache: bool = True,
+) -> "Dict[str, Any]":
+    """
+    Grade a JSONL submission file and write the leaderboard summary into the output directory.
+
+    Returns:
+        dict: The leaderboard summary, with the `report_path` it was written to.
+    """
+    start = time.perf_counter()
+    with open(submission, "r") as f:
+        submissions = [json.loads(line) for line in f if line.strip()]
+    reports = grade_submissions(submissions, data_dir, workers, cache_dir, use_cache)
+    summary = summarize_reports(reports, time.perf_counter() - start)
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    report_path = output_dir / f"{datetime.now():%Y-%m-%dT%H-%M-%S}_grading_report.json"
+    report_path.write_text(json.dumps(summary, indent=2, default=str))
+    summary["report_path"] = str(report_path)
+    return summary
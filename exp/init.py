@@ -12,13 +12,16 @@ copy it into the installed `mlebench` package’s folder inside site-packages.
 Run:  python grab_mle_experiments.py
 """
 
+import hashlib
+import importlib.metadata
 import importlib.util
+import json
 import shutil
 import subprocess
 import tempfile
+from datetime import datetime
 from pathlib import Path
 
-from git import Repo
 from typing import TYPE_CHECKING
 
 from exp.utils import get_logger
@@ -32,33 +35,105 @@ _LFS_SIGNATURE = "https://git-lfs.github.com/spec/v1"
 BRANCH = "main"
 EXP_DIR = "experiments"
 LFS_SEARCH_DIR = "mlebench/competitions"
+# the verified-state marker written by `init`, next to the experiments directory
+INIT_MARKER = ".mle_init.json"
+# the Git LFS pointer files are about 130 bytes, larger files are never pointers
+_LFS_POINTER_MAX_SIZE = 1024
 
 
-def is_init() -> bool:
+def _package_root() -> "Optional[Path]":
+    spec = importlib.util.find_spec("mlebench")
+    if spec is None or not spec.origin:
+        return None
+    return Path(spec.origin).parents[1]
+
+
+def _package_version() -> "Optional[str]":
+    try:
+        return importlib.metadata.version("mlebench")
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+
+def _read_marker(pkg_root: Path) -> "Optional[dict]":
+    try:
+        return json.loads((pkg_root / INIT_MARKER).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _scan(pkg_root: Path) -> "Optional[str]":
+    """
+    Scan the experiments and the competitions directories.
+
+    Returns:
+        str: The manifest hash (of the file paths and sizes), or None if the setup is incomplete
+         (the experiments directory is missing, or a Git LFS pointer has not been pulled).
+    """
+    mlebench_exp_dir = pkg_root / EXP_DIR
+    if not (mlebench_exp_dir.exists() and mlebench_exp_dir.is_dir()):
+        return None
+
+    manifest = hashlib.sha256()
+    for root in (mlebench_exp_dir, pkg_root / LFS_SEARCH_DIR):
+        for file_path in sorted(root.rglob("*")):
+            try:
+                if not file_path.is_file():
+                    continue
+                size = file_path.stat().st_size
+                manifest.update(f"{file_path.relative_to(pkg_root)}:{size}\n".encode("utf-8"))
+                if size > _LFS_POINTER_MAX_SIZE:
+                    continue
+                # Open and read the beginning of the small files, which may be LFS pointers
+                with file_path.open('r', encoding='utf-8', errors='ignore') as f:
+                    if _LFS_SIGNATURE in f.read(512):
+                        return None
+            except OSError:
+                continue  # Skip unreadable files
+    return manifest.hexdigest()
+
+
+def write_marker(pkg_root: Path, manifest: str) -> None:
+    """
+    Record the verified state of the setup, so the next checks do not rescan the package.
+    """
+    marker = {
+        "version": _package_version(),
+        "package_root": str(pkg_root),
+        "manifest": manifest,
+        "verified_at": datetime.now().isoformat(),
+    }
+    try:
+        (pkg_root / INIT_MARKER).write_text(json.dumps(marker, indent=2))
+    except OSError as e:
+        logger.warning(f"Unable to write the setup marker ({e}), the setup will be rescanned next time.")
+
+
+def is_init(full: bool = False) -> bool:
     """
     Check if the mlebench package is installed and has the expected structure.
+
+    The verified-state marker written by `init` is checked in O(1), the package is only rescanned
+    when `full` is set, when the marker is missing, or when the mlebench version has changed.
     """
     try:
-        spec = importlib.util.find_spec("mlebench")
-        if spec is None or not spec.origin:
+        pkg_root = _package_root()
+        if pkg_root is None:
             return False
 
-        pkg_root = Path(spec.origin).parents[1]
-        # Check if the experiments directory created by `init`
-        mlebench_exp_dir = pkg_root / EXP_DIR
-        if not (mlebench_exp_dir.exists() and mlebench_exp_dir.is_dir()):
+        marker = _read_marker(pkg_root)
+        if (
+            not full
+            and marker is not None
+            and marker.get("version") == _package_version()
+            and marker.get("package_root") == str(pkg_root)
+        ):
+            return True
+
+        manifest = _scan(pkg_root)
+        if manifest is None:
             return False
-        # Check if all git-lfs files are present
-        for file_path in (pkg_root / LFS_SEARCH_DIR).rglob("*"):
-            if file_path.is_file():
-                try:
-                    # Open and read the beginning of the file
-                    with file_path.open('r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read(512)  # Read first 512 bytes
-                        if _LFS_SIGNATURE in content:
-                            return False
-                except Exception:
-                    continue  # Skip unreadable files
+        write_marker(pkg_root, manifest)
         return True
     except ImportError:
         return False
@@ -98,7 +173,7 @@ def init(force=False) -> int:
         return 1
 
     # Check if experiments directory already exists and if it symlinks to the right place
-    if is_init():
+    if is_init(full=force):
         if force:
             logger.info("Upgrading existing experiments/ directory …")
         else:
@@ -111,11 +186,14 @@ def init(force=False) -> int:
     dest_exp_dir = pkg_root / EXP_DIR
     dest_lfs_dir = pkg_root / LFS_SEARCH_DIR
 
-    # Wipe any existing experiments/ copy
+    # Wipe any existing experiments/ copy, and the marker of the previous setup
+    (pkg_root / INIT_MARKER).unlink(missing_ok=True)
     if dest_exp_dir.exists():
         logger.info("Removing old experiments/ folder …")
         shutil.rmtree(dest_exp_dir)
 
+    from git import Repo
+
     # Clone repo sparsely into a temp dir
     with tempfile.TemporaryDirectory() as tmp:
         tmp = Path(tmp)
@@ -163,6 +241,10 @@ def init(force=False) -> int:
     # Quick sanity check: make sure at least one non-pointer file exists
     some_file = next(dest_exp_dir.rglob("*"), None)
     if some_file and some_file.stat().st_size > 150:  # LFS pointers are ~130 B
+        # verify the new setup once, and record it for the O(1) checks of the bench commands
+        if not is_init(full=True):
+            logger.warning("Some files are still Git-LFS pointers; check your git-lfs setup.")
+            return 1
         logger.info(f"Done! Sample file copied: {some_file.relative_to(dest_exp_dir.parent)}")
         return 0
     else:
@@ -5,20 +5,55 @@ Email: yuanmingleee@gmail.com
 Date: Jul 12, 2025
 """
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from os import PathLike
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, List
 
 from mlebench.data import download_and_prepare_dataset
-from mlebench.grade import grade_csv, grade_jsonl
-from mlebench.grade_helpers import CompetitionReport
 from mlebench.registry import registry
 
+from exp.grading import grade_jsonl_cached, grade_submissions
+from exp.utils import get_logger
+
 if TYPE_CHECKING:
     from typing import Union, Optional
 
     PathType = Union[str, PathLike]
 
+logger = get_logger(__name__)
+
+
+def resolve_competition_ids(
+    competition_id: "str | List[str] | None" = None,
+    prepare_all: bool = False,
+    lite: bool = False,
+    list_file: "Optional[PathType]" = None,
+) -> List[str]:
+    """
+    Resolve the competition IDs selected by the command line options.
+
+    Args:
+        competition_id: one or more competition IDs.
+        prepare_all: select all the competitions.
+        lite: select the low-complexity (Lite) set of competitions.
+        list_file: a text file containing one competition ID per line.
+
+    Returns:
+        List[str]: The competition IDs.
+    """
+    if lite:
+        return list(registry.get_lite_competition_ids())
+    if prepare_all:
+        return list(registry.list_competition_ids())
+    if list_file:
+        return [cid.strip() for cid in Path(list_file).read_text().splitlines() if cid.strip()]
+    if competition_id:
+        return [competition_id] if isinstance(competition_id, str) else list(competition_id)
+    raise ValueError(
+        "One of `lite`, `all`, `list`, or `competition_id` is required."
+    )
+
 
 def prepare(
     competition_id: str | None = None,
@@ -29,6 +64,8 @@ def prepare(
     overwrite_checksums: bool = False,
     overwrite_leaderboard: bool = False,
     skip_verification: bool = False,
+    concurrency: int = 4,
+    data_dir: "Optional[PathType]" = None,
 ) -> None:
     # Set PYTHONUTF8 for Windows to ensure UTF-8 encoding for file operations
     from pathlib import Path as _Path
@@ -46,27 +83,37 @@ def prepare(
 
     try:
         # resolve list of competitions to process
-        if lite:
-            comps = [registry.get_competition(cid) for cid in registry.get_lite_competition_ids()]
-        elif prepare_all:
-            comps = [registry.get_competition(cid) for cid in registry.list_competition_ids()]
-        elif list_file:
-            cids = Path(list_file).read_text().splitlines()
-            comps = [registry.get_competition(cid) for cid in cids]
-        elif competition_id:
-            comps = [registry.get_competition(competition_id)]
-        else:
-            raise ValueError(
-                "One of `lite`, `all`, `list`, or `competition_id` is required."
-            )
+        comp_registry = registry.set_data_dir(Path(data_dir)) if data_dir else registry
+        comps = [
+            comp_registry.get_competition(cid)
+            for cid in resolve_competition_ids(competition_id, prepare_all, lite, list_file)
+        ]
+
+        # downloading is network-bound, so prepare the competitions concurrently
+        failures = {}
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            futures = {
+                executor.submit(
+                    download_and_prepare_dataset,
+                    competition=comp,
+                    keep_raw=keep_raw,
+                    overwrite_checksums=overwrite_checksums,
+                    overwrite_leaderboard=overwrite_leaderboard,
+                    skip_verification=skip_verification,
+                ): comp.id
+                for comp in comps
+            }
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                    logger.info(f"Prepared {futures[future]}")
+                except Exception as e:
+                    logger.error(f"Failed to prepare {futures[future]}: {e}")
+                    failures[futures[future]] = str(e)
 
-        for comp in comps:
-            download_and_prepare_dataset(
-                competition=comp,
-                keep_raw=keep_raw,
-                overwrite_checksums=overwrite_checksums,
-                overwrite_leaderboard=overwrite_leaderboard,
-                skip_verification=skip_verification,
+        if failures:
+            raise RuntimeError(
+                f"{len(failures)} of {len(comps)} competitions failed to prepare: {', '.join(sorted(failures))}"
             )
     finally:
         if _restore_patch:
@@ -76,13 +123,25 @@ def prepare(
 def grade(
     submission: "Optional[PathType]",
     output_dir: "Optional[PathType]",
-) -> None:
-    grade_jsonl(Path(submission), Path(output_dir), registry)
+    data_dir: "Optional[PathType]" = None,
+    workers: "Optional[int]" = None,
+    use_cache: bool = True,
+) -> dict:
+    """
+    Grade a JSONL submission file, the unchanged submissions are served from the grade cache
+    and the others are graded in parallel.
+    """
+    return grade_jsonl_cached(submission, output_dir, data_dir, workers, use_cache=use_cache)
 
 
 def grade_sample(
     submission: "Optional[PathType]",
     competition_id: str,
-) -> CompetitionReport:
-    comp = registry.get_competition(competition_id)
-    return grade_csv(Path(submission), comp)
+    data_dir: "Optional[PathType]" = None,
+    use_cache: bool = True,
+) -> dict:
+    """
+    Grade a single CSV submission, served from the grade cache if it has not changed.
+    """
+    submissions = [{"submission_path": str(submission), "competition_id": competition_id}]
+    return grade_submissions(submissions, data_dir, workers=1, use_cache=use_cache)[0]
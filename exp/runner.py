@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Run the MLE agent (`auto_kaggle`) across a set of MLE-bench competitions.
+
+Each competition runs in its own working directory and its own process group, a bounded number of
+runs at a time, with a wall-clock limit (the whole process group is killed when it is exceeded) and
+a token budget (`MLE_TOKEN_BUDGET`, enforced by the model wrapper of the run process).
+
+Progress is appended to `runs.jsonl` in the runs directory, so an interrupted sweep resumes with the
+competitions which have not finished, and the submissions are collected into `submissions.jsonl`,
+the format expected by `mle bench grade`.
+"""
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from exp.utils import get_logger
+
+if TYPE_CHECKING:
+    from typing import Dict, List, Optional, Any
+
+logger = get_logger(__name__)
+RUNS_FILE = "runs.jsonl"
+SUBMISSIONS_FILE = "submissions.jsonl"
+SPEC_FILE = "run.json"
+RESULT_FILE = "result.json"
+LOG_FILE = "run.log"
+SUBMISSION_NAME = "submission.csv"
+
+
+class RunCheckpoint:
+    """
+    The append-only log of the run records, the latest record of each competition wins.
+    """
+
+    def __init__(self, runs_dir: Path):
+        self.runs_dir = runs_dir
+        self.path = runs_dir / RUNS_FILE
+        self._lock = threading.Lock()
+
+    def latest(self) -> "Dict[str, Dict[str, Any]]":
+        """
+        The latest record of each competition.
+        """
+        records = {}
+        if not self.path.exists():
+            return records
+        with self.path.open("r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # a partial line written when the sweep was killed
+                records[record["competition_id"]] = record
+        return records
+
+    def append(self, record: "Dict[str, Any]") -> None:
+        with self._lock:
+            with self.path.open("a") as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._write_submissions()
+
+    def _write_submissions(self) -> None:
+        """
+        Rewrite `submissions.jsonl` with the latest submission of each competition.
+        """
+        lines = []
+        for competition_id, record in sorted(self.latest().items()):
+            submission_path = record.get("submission_path")
+            if submission_path and Path(submission_path).exists():
+                lines.append(json.dumps({"competition_id": competition_id, "submission_path": submission_path}))
+        temp_path = self.runs_dir / f"{SUBMISSIONS_FILE}.tmp"
+        temp_path.write_text("".join(line + "\n" for line in lines))
+        os.replace(temp_path, self.runs_dir / SUBMISSIONS_FILE)
+
+
+def _prepare_run_dir(run_dir: Path, spec: "Dict[str, Any]", config: "Dict[str, Any]") -> None:
+    """
+    Create the isolated working directory of a run, with the MLE project config and the run spec.
+    """
+    from mle.utils.system import write_config
+
+    run_dir.mkdir(parents=True, exist_ok=True)
+    # every run starts from the project settings, without the workflow caches of the project
+    write_config({key: value for key, value in config.items() if key != "cache"}, str(run_dir))
+    (run_dir / SPEC_FILE).write_text(json.dumps(spec))
+    for stale in (RESULT_FILE, SUBMISSION_NAME):
+        if (run_dir / stale).exists():
+            (run_dir / stale).unlink()
+
+
+def _kill_group(process: subprocess.Popen) -> None:
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError, AttributeError):
+        process.kill()
+
+
+def run_competition(
+    competition_id: str,
+    run_dir: Path,
+    time_limit: "Optional[float]" = None,
+    token_budget: "Optional[int]" = None,
+    processes: "Optional[Dict[str, subprocess.Popen]]" = None,
+) -> "Dict[str, Any]":
+    """
+    Run the agent on one competition in a separate process, and wait for it within the time limit.
+
+    Args:
+        competition_id: the competition ID.
+        run_dir: the prepared working directory of the run.
+        time_limit: the wall-clock limit in seconds, None means no limit.
+        token_budget: the maximum number of model tokens, None means no limit.
+        processes: the running processes by competition, to kill them when the sweep is interrupted.
+
+    Returns:
+        dict: The run record.
+    """
+    env = dict(os.environ)
+    env.pop("MLE_TOKEN_BUDGET", None)
+    if token_budget:
+        env["MLE_TOKEN_BUDGET"] = str(token_budget)
+    # make sure the run process imports the same `exp` package, whatever the working directory
+    package_root = str(Path(__file__).resolve().parents[1])
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [package_root, env.get("PYTHONPATH")]))
+
+    started_at = time.time()
+    status, error = None, None
+    with (run_dir / LOG_FILE).open("w") as log:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "exp.runner", str(run_dir / SPEC_FILE)],
+            cwd=run_dir,
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,  # its own process group, so the training scripts are killed too
+        )
+        if processes is not None:
+            processes[competition_id] = process
+        try:
+            process.wait(timeout=time_limit)
+        except subprocess.TimeoutExpired:
+            _kill_group(process)
+            process.wait()
+            status, error = "timeout", f"Exceeded the wall-clock limit of {time_limit} seconds."
+        finally:
+            if processes is not None:
+                processes.pop(competition_id, None)
+
+    result = {}
+    if (run_dir / RESULT_FILE).exists():
+        result = json.loads((run_dir / RESULT_FILE).read_text())
+    submission = run_dir / SUBMISSION_NAME
+    if status is None:
+        status = result.get("status") or ("failed" if process.returncode else "no_submission")
+        error = result.get("error") or (f"Exited with code {process.returncode}." if process.returncode else None)
+        if status == "finished":
+            status = "succeeded" if submission.exists() else "no_submission"
+
+    return {
+        "competition_id": competition_id,
+        "status": status,
+        "error": error,
+        "submission_path": str(submission) if submission.exists() else None,
+        "run_dir": str(run_dir),
+        "tokens": result.get("tokens"),
+        "duration": round(time.time() - started_at, 2),
+        "finished_at": datetime.now().isoformat(),
+    }
+
+
+def run_sweep(
+    competition_ids: "List[str]",
+    runs_dir: "str | Path",
+    data_dir: "str | Path",
+    config: "Dict[str, Any]",
+    workers: int = 2,
+    time_limit: "Optional[float]" = None,
+    token_budget: "Optional[int]" = None,
+    model: "Optional[str]" = None,
+    debug_max_attempt: int = 5,
+    run_timeout: "Optional[float]" = None,
+    candidates: int = 1,
+    retry_failed: bool = False,
+) -> "Dict[str, Dict[str, Any]]":
+    """
+    Run the agent across the competitions, resuming from the checkpoint of the runs directory.
+
+    Args:
+        competition_ids: the competition IDs.
+        runs_dir: the directory of the run working directories, the checkpoint and the submissions.
+        data_dir: the MLE-bench data directory.
+        config: the MLE project config used by the runs.
+        workers: the number of runs at the same time.
+        time_limit: the wall-clock limit of each run in seconds, None means no limit.
+        token_budget: the model token budget of each run, None means no limit.
+        model: the model to use.
+        debug_max_attempt: the max attempt for debugging in each run.
+        run_timeout: the wall-clock timeout of each code execution in a run.
+        candidates: the number of candidate solutions developed and evaluated in parallel in each run.
+        retry_failed: also re-run the finished competitions without a successful submission.
+
+    Returns:
+        dict: The latest record of each competition.
+    """
+    runs_dir = Path(runs_dir).resolve()
+    runs_dir.mkdir(parents=True, exist_ok=True)
+    checkpoint = RunCheckpoint(runs_dir)
+
+    done = checkpoint.latest()
+    pending = []
+    for competition_id in dict.fromkeys(competition_ids):
+        record = done.get(competition_id)
+        # the "running" and "interrupted" records are the runs of an interrupted sweep
+        if record is None or record["status"] in ("running", "interrupted"):
+            pending.append(competition_id)
+        elif retry_failed and record["status"] != "succeeded":
+            pending.append(competition_id)
+    skipped = len(set(competition_ids)) - len(pending)
+    if skipped:
+        logger.info(f"Resuming the sweep: {skipped} competitions already finished, {len(pending)} to run.")
+
+    processes = {}
+    interrupted = threading.Event()
+
+    def _run(competition_id: str) -> "Dict[str, Any]":
+        run_dir = runs_dir / competition_id
+        spec = {
+            "competition_id": competition_id,
+            "data_dir": str(Path(data_dir).resolve()),
+            "model": model,
+            "debug_max_attempt": debug_max_attempt,
+            "run_timeout": run_timeout,
+            "candidates": candidates,
+        }
+        _prepare_run_dir(run_dir, spec, config)
+        checkpoint.append({
+            "competition_id": competition_id,
+            "status": "running",
+            "run_dir": str(run_dir),
+            "started_at": datetime.now().isoformat(),
+        })
+        logger.info(f"Running {competition_id} in {run_dir}")
+        try:
+            record = run_competition(competition_id, run_dir, time_limit, token_budget, processes)
+        except Exception as e:
+            record = {"competition_id": competition_id, "status": "failed", "error": str(e), "run_dir": str(run_dir)}
+        if interrupted.is_set():
+            record.update({"status": "interrupted", "error": "The sweep was interrupted."})
+        checkpoint.append(record)
+        logger.info(f"Finished {competition_id}: {record['status']}")
+        return record
+
+    # the runs are separate processes, the threads only wait for them
+    executor = ThreadPoolExecutor(max_workers=max(1, workers))
+    try:
+        futures = [executor.submit(_run, competition_id) for competition_id in pending]
+        for future in as_completed(futures):
+            future.result()
+    except KeyboardInterrupt:
+        logger.warning("Interrupted, stopping the running competitions (re-run the command to resume).")
+        interrupted.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in list(processes.values()):
+            _kill_group(process)
+        raise
+    finally:
+        executor.shutdown(wait=True)
+
+    return checkpoint.latest()
+
+
+def _run_from_spec(spec_path: str) -> int:
+    """
+    The entry of a run process: run `auto_kaggle` on the competition in the current directory,
+     and write the status and the token usage into the result file.
+    """
+    from mlebench.registry import registry
+
+    from mle.model import token_budget, TokenBudgetExceeded
+    from mle.workflow import auto_kaggle
+
+    spec = json.loads(Path(spec_path).read_text())
+    run_dir = Path(spec_path).parent
+    result = {"status": "finished", "error": None}
+    try:
+        competition = registry.set_data_dir(Path(spec["data_dir"])).get_competition(spec["competition_id"])
+        public_dir = Path(competition.public_dir)
+        description = public_dir / "description.md"
+        auto_kaggle(
+            str(run_dir),
+            [str(path) for path in sorted(public_dir.iterdir()) if path.name != "description.md"],
+            str(description) if description.exists() else competition.description,
+            submission=str(run_dir / SUBMISSION_NAME),
+            debug_max_attempt=spec["debug_max_attempt"],
+            sub_examples=str(competition.sample_submission),
+            competition_id=spec["competition_id"],
+            model=spec["model"],
+            run_timeout=spec["run_timeout"],
+            candidates=spec.get("candidates", 1),
+        )
+    except TokenBudgetExceeded as e:
+        result = {"status": "budget_exceeded", "error": str(e)}
+    except Exception as e:
+        result = {"status": "failed", "error": f"{type(e).__name__}: {e}"}
+    result["tokens"] = token_budget.used
+    (run_dir / RESULT_FILE).write_text(json.dumps(result))
+    return 0 if result["status"] == "finished" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(_run_from_spec(sys.argv[1]))
@@ -59,7 +59,8 @@ class AdviseAgent:
          the CSV files or not if the dataset is a public dataset.
         - And then you should always use the function `search_arxiv` or `search_papers_with_code` to search the
          state-of-the-art machine learning tasks/models/algorithms that can be used to solve the user's requirements,
-          and stay up-to-date with the latest.
+          and stay up-to-date with the latest. Use the function `multi_search` to search several sources at once.
+          Prefer the function `search_local_papers` (offline, instant) and search online only if it has no good matches.
         - If the user does not provide the details (task/model/algorithm/dataset/metric), you should always suggest.
         - You should provide the paper reference links of the task/model/algorithm/metric you suggest. You use the
          search results from the function `search_arxiv` or `search_papers_with_code` by generated search keywords.
@@ -101,9 +102,12 @@ class AdviseAgent:
             - Based on the requirements, give suggestions on how to maximize the performance of the task metrics.
             - Use the function `search_arxiv` or `search_papers_with_code` to search the state-of-the-art machine learning
                tasks/models/algorithms that can be used to solve the user's requirements, and stay up-to-date with the latest.
+            - Use the function `multi_search` to search several sources (e.g., papers and code) at once with the same query.
+            - Prefer the function `search_local_papers` (offline, instant), and search online only if it has no good matches.
             - You should help user to decide which framework/tools to use to implement the project, such as PyTorch, TensorFlow, etc.
             - You should apply some tricks to improve the performance of the model, detail the implementation steps of each trick.
             - You can use `schema_preview_csv_data` to preview the dataset if the dataset is a local CSV file.
+            - You can use `preview_dataset` to preview the dataset if it is a local Parquet, Feather, JSON Lines or compressed file.
             - You can use `list_files` to preview the dataset (e.g., image/video/audio files) if the dataset is a local directory.
 
             """
@@ -124,9 +128,12 @@ class AdviseAgent:
             """
 
         self.functions = [
+            schema_search_local_papers,
             schema_search_arxiv,
             schema_search_papers_with_code,
+            schema_multi_search,
             schema_preview_csv_data,
+            schema_preview_dataset,
             schema_list_files
         ]
         if config_data.get('search_key'):
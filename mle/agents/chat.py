@@ -1,23 +1,33 @@
 from rich.console import Console
 
 from mle.function import *
-from mle.utils import get_config, WorkflowCache
+from mle.utils import get_config, WorkflowCache, ContextWindowManager
 from mle.utils.component_memory import trace_component
 
+# the functions which run commands or write files, not available to a read-only agent
+SIDE_EFFECT_FUNCTIONS = (
+    'create_file', 'write_file', 'create_directory', 'execute_command', 'start_job', 'job_status',
+    'tail_job_log', 'wait_job', 'kill_job', 'unzip_data'
+)
+
+
 class ChatAgent:
 
-    def __init__(self, model, memory=None, working_dir='.', console=None):
+    def __init__(self, model, memory=None, working_dir='.', console=None, read_only=False):
         """
         ChatAgent assists users with planning and debugging ML projects.
 
         Args:
             model: The machine learning model used for generating responses.
+            read_only: whether the agent can only read the project (e.g., when serving remote clients), without
+             the functions to run commands and write files.
         """
         config_data = get_config()
 
         self.model = model
         self.memory = memory
         self.chat_history = []
+        self.context = ContextWindowManager(model, budget=config_data.get('context_budget'), summarize=True)
         if working_dir == '.':
             working_dir = os.getcwd()
         self.working_dir = working_dir
@@ -36,7 +46,8 @@ class ChatAgent:
         1. Creating project structures based on the user requirement using function `create_directory`.
         2. Writing clean, efficient, and well-documented code using function `create_file` and `write_file`.
         3. Exam the project to re-use the existing code snippets as much as possible, you may need to use
-         functions like `list_files`, `read_file` and `write_file`.
+         functions like `list_files`, `read_file` and `write_file`, use functions `grep_file`, `read_file_lines`
+         and `tail_file` for large files.
         4. Writing the code into the file when creating new files, do not create empty files.
         5. Use function `preview_csv_data` to preview the CSV data if the task include CSV data processing.
         6. Decide whether the task requires execution and debugging before moving to the next or not.
@@ -49,15 +60,27 @@ class ChatAgent:
 
         self.functions = [
             schema_read_file,
+            schema_read_file_lines,
+            schema_tail_file,
+            schema_read_file_bytes,
+            schema_grep_file,
             schema_create_file,
             schema_write_file,
             schema_list_files,
             schema_create_directory,
+            schema_search_local_papers,
             schema_search_arxiv,
             schema_search_papers_with_code,
+            schema_multi_search,
             schema_web_search,
             schema_execute_command,
+            schema_start_job,
+            schema_job_status,
+            schema_tail_job_log,
+            schema_wait_job,
             schema_preview_csv_data,
+            schema_preview_dataset,
+            schema_dataset_schema,
             schema_unzip_data,
             schema_preview_zip_structure
         ]
@@ -66,6 +89,13 @@ class ChatAgent:
             self.functions.append(schema_web_search)
             self.sys_prompt += self.search_prompt
 
+        if read_only:
+            self.functions = [schema for schema in self.functions if schema['name'] not in SIDE_EFFECT_FUNCTIONS]
+            self.sys_prompt += """
+        You can only read the project, you can not write files or run commands. Suggest the code and the commands
+         to the user instead.
+        """
+
         if not self.cache.is_empty():
             dataset = self.cache.resume_variable("dataset")
             ml_requirement = self.cache.resume_variable("ml_requirement")
@@ -99,6 +129,7 @@ class ChatAgent:
         Make sure your greeting is inviting and sets a positive tone for collaboration.
         """
         self.chat_history.append({"role": "user", "content": greet_prompt})
+        self.chat_history = self.context.fit(self.chat_history)
         greets = self.model.query(
             self.chat_history,
             function_call='auto',
@@ -129,6 +160,7 @@ class ChatAgent:
                     snippet, metadata = t.get('text'), t.get('metadata')
                     user_prompt += f"**File**: {metadata.get('file')}\n**Snippet**: {snippet}\n"
         self.chat_history.append({"role": "user", "content": user_prompt})
+        self.chat_history = self.context.fit(self.chat_history)
 
         for content in self.model.stream(
                 self.chat_history,
@@ -3,7 +3,7 @@ import json
 from rich.console import Console
 
 from mle.function import *
-from mle.utils import get_config, print_in_box, clean_json_string
+from mle.utils import get_config, print_in_box, clean_json_string, ContextWindowManager
 from mle.utils.component_memory import trace_component
 
 def process_summary(summary_dict: dict):
@@ -39,6 +39,7 @@ class CodeAgent:
         self.code_summary = None
         self.model = model
         self.chat_history = []
+        self.context = ContextWindowManager(model, budget=config_data.get('context_budget'))
         self.working_dir = working_dir
 
         self.console = console
@@ -55,10 +56,12 @@ class CodeAgent:
         - Writing clean, efficient, and well-documented code using function `create_file` and `write_file`.
         - Exam the project to re-use the existing code snippets as much as possible, you may need to use
          functions like `list_files`, `read_file` and `write_file`.
+        - Use functions `grep_file` and `read_file_lines` to locate and read a region of a large file.
         - Use function `preview_zip_structure` to preview the structure of the file if the task include zip file processing.
         - Use function `unzip_data` to extract the compressed file if the task include compressed file processing.
         - Writing the code into the file when creating new files, do not create empty files.
         - Use function `preview_csv_data` to preview the CSV data if the task include CSV data processing.
+        - Use function `preview_dataset` or `dataset_schema` for Parquet, Feather, JSON Lines or compressed data files.
         - Decide whether the task requires execution and debugging before moving to the next or not.
         - Generate the commands to run and test the current task, and the dependencies list for this task.
         - You only write Python scripts, don't write Jupiter notebooks which require interactive execution.
@@ -74,6 +77,7 @@ class CodeAgent:
             - You should create a single script first, with the complete code inside. You can have multiple functions and classes.
             - Writing clean, efficient, and well-documented code to a script using functions `create_file`.
             - Use function `preview_csv_data` to preview the CSV data if the task include CSV dataset or examples.
+            - Use function `preview_dataset` or `dataset_schema` for Parquet, Feather, JSON Lines or compressed data files.
             - Use function `preview_zip_structure` to preview the structure of the file if the task include zip file processing.
             - Use function `unzip_data` to extract the compressed file if the task include compressed file processing.
             - Generate the commands to run and test the current script, and the dependencies list required for this script.
@@ -133,11 +137,15 @@ class CodeAgent:
 
         self.functions = [
             schema_read_file,
+            schema_read_file_lines,
+            schema_grep_file,
             schema_create_file,
             schema_write_file,
             schema_list_files,
             schema_create_directory,
             schema_preview_csv_data,
+            schema_preview_dataset,
+            schema_dataset_schema,
             schema_preview_zip_structure,
             schema_unzip_data
         ]
@@ -172,6 +180,7 @@ class CodeAgent:
 
         with self.console.status(f"Coder is working on the task: {task_dict.get('task')}..."):
             self.chat_history.append({"role": "user", "content": task_prompt})
+            self.chat_history = self.context.fit(self.chat_history)
             text = self.model.query(
                 self.chat_history,
                 function_call='auto',
@@ -201,6 +210,7 @@ class CodeAgent:
 
         with self.console.status(f"Coder is improving the code for task {task_dict.get('task')}..."):
             self.chat_history.append({"role": "user", "content": improve_prompt})
+            self.chat_history = self.context.fit(self.chat_history)
             text = self.model.query(
                 self.chat_history,
                 function_call='auto',
@@ -220,6 +230,14 @@ class CodeAgent:
             task_dict: the task dictionary.
         """
         self.code_summary = self.code(task_dict)
+        return self.review(task_dict)
+
+    def review(self, task_dict: dict):
+        """
+        Show the code summary of the coded task to the user, and improve the code with the user's feedback.
+        Args:
+            task_dict: the task dictionary.
+        """
         print_in_box(process_summary(self.code_summary), self.console, title="MLE Developer", color="cyan")
         while True:
             suggestion = questionary.text(
@@ -234,6 +252,7 @@ class CodeAgent:
 
             with self.console.status(f"MLE Developer is working on the task: {task_dict.get('task')}..."):
                 self.chat_history.append({"role": "user", "content": suggestion})
+                self.chat_history = self.context.fit(self.chat_history)
                 text = self.model.query(
                     self.chat_history,
                     function_call='auto',
@@ -1,7 +1,7 @@
 import json
 
 from mle.function import *
-from mle.utils import get_config, print_in_box
+from mle.utils import get_config, print_in_box, ContextWindowManager, dependency_manager
 
 from rich.console import Console
 from mle.utils.component_memory import trace_component
@@ -43,17 +43,23 @@ class DebugAgent:
             self.console = Console()
         self.model = model
         self.chat_history = []
+        self.context = ContextWindowManager(model, budget=config_data.get('context_budget'))
         self.sys_prompt = """
         You are a program error debugger working on a Python project.
 
         Your can leverage your capabilities by using the specific functions listed below:
 
-        - Install the code dependencies using function `execute_command` based on the Developer's dependencies list.
+        - The Developer's dependencies are installed before you start, install a dependency using function
+         `execute_command` only if they failed to install, or if the code fails because a dependency is missing.
         - Execute the code using function `execute_command` to test the code based on the Developer's instructions.
+        - If the code takes a long time to run (e.g., model training), start it with function `start_job`, and check
+         the progress with functions `job_status`, `tail_job_log` and `wait_job` instead of blocking on it.
         - If the program returns errors, you need to debug the code based on the logs, you may need to first read the
          structure of the project using function `list_files`.
         - Then you may need to call `read_file` function to read the content of the code files, locate the error line
          and the reasons.
+        - For large files or logs, use function `grep_file` to search the errors, `read_file_lines` to read the lines
+         around them, and `tail_file` to read the end of a log, instead of reading the whole file.
         - You don't need to care about the best practices and code styles, you only care about the errors in the code.
 
         """
@@ -89,8 +95,17 @@ class DebugAgent:
 
         self.functions = [
             schema_read_file,
+            schema_read_file_lines,
+            schema_tail_file,
+            schema_read_file_bytes,
+            schema_grep_file,
             schema_list_files,
-            schema_execute_command
+            schema_execute_command,
+            schema_start_job,
+            schema_job_status,
+            schema_tail_job_log,
+            schema_wait_job,
+            schema_kill_job
         ]
 
         if analyze_only:
@@ -128,6 +143,7 @@ class DebugAgent:
         """
 
         self.chat_history.append({"role": "user", "content": analyze_prompt})
+        self.chat_history = self.context.fit(self.chat_history)
         try:
             text = self.model.query(
                 self.chat_history,
@@ -153,23 +169,34 @@ class DebugAgent:
         debug_prompt = f"""
         Please help me debug the current task: {code_report.get('task')}. {code_report.get('messages')}\n
         The task description: {code_report.get('task_description')}
-        The dependencies required for this task: {code_report.get('dependencies')}
+        The dependencies required for this task: {code_report.get('dependency')}
         The command to execute the code: {code_report.get('command')}
         
         """
 
+        # install the dependencies (or reuse the cached environment) without the model
+        env = dependency_manager.prepare(code_report.get('dependency'))
+        if env["error"]:
+            debug_prompt += f"The dependencies failed to install: {env['error']}\n"
+        else:
+            debug_prompt += "The dependencies are installed, do not install them again.\n"
+        # the commands of the model run in the environment, so `python` is the interpreter it was prepared for
+        debug_prompt += "Install a missing dependency with `python -m pip install`.\n"
+
         error_msg = code_report.get('error_message')
         if error_msg:
             debug_prompt += f"Error message: {error_msg}\n"
 
         self.chat_history.append({"role": "user", "content": debug_prompt})
+        self.chat_history = self.context.fit(self.chat_history)
         try:
-            text = self.model.query(
-                self.chat_history,
-                function_call='auto',
-                functions=self.functions,
-                response_format={"type": "json_object"}
-            )
+            with command_environment(dependency_manager.variables(env)):
+                text = self.model.query(
+                    self.chat_history,
+                    function_call='auto',
+                    functions=self.functions,
+                    response_format={"type": "json_object"}
+                )
         except Exception as e:
             print(f"Error occurred while querying the model: {e}")
             return {}
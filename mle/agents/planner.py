@@ -10,7 +10,10 @@ from mle.utils.component_memory import trace_component
 def process_plan(plan_dict: dict):
     plan_str = ""
     for task in plan_dict.get('tasks'):
-        plan_str += f"[green][Task]:[/green] {task.get('task')}\n[green][Description]:[/green] {task.get('description')}\n\n"
+        plan_str += f"[green][Task]:[/green] {task.get('task')}\n[green][Description]:[/green] {task.get('description')}\n"
+        if task.get('dependencies'):
+            plan_str += f"[green][Depends on]:[/green] {', '.join(task.get('dependencies'))}\n"
+        plan_str += "\n"
 
     return plan_str
 
@@ -54,6 +57,9 @@ class PlanAgent:
         4. Please only provide the coding tasks, do not provide the code snippets, the developer will complete the task.
         5. Do not generate task like "setup environment", "install dependencies", "run the code", etc. The developer
          only focus on the coding tasks.
+        6. For each task, list the names of the earlier tasks it depends on in "dependencies" (a task depends on
+         another if it uses the files or the outputs of it), and the files it creates or modifies in "files". The
+         independent tasks will be developed at the same time, so keep the tasks independent where possible.
     
         """
         self.json_mode_prompt = """
@@ -65,17 +71,23 @@ class PlanAgent:
                     {
                         "task": "download dataset",
                         "description": "Create a directory named 'dataset' under the project root, and write a Python
-                          script called 'data_loader.py' to download the dataset ImageNet from the official website."
+                          script called 'data_loader.py' to download the dataset ImageNet from the official website.",
+                        "dependencies": [],
+                        "files": ["dataset/data_loader.py"]
                     },
                     {
                         "task": "process ImageNet",
                         "description": "Write a Python script called `process_data.py` to process the dataset by
-                         resizing the images to 224x224 pixels and save the data to the 'processed_data' directory."
+                         resizing the images to 224x224 pixels and save the data to the 'processed_data' directory.",
+                        "dependencies": ["download dataset"],
+                        "files": ["process_data.py"]
                     },
                     {
                         "task": "train model",
                         "description": "Write a Python script called `train_model.py` to train an image classification
-                          model on the processed data and save the trained model to the 'model' directory."
+                          model on the processed data and save the trained model to the 'model' directory.",
+                        "dependencies": ["process ImageNet"],
+                        "files": ["train_model.py"]
                     }
               ]
         }
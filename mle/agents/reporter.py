@@ -1,6 +1,6 @@
 import json
 from rich.console import Console
-from time import gmtime, strftime
+from mle.utils.reports import ReportStore
 from mle.utils.component_memory import trace_component
 
 class ReportAgent:
@@ -160,10 +160,38 @@ class ReportAgent:
                 response_format={"type": "json_object"}
             )
 
-            self.chat_history.append({"role": "assistant", "content": text})
-            # save the dict into a local files
-            today = strftime("%Y_%m_%d", gmtime())
-            result_dict = json.loads(text)
-            with open(f'progress_report_{today}.json', 'w') as f:
-                json.dump(result_dict, f)
-            return result_dict
\ No newline at end of file
+            return self._save_report(text)
+
+    def _save_report(self, text: str):
+        """
+        Parse the generated report and save it into the report store (`.mle/reports/`).
+        Args:
+            text: the generated report in JSON.
+        """
+        self.chat_history.append({"role": "assistant", "content": text})
+        result_dict = json.loads(text)
+        ReportStore().save(result_dict)
+        self.report = result_dict
+        return result_dict
+
+    def stream_report(self, github_summary: dict, calendar_events: list = None, okr: str = None):
+        """
+        Stream the report tokens as they are generated, the parsed report is saved into a local file
+         and kept in `self.report` once the stream ends.
+        Args:
+            github_summary: the summary of the GitHub project.
+            calendar_events: the Google Calendar
+            okr: the OKR of the project.
+        """
+        self.chat_history.append(
+            {
+                "role": "user",
+                "content": self.process_knowledge(github_summary, calendar_events, okr)
+            }
+        )
+        text = ''
+        for content in self.model.stream(self.chat_history, response_format={"type": "json_object"}):
+            if content:
+                text += content
+                yield content
+        self._save_report(text)
\ No newline at end of file
@@ -70,16 +70,21 @@ class GitHubSummaryAgent:
         self.sys_prompt += self.json_mode_prompt
         self.chat_history.append({"role": 'system', "content": self.sys_prompt})
 
-    def process_knowledge(self):
+    def process_knowledge(self, on_progress=None):
         """
         Process the knowledge from the GitHub repo.
-        Args: None
+        Args:
+            on_progress: an optional callback, called with the name of each fetching phase.
         """
+        on_progress = on_progress or (lambda phase: None)
         info_str = f"""
         GITHUB REPO: {self.github_repo}
         """
+        on_progress("fetching the README")
         readme_content = self.github.get_readme()
+        on_progress("fetching the issues")
         issues = self.github.get_issues(open_only=True)
+        on_progress("fetching the project structure")
         repo_files = self.github.get_structure(include_invisible=False)
 
         info_str += f"""
@@ -111,13 +116,16 @@ class GitHubSummaryAgent:
 
         return info_str
 
-    def summarize(self):
+    def summarize(self, on_progress=None):
         """
         Handle the query from the model query response.
-        Args: None
+        Args:
+            on_progress: an optional callback, called with the name of each phase.
         """
+        on_progress = on_progress or (lambda phase: None)
         with self.console.status("MLE summarizer is summarizing the project..."):
-            self.chat_history.append({"role": "user", "content": self.process_knowledge()})
+            self.chat_history.append({"role": "user", "content": self.process_knowledge(on_progress)})
+            on_progress("summarizing the project")
             text = self.model.query(
                 self.chat_history,
                 function_call='auto',
@@ -129,6 +137,7 @@ class GitHubSummaryAgent:
             summary = json.loads(text)
             summary.update({"github_repo": self.github_repo})
 
+            on_progress("fetching the user activity")
             user_activity = self.github.get_user_activity(self.username, detailed=False)
             summary.update({"user_activity": user_activity})
 
@@ -137,12 +137,14 @@ def report_local(ctx, path, email, start_date, end_date):
 @cli.command()
 @click.option('--model', default=None, help='The model to use for the chat.')
 @click.option('--auto', is_flag=True, help='Use auto mode to generate the coding plan.')
-@click.option('--description', default=None, help='The description of the competition.')
+@click.option('--description', default=None, help='The description of the competition, a local markdown file is also used as the overview in the interactive mode.')
 @click.option('--datasets', default=None, help='The .csv dataset home to use for the competition.')
 @click.option('--submission', default='./submission.csv', help='the path of the kaggle submission .csv file.')
 @click.option('--sub_example', default=None, help='the path to the kaggle submission example .csv file.')
 @click.option('--comp_id', default=None, help='the kaggle competition id.')
 @click.option('--debug_max_attempt', default=5, help='the max attempt for debugging.')
+@click.option('--candidates', default=1, help='the number of candidate solutions developed and evaluated in parallel (auto mode).')
+@click.option('--candidate_memory', default=None, type=int, help='the memory limit (in MB) of each candidate run.')
 def kaggle(
         model,
         auto,
@@ -151,7 +153,9 @@ def kaggle(
         sub_example=None,
         submission='.',
         comp_id=None,
-        debug_max_attempt=5
+        debug_max_attempt=5,
+        candidates=1,
+        candidate_memory=None,
 ):
     """
     kaggle: kaggle competition workflow.
@@ -184,10 +188,13 @@ def kaggle(
             model=model,
             sub_examples=sub_example,
             competition_id=comp_id,
-            debug_max_attempt=debug_max_attempt
+            debug_max_attempt=debug_max_attempt,
+            candidates=candidates,
+            candidate_memory_mb=candidate_memory,
         )
 
-    return workflow.kaggle(os.getcwd(), model)
+    overview_path = description if description and os.path.isfile(description) else None
+    return workflow.kaggle(os.getcwd(), model, overview_path=overview_path)
 
 
 @cli.command()
@@ -236,12 +243,26 @@ def chat(model, build_mem):
 
 
 @cli.command()
-@click.option('--host', default='0.0.0.0', help='Host to bind the server to')
+@click.option('--host', default='127.0.0.1', help='Host to bind the server to (use 0.0.0.0 to serve other hosts)')
 @click.option('--port', default=8000, help='Port to bind the server to')
-def serve(host, port):
+@click.option('--workers', default=1, type=int, help='Number of server worker processes')
+@click.option('--graceful-timeout', default=30, type=int,
+              help='Seconds to wait for the in-flight requests and jobs on shutdown')
+@click.option('--cache-ttl', default=300, type=int,
+              help='Seconds to cache the GitHub API responses shared by the workers (0 to disable)')
+def serve(host, port, workers, graceful_timeout, cache_ttl):
     """Start the FastAPI server"""
-    click.echo(f"Starting server on {host}:{port}")
-    uvicorn.run(app, host=host, port=port, log_level="critical")
+    # the workers inherit the environment, so they share the same on-disk GitHub cache settings
+    os.environ.setdefault("MLE_GITHUB_CACHE_TTL", str(cache_ttl))
+    click.echo(f"Starting server on {host}:{port} with {workers} worker(s)")
+    uvicorn.run(
+        "mle.server:app" if workers > 1 else app,
+        host=host,
+        port=port,
+        workers=workers,
+        timeout_graceful_shutdown=graceful_timeout,
+        log_level="critical",
+    )
 
 
 @cli.command()
@@ -479,6 +500,33 @@ def memory(add, rm, update):
                 )
 
 
+@cli.command()
+@click.argument('dump', required=False)
+@click.option('--from-cache', is_flag=True, help='Add the papers in the cached search results of the project.')
+@click.option('--search', 'query', default=None, help='Search the local paper index.')
+@click.option('--limit', default=5, help='Maximum number of papers to show.')
+def papers(dump, from_cache, query, limit):
+    """
+    papers: build and search the local (offline) paper index.
+    """
+    from mle.function.search import SEARCH_CACHE_DIR
+    from mle.utils.papers import PaperIndex, iter_arxiv_dump, iter_search_cache
+
+    index = PaperIndex()
+    if dump:
+        with console.status(f"Indexing the papers in {dump}..."):
+            num_papers = index.add(iter_arxiv_dump(dump))
+        console.log(f"Indexed {num_papers} papers from {dump}.")
+    if from_cache:
+        with console.status("Indexing the papers in the search cache..."):
+            num_papers = index.add(iter_search_cache(SEARCH_CACHE_DIR))
+        console.log(f"Indexed {num_papers} papers from {SEARCH_CACHE_DIR}.")
+    if query:
+        for paper in index.search(query, limit):
+            console.print(f"[bold]{paper['title']}[/bold] ({paper['link']})")
+    console.log(f"The local paper index ({index.uri}) has {index.count()} papers.")
+
+
 @cli.command()
 @click.option('--component', type=click.Choice([
     'advisor', 'planner', 'coder', 'debugger', 'reporter', 'chat',
@@ -2,6 +2,7 @@ from .data import *
 from .files import *
 from .search import *
 from .execution import *
+from .jobs import *
 from .interaction import *
 
 # File system related functions schemas
@@ -24,6 +25,109 @@ schema_read_file = {
     }
 }
 
+schema_read_file_lines = {
+    'name': 'read_file_lines',
+    'description': 'Read a range of lines of a file, the lines are prefixed with their line numbers. '
+                   'Use this function to check a specific region of a large file (e.g., a long source file or '
+                   'a dataset) without reading the whole file.',
+    'parameters': {
+        'type': 'object',
+        'properties': {
+            'file_path': {
+                'type': 'string',
+                'description': 'The path of the file to read'
+            },
+            'start_line': {
+                'type': 'integer',
+                'description': 'The first line to read (1-based, inclusive). Default is 1.'
+            },
+            'end_line': {
+                'type': 'integer',
+                'description': 'The last line to read (1-based, inclusive). Default is start_line + 99.'
+            }
+        },
+        'required': ['file_path']
+    }
+}
+
+schema_tail_file = {
+    'name': 'tail_file',
+    'description': 'Read the last lines of a file. Use this function to check the end of a large file, '
+                   'e.g., the latest output of a training log.',
+    'parameters': {
+        'type': 'object',
+        'properties': {
+            'file_path': {
+                'type': 'string',
+                'description': 'The path of the file to read'
+            },
+            'lines': {
+                'type': 'integer',
+                'description': 'The number of lines to read from the end of the file. Default is 50.'
+            }
+        },
+        'required': ['file_path']
+    }
+}
+
+schema_read_file_bytes = {
+    'name': 'read_file_bytes',
+    'description': 'Read a byte range of a file. Use this function to check a part of a large file '
+                   'that has very long lines or no line breaks.',
+    'parameters': {
+        'type': 'object',
+        'properties': {
+            'file_path': {
+                'type': 'string',
+                'description': 'The path of the file to read'
+            },
+            'offset': {
+                'type': 'integer',
+                'description': 'The byte offset to start reading from, negative values count from the end '
+                               'of the file. Default is 0.'
+            },
+            'length': {
+                'type': 'integer',
+                'description': 'The number of bytes to read. Default is 4096.'
+            }
+        },
+        'required': ['file_path']
+    }
+}
+
+schema_grep_file = {
+    'name': 'grep_file',
+    'description': 'Search a file for a regular expression and return the matched lines with their line '
+                   'numbers and surrounding lines. Use this function to locate errors, metrics or definitions '
+                   'in a large file.',
+    'parameters': {
+        'type': 'object',
+        'properties': {
+            'file_path': {
+                'type': 'string',
+                'description': 'The path of the file to search'
+            },
+            'pattern': {
+                'type': 'string',
+                'description': 'The regular expression to search for'
+            },
+            'context': {
+                'type': 'integer',
+                'description': 'The number of lines to show before and after each match. Default is 2.'
+            },
+            'max_matches': {
+                'type': 'integer',
+                'description': 'The maximum number of matches to return. Default is 20.'
+            },
+            'ignore_case': {
+                'type': 'boolean',
+                'description': 'Whether to ignore the case. Default is false.'
+            }
+        },
+        'required': ['file_path', 'pattern']
+    }
+}
+
 schema_create_file = {
     'name': 'create_file',
     'description': 'Create a file with the given path and content.'
@@ -171,6 +275,57 @@ schema_search_github_repos = {
     }
 }
 
+schema_search_local_papers = {
+    'name': 'search_local_papers',
+    'description': 'Search the local (offline) paper index for research papers, it returns in milliseconds '
+                   'and works without network access. Use this function first when there is a need to search '
+                   'for research papers, and search online only if it has no relevant results.',
+    'parameters': {
+        'type': 'object',
+        'properties': {
+            'query': {
+                'type': 'string',
+                'description': 'The search query to perform'
+            },
+            'limit': {
+                'type': 'integer',
+                'description': 'The maximum number of papers to return, default is 5'
+            }
+        },
+        'required': ['query']
+    }
+}
+
+schema_multi_search = {
+    'name': 'multi_search',
+    'description': 'Search several providers (the local paper index, arXiv, Papers With Code, GitHub and the web) '
+                   'concurrently with the '
+                   'same query, and return the merged results. Use this function when there is a need to search '
+                   'the literature, the code and the web at once.',
+    'parameters': {
+        'type': 'object',
+        'properties': {
+            'query': {
+                'type': 'string',
+                'description': 'The search query to perform'
+            },
+            'providers': {
+                'type': 'array',
+                'items': {
+                    'type': 'string',
+                    'enum': ['local', 'arxiv', 'papers_with_code', 'github', 'web']
+                },
+                'description': 'The providers to search, default is all the available providers'
+            },
+            'limit': {
+                'type': 'integer',
+                'description': 'The maximum number of results from each provider, default is 5'
+            }
+        },
+        'required': ['query']
+    }
+}
+
 # Code execution related function schema
 schema_execute_command = {
     'name': 'execute_command',
@@ -186,11 +341,116 @@ schema_execute_command = {
             'max_lines': {
                 'type': 'integer',
                 'description': 'The maximum number of output lines to keep, default is 30'
+            },
+            'timeout': {
+                'type': 'number',
+                'description': 'The wall-clock timeout in seconds, the command is killed when exceeded. '
+                               'Default is no limit'
+            },
+            'idle_timeout': {
+                'type': 'number',
+                'description': 'Kill the command if it prints no output for this many seconds. Default is 1800 '
+                               '(30 minutes), run longer silent commands with `start_job` instead'
+            }
+        }
+    }
+}
+
+# Background job related function schema
+schema_start_job = {
+    'name': 'start_job',
+    'description': 'Start a long-running command (e.g., model training) as a background job and return its job id. '
+                   'Use this function instead of `execute_command` when the command may take a long time, '
+                   'then check the progress with `job_status`, `tail_job_log` or `wait_job`.',
+    'parameters': {
+        'type': 'object',
+        'properties': {
+            'command': {
+                'type': 'string',
+                'description': 'The command to run in the system shell'
+            },
+            'name': {
+                'type': 'string',
+                'description': 'A short name of the job'
+            }
+        },
+        'required': ['command']
+    }
+}
+
+schema_job_status = {
+    'name': 'job_status',
+    'description': 'Get the status (running, finished, failed, killed) and the exit code of a background job. '
+                   'List all jobs if no job id is given.',
+    'parameters': {
+        'type': 'object',
+        'properties': {
+            'job_id': {
+                'type': 'string',
+                'description': 'The id of the background job'
             }
         }
     }
 }
 
+schema_tail_job_log = {
+    'name': 'tail_job_log',
+    'description': 'Read the last lines of the log of a background job. '
+                   'Use this function to cheaply check the progress of a running job.',
+    'parameters': {
+        'type': 'object',
+        'properties': {
+            'job_id': {
+                'type': 'string',
+                'description': 'The id of the background job'
+            },
+            'lines': {
+                'type': 'integer',
+                'description': 'The number of lines to read from the end of the log, default is 30'
+            }
+        },
+        'required': ['job_id']
+    }
+}
+
+schema_wait_job = {
+    'name': 'wait_job',
+    'description': 'Wait for a background job to finish (up to a timeout) and return the last lines of its log.',
+    'parameters': {
+        'type': 'object',
+        'properties': {
+            'job_id': {
+                'type': 'string',
+                'description': 'The id of the background job'
+            },
+            'timeout': {
+                'type': 'number',
+                'description': 'The maximum number of seconds to wait, default is 60'
+            },
+            'lines': {
+                'type': 'integer',
+                'description': 'The number of log lines to return, default is 30'
+            }
+        },
+        'required': ['job_id']
+    }
+}
+
+schema_kill_job = {
+    'name': 'kill_job',
+    'description': 'Kill a running background job.',
+    'parameters': {
+        'type': 'object',
+        'properties': {
+            'job_id': {
+                'type': 'string',
+                'description': 'The id of the background job'
+            }
+        },
+        'required': ['job_id']
+    }
+}
+
 # Interaction related function schema
 schema_ask_question = {
     'name': 'ask_question',
@@ -268,16 +528,58 @@ schema_preview_csv_data = {
     }
 }
 
+schema_preview_dataset = {
+    'name': 'preview_dataset',
+    'description': 'Preview a dataset file (CSV, TSV, Parquet, Feather/Arrow, JSON or JSON Lines, optionally compressed '
+                   'as .gz/.bz2/.xz/.zst/.zip) and return the row count and the column statistics. '
+                   'Use this function when there is a need to preview the data in a non-CSV or compressed file.',
+    'parameters': {
+        'type': 'object',
+        'properties': {
+            'path': {
+                'type': 'string',
+                'description': 'The path of the dataset file to preview'
+            },
+            'limit_rows': {
+                'type': 'integer',
+                'description': 'The number of example values to preview, should not be a very large number. '
+                               'Default is 5.'
+            },
+            'limit_columns': {
+                'type': 'integer',
+                'description': 'The number of columns to preview, should not be a very large number. Default is None.'
+            }
+        }
+    }
+}
+
+schema_dataset_schema = {
+    'name': 'dataset_schema',
+    'description': 'Get the format, the row count and the column types of a dataset file. It is very fast for '
+                   'Parquet and Feather/Arrow files since only the file metadata is read. '
+                   'Use this function when there is a need to know the columns of a large dataset.',
+    'parameters': {
+        'type': 'object',
+        'properties': {
+            'path': {
+                'type': 'string',
+                'description': 'The path of the dataset file'
+            }
+        }
+    }
+}
+
 schema_preview_zip_structure = {
     'name': 'preview_zip_structure',
-    'description': 'Preview the structure of a zip file with limits on output and option to show hidden files. '
-                   'Use this function when there is a need to preview the contents of a zip file.',
+    'description': 'Preview the structure of an archive (.zip, .tar, .tar.gz, .tar.bz2, .tar.xz, .7z) with '
+                   'file counts, sizes and file types per directory, with limits on output and option to show '
+                   'hidden files. Use this function when there is a need to preview the contents of an archive.',
     'parameters': {
         'type': 'object',
         'properties': {
             'zip_path': {
                 'type': 'string',
-                'description': 'The path to the zip file'
+                'description': 'The path to the archive file'
             },
             'max_files': {
                 'type': 'integer',
@@ -302,7 +604,8 @@ schema_preview_zip_structure = {
 schema_unzip_data = {
     'name': 'unzip_data',
     'description': 'Unzip a compressed file, supporting various formats (.zip, .7z, .tar, .gz, .bz2, .xz) to a specified directory. '
-                   'Use this function when there is a need to extract a compressed file.',
+                   'Use this function when there is a need to extract a compressed file. The files already '
+                   'extracted are skipped, and only the members matching the patterns are extracted if given.',
     'parameters': {
         'type': 'object',
         'properties': {
@@ -313,6 +616,12 @@ schema_unzip_data = {
             'extract_path': {
                 'type': 'string',
                 'description': 'The directory to extract the compressed file to, default is the current directory'
+            },
+            'patterns': {
+                'type': 'array',
+                'items': {'type': 'string'},
+                'description': 'The glob patterns of the members to extract (e.g., ["*.csv", "train/*"]), '
+                               'default is to extract all members'
             }
         }
     }
@@ -321,6 +630,10 @@ schema_unzip_data = {
 # Mapping of function names to function schemas
 FUNCTION_NAMES = [
     'read_file',
+    'read_file_lines',
+    'tail_file',
+    'read_file_bytes',
+    'grep_file',
     'create_file',
     'write_file',
     'list_files',
@@ -329,17 +642,30 @@ FUNCTION_NAMES = [
     'search_arxiv',
     'search_papers_with_code',
     'search_github_repos',
+    'search_local_papers',
+    'multi_search',
     'execute_command',
+    'start_job',
+    'job_status',
+    'tail_job_log',
+    'wait_job',
+    'kill_job',
     'ask_question',
     'ask_yes_no',
     'ask_choices',
     'preview_csv_data',
+    'preview_dataset',
+    'dataset_schema',
     'preview_zip_structure',
     'unzip_data'
 ]
 
 FUNCTIONS = [
     read_file,
+    read_file_lines,
+    tail_file,
+    read_file_bytes,
+    grep_file,
     create_file,
     write_file,
     list_files,
@@ -348,11 +674,20 @@ FUNCTIONS = [
     search_arxiv,
     search_papers_with_code,
     search_github_repos,
+    search_local_papers,
+    multi_search,
     execute_command,
+    start_job,
+    job_status,
+    tail_job_log,
+    wait_job,
+    kill_job,
     ask_question,
     ask_yes_no,
     ask_choices,
     preview_csv_data,
+    preview_dataset,
+    dataset_schema,
     preview_zip_structure,
     unzip_data
 ]
@@ -361,7 +696,9 @@ SEARCH_FUNCTIONS = [
     "web_search",
     "search_arxiv",
     "search_papers_with_code",
-    "search_github_repos"
+    "search_github_repos",
+    "search_local_papers",
+    "multi_search"
 ]
 
 
@@ -385,8 +722,12 @@ def process_function_name(function_name: str):
     :param function_name: the generated function name.
     :return: the correct function name.
     """
-    for func in FUNCTION_NAMES:
-        if func in function_name:
-            return func
+    if function_name in FUNCTION_NAMES:
+        return function_name
+
+    # prefer the longest matched name, e.g., `read_file_lines` over `read_file`
+    matched = [func for func in FUNCTION_NAMES if func in function_name]
+    if matched:
+        return max(matched, key=len)
 
     raise ValueError(f"Function {function_name} is not supported.")
@@ -1,24 +1,20 @@
 import os
-import py7zr
-import gzip
-import bz2
-import lzma
-import shutil
-import tarfile
-import zipfile
 import textwrap
 import tempfile
-import pandas as pd
-from pandas.api.types import is_numeric_dtype
 
+from mle.utils.archive import extract_archive, inspect_archive, format_size
+from mle.utils.profile import get_dataset_profile, summarize_profile, detect_format, read_schema
 
-def unzip_data(compressed_file_path, extract_path=None):
+
+def unzip_data(compressed_file_path, extract_path=None, patterns=None):
     """
     Unzip a compressed file, supporting various formats (.zip, .7z, .tar, .gz, .bz2, .xz).
-    If no extract_path is provided, it creates a temporary directory.
+    If no extract_path is provided, it creates a temporary directory. Zip members are extracted in
+    parallel, and the members already extracted are skipped, so re-running it is cheap.
 
     :param compressed_file_path: Path to the compressed file
     :param extract_path: Path where the contents will be extracted. If None, a temp directory is used.
+    :param patterns: Glob patterns (e.g., ["*.csv", "train/*"]) of the members to extract, None to extract all.
     :return: String with the path to the unzipped contents
     """
     if not os.path.exists(compressed_file_path):
@@ -28,51 +24,19 @@ def unzip_data(compressed_file_path, extract_path=None):
     if extract_path is None:
         extract_path = tempfile.mkdtemp()
         print(f"No extract path provided. Using temporary directory: {extract_path}")
-    else:
-        # Create the extraction directory if it doesn't exist
-        os.makedirs(extract_path, exist_ok=True)
 
-    file_extension = os.path.splitext(compressed_file_path)[1].lower()
     file_name = os.path.splitext(os.path.basename(compressed_file_path))[0]
 
     # Create a subdirectory with the name of the compressed file
     specific_extract_path = os.path.join(extract_path, file_name)
-    os.makedirs(specific_extract_path, exist_ok=True)
+    if isinstance(patterns, str):
+        patterns = [patterns]
 
     try:
-        if file_extension == '.zip':
-            with zipfile.ZipFile(compressed_file_path, 'r') as zip_ref:
-                zip_ref.extractall(specific_extract_path)
-
-        elif file_extension == '.7z':
-            with py7zr.SevenZipFile(compressed_file_path, mode='r') as z:
-                z.extractall(specific_extract_path)
-
-        elif file_extension in ['.tar', '.gz', '.bz2', '.xz']:
-            if file_extension == '.gz':
-                open_func = gzip.open
-            elif file_extension == '.bz2':
-                open_func = bz2.open
-            elif file_extension == '.xz':
-                open_func = lzma.open
-            else:
-                open_func = open
-
-            with open_func(compressed_file_path, 'rb') as f:
-                if tarfile.is_tarfile(compressed_file_path) or file_extension in ['.gz', '.bz2', '.xz']:
-                    with tarfile.open(fileobj=f) as tar:
-                        tar.extractall(path=specific_extract_path)
-                else:
-                    # For single file compression (non-tar)
-                    output_filename = os.path.splitext(os.path.basename(compressed_file_path))[0]
-                    output_path = os.path.join(specific_extract_path, output_filename)
-                    with open(output_path, 'wb') as out_f:
-                        shutil.copyfileobj(f, out_f)
-
-        else:
-            raise ValueError(f"Unsupported file format: {file_extension}")
-
-        print(f"Successfully extracted {compressed_file_path} to {specific_extract_path}")
+        stats = extract_archive(compressed_file_path, specific_extract_path, patterns=patterns)
+        print(f"Successfully extracted {compressed_file_path} to {specific_extract_path}: "
+              f"{stats['extracted']} files extracted ({stats['bytes'] / (1024 * 1024):.1f} MB, "
+              f"{stats['throughput_mb_s']} MB/s), {stats['skipped']} files up to date")
         return specific_extract_path
 
     except Exception as e:
@@ -82,102 +46,140 @@ def unzip_data(compressed_file_path, extract_path=None):
 
 def preview_zip_structure(zip_path, max_files=50, max_dirs=20, max_output_length=1000, show_hidden=False):
     """
-    Preview the structure of a zip file with limits on output and option to show hidden files.
-    :param zip_path: the path to the zip file.
+    Preview the structure of an archive (zip, tar, tar.gz/bz2/xz or 7z) with limits on output and option to
+    show hidden files. Only the central directory or the headers are read, and the members are aggregated
+    into directory rollups with file counts, sizes and file types.
+    :param zip_path: the path to the archive.
     :param max_files: maximum number of files to display.
     :param max_dirs: maximum number of directories to display.
     :param max_output_length: maximum length of the output string.
     :param show_hidden: if True, show hidden files and directories (starting with a dot).
-    :return: the limited structure of the zip file as a string.
+    :return: the limited structure of the archive as a string.
     """
     if not os.path.exists(zip_path):
         return f"Error: The file '{zip_path}' does not exist."
 
-    if not zipfile.is_zipfile(zip_path):
-        return f"Error: '{zip_path}' is not a valid zip file."
+    try:
+        info = inspect_archive(zip_path, show_hidden=show_hidden, max_files=max_files)
+    except Exception as e:
+        return f"Error: '{zip_path}' is not a valid archive: {str(e)}"
 
     structure = []
-    file_count = 0
-    dir_count = 0
-    total_count = 0
-    hidden_count = 0
-
-    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-        for file_info in zip_ref.infolist():
-            file_path = file_info.filename
-            is_hidden = os.path.basename(file_path).startswith('.')
-
-            if is_hidden and not show_hidden:
-                hidden_count += 1
-                continue
-
-            if file_info.is_dir():
-                if dir_count < max_dirs:
-                    structure.append(f"Directory: {file_path}")
-                    dir_count += 1
-            else:
-                if file_count < max_files:
-                    structure.append(f"File: {file_path}")
-                    file_count += 1
-
-            total_count += 1
-            if len("\n".join(structure)) >= max_output_length:
-                structure.append("... (output truncated due to length)")
+    length = 0
+
+    def _append(line):
+        nonlocal length
+        if length + len(line) + 1 > max_output_length:
+            return False
+        structure.append(line)
+        length += len(line) + 1
+        return True
+
+    extensions = sorted(info['extensions'].items(), key=lambda item: item[1], reverse=True)
+    _append(f"Archive: {zip_path} ({info['format']}), {info['num_files']:,} files in {info['num_dirs']:,} "
+            f"directories, {format_size(info['total_size'])} uncompressed")
+    if extensions:
+        _append("File types: " + ", ".join(f"{ext} ({count:,})" for ext, count in extensions[:10]))
+
+    truncated = False
+    directories = sorted(info['directories'].items())
+    if directories:
+        truncated = not _append("Directories:")
+        for directory, (count, size) in directories[:max_dirs]:
+            indent = "  " * (directory.count('/') - 1)
+            if truncated or not _append(f"{indent}{directory} - {count:,} files, {format_size(size)}"):
+                truncated = True
+                break
+        if len(directories) > max_dirs:
+            structure.append(f"... (and {len(directories) - max_dirs} more directories)")
+
+    if info['files'] and not truncated:
+        truncated = not _append("Files:")
+        for name, size in info['files']:
+            if truncated or not _append(f"{name} ({format_size(size)})"):
+                truncated = True
                 break
+        if info['num_files'] > len(info['files']):
+            structure.append(f"... (and {info['num_files'] - len(info['files']):,} more files)")
 
-    if file_count >= max_files:
-        structure.append(f"... (and {total_count - file_count - dir_count} more files)")
-    if dir_count >= max_dirs:
-        structure.append(f"... (and {total_count - file_count - dir_count} more directories)")
-    if not show_hidden and hidden_count > 0:
-        structure.append(f"... ({hidden_count} hidden items not shown)")
+    if truncated:
+        structure.append("... (output truncated due to length)")
+    if not show_hidden and info['num_hidden'] > 0:
+        structure.append(f"... ({info['num_hidden']} hidden items not shown)")
+    return "\n".join(structure)
 
-    output = "\n".join(structure)
-    if len(output) > max_output_length:
-        output = output[:max_output_length] + "... (output truncated)"
 
-    return output
+FORMAT_NAMES = {
+    'csv': 'CSV',
+    'tsv': 'TSV',
+    'parquet': 'Parquet',
+    'arrow': 'Feather/Arrow',
+    'json': 'JSON',
+    'jsonl': 'JSON Lines',
+}
 
 
-def preview_csv_data(path: str, limit_rows: int = 5, limit_columns: int = None) -> str:
+def preview_dataset(path: str, limit_rows: int = 5, limit_columns: int = None) -> str:
     """
-    Preview the sample dataset from the project data path and include metadata.
-    :param path: the path to a local CSV file.
-    :param limit_rows: the number of rows to preview.
+    Preview a dataset file (CSV, TSV, Parquet, Feather/Arrow, JSON or JSON Lines, optionally compressed as
+     .gz/.bz2/.xz/.zst/.zip) and include metadata. Text files are streamed in chunks, Parquet and Arrow
+     files use the footer metadata and sampled row groups, and the column statistics are cached in
+     `.mle/profiles/` for the repeated previews.
+    :param path: the path to a local dataset file.
+    :param limit_rows: the number of example values to preview.
     :param limit_columns: the number of columns to preview. If None, all columns are previewed.
     :return: the sample dataset with metadata as a string.
     """
     try:
-        df = pd.read_csv(path)
-        num_rows, num_cols = df.shape
-        summary = [f"CSV file in `{path}` has {num_rows} rows and {num_cols} columns."]
-
+        profile = get_dataset_profile(path, columns=[])
+        num_cols = len(profile["all_columns"])
+        columns_to_preview = sorted(profile["all_columns"])
         if limit_columns is not None and limit_columns < num_cols:
-            columns_to_preview = sorted(df.columns)[:limit_columns]
+            columns_to_preview = columns_to_preview[:limit_columns]
+
+        # only the previewed columns that are not in the profile cache are parsed
+        profile = get_dataset_profile(path, columns=columns_to_preview)
+        file_format = FORMAT_NAMES[detect_format(path)]
+        summary = [f"{file_format} file in `{path}` has {profile['num_rows']} rows and {num_cols} columns."]
+        if len(columns_to_preview) < num_cols:
             summary.append(f"Previewing {limit_columns} out of {num_cols} columns.")
-        else:
-            columns_to_preview = sorted(df.columns)
 
         summary.append("Here is some information about the columns:")
-
-        for col in columns_to_preview:
-            dtype = df[col].dtype
-            name = f"{col} ({dtype})"
-            nan_count = df[col].isnull().sum()
-            if dtype == "bool":
-                true_percentage = df[col].mean() * 100
-                summary.append(f"{name} is {true_percentage:.2f}% True, {100 - true_percentage:.2f}% False")
-            elif df[col].nunique() < 10:
-                unique_values = df[col].unique().tolist()
-                summary.append(f"{name} has {df[col].nunique()} unique values: {unique_values}")
-            elif is_numeric_dtype(df[col]):
-                min_val, max_val = df[col].min(), df[col].max()
-                summary.append(f"{name} has range: {min_val:.2f} - {max_val:.2f}, {nan_count} NaN values")
-            elif dtype == "object":
-                unique_count = df[col].nunique()
-                example_values = df[col].value_counts().head(limit_rows).index.tolist()
-                summary.append(f"{name} has {unique_count} unique values. Some example values: {example_values}")
+        profile["columns"] = sorted(profile["columns"], key=lambda c: c["name"])
+        summary.extend(summarize_profile(profile, limit_rows))
 
         return textwrap.dedent("\n".join(summary)).strip()
     except Exception as e:
-        return f"Cannot read CSV data: {e}"
+        return f"Cannot read the dataset: {e}"
+
+
+def preview_csv_data(path: str, limit_rows: int = 5, limit_columns: int = None) -> str:
+    """
+    Preview the sample dataset from the project data path and include metadata. The file is streamed
+     in chunks, so the memory usage is bounded regardless of the file size, and the column statistics
+     are cached in `.mle/profiles/` for the repeated previews.
+    :param path: the path to a local CSV file.
+    :param limit_rows: the number of rows to preview.
+    :param limit_columns: the number of columns to preview. If None, all columns are previewed.
+    :return: the sample dataset with metadata as a string.
+    """
+    return preview_dataset(path, limit_rows, limit_columns)
+
+
+def dataset_schema(path: str) -> str:
+    """
+    Get the schema of a dataset file, Parquet and Arrow files only read the footer / header.
+    :param path: the path to a local dataset file.
+    :return: the format, the row count and the column types as a string.
+    """
+    try:
+        schema = read_schema(path)
+        num_rows = schema["num_rows"] if schema["num_rows"] is not None else "unknown (needs a full scan)"
+        lines = [
+            f"{FORMAT_NAMES[schema['format']]} file in `{path}` ({os.path.getsize(path)} bytes), "
+            f"rows: {num_rows}, columns: {len(schema['columns'])}"
+        ]
+        lines.extend(f"- {name}: {dtype}" for name, dtype in schema["columns"].items())
+        return "\n".join(lines)
+    except Exception as e:
+        return f"Cannot read the dataset schema: {e}"
@@ -2,39 +2,358 @@
 Tools to execute functions, acquire runtime logs.
 """
 
+import os
+import time
+import queue
+import signal
+import threading
+import selectors
 import subprocess
 from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, Dict, Any
 
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 
-def execute_command(command: str, max_lines: int = 30):
+# the grace period (in seconds) between SIGTERM and SIGKILL when killing a process group
+KILL_GRACE_PERIOD = 5
+# the default idle timeout (in seconds) of `execute_command`, so a hung command does not block the agent forever
+DEFAULT_IDLE_TIMEOUT = 1800
+# the interval (in seconds) between the samples of the memory usage of a running command
+MEMORY_SAMPLE_INTERVAL = 0.5
+
+# the extra environment variables of the commands issued by the agents, see `command_environment`
+_COMMAND_ENV: ContextVar[Optional[Dict[str, str]]] = ContextVar('command_env', default=None)
+
+
+@contextmanager
+def command_environment(env: Optional[Dict[str, str]]):
     """
-    Run a command in the shell and return the outputs, errors, and exit status,
-    limiting the output to a specified number of most recent lines.
+    Run the commands issued by the agents in this context (`execute_command` and `start_job` called without
+     an `env`) with the extra environment variables, e.g., of a prepared dependency environment.
+    :param env: the extra environment variables.
+    """
+    token = _COMMAND_ENV.set(env or None)
+    try:
+        yield
+    finally:
+        _COMMAND_ENV.reset(token)
+
+
+def get_command_environment() -> Optional[Dict[str, str]]:
+    """
+    Get the extra environment variables of the commands issued by the agents in the current context.
+    """
+    return _COMMAND_ENV.get()
+
+
+def _set_limits(max_memory_mb: Optional[int] = None, max_cpu_seconds: Optional[int] = None):
+    """
+    Build the `preexec_fn` to apply the resource limits in the child process.
+    :param max_memory_mb: the address space limit of the child in MB.
+    :param max_cpu_seconds: the CPU time limit of the child in seconds.
+    :return: the preexec function, or None if no limits are required.
+    """
+    if resource is None or (max_memory_mb is None and max_cpu_seconds is None):
+        return None
+
+    def _preexec():
+        if max_memory_mb is not None:
+            limit = int(max_memory_mb) * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        if max_cpu_seconds is not None:
+            limit = int(max_cpu_seconds)
+            resource.setrlimit(resource.RLIMIT_CPU, (limit, limit))
+
+    return _preexec
+
+
+def _kill_process_group(process: subprocess.Popen):
+    """
+    Kill the process and all its children, first politely (SIGTERM) and then forcibly (SIGKILL).
+    :param process: the process to kill.
+    """
+    if process.poll() is not None:
+        return
+
+    if os.name == 'posix':
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+            deadline = time.monotonic() + KILL_GRACE_PERIOD
+            while process.poll() is None and time.monotonic() < deadline:
+                time.sleep(0.1)
+            if process.poll() is None:
+                os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    else:
+        process.kill()
+
+
+def _iter_output(process: subprocess.Popen, poll_interval: float):
+    """
+    Iterate the output lines of a process without blocking, yield None when no output
+     arrives within the poll interval, so the caller can check the timeouts.
+    :param process: the process with a binary stdout pipe.
+    :param poll_interval: the maximum time to wait for a new output.
+    """
+    if os.name == 'posix':
+        selector = selectors.DefaultSelector()
+        selector.register(process.stdout, selectors.EVENT_READ)
+        fd = process.stdout.fileno()
+        pending = b''
+        try:
+            while True:
+                if not selector.select(timeout=poll_interval):
+                    yield None
+                    continue
+                data = os.read(fd, 65536)
+                if not data:
+                    break
+                *lines, pending = (pending + data).split(b'\n')
+                for line in lines:
+                    yield line.decode('utf-8', errors='replace')
+            if pending:
+                yield pending.decode('utf-8', errors='replace')
+        finally:
+            selector.close()
+    else:
+        # pipes are not selectable on Windows, read them in a background thread instead
+        lines = queue.Queue()
+
+        def _reader():
+            for raw_line in iter(process.stdout.readline, b''):
+                lines.put(raw_line.rstrip(b'\n').decode('utf-8', errors='replace'))
+            lines.put(StopIteration)
+
+        threading.Thread(target=_reader, daemon=True).start()
+        while True:
+            try:
+                line = lines.get(timeout=poll_interval)
+            except queue.Empty:
+                yield None
+                continue
+            if line is StopIteration:
+                break
+            yield line
+
+
+def _session_memory_kb(session_id: int) -> Optional[int]:
+    """
+    Sample the memory of the processes in a session (the command and its children) from `/proc` (Linux only).
+     `ru_maxrss` can not be used: the child is forked (for `preexec_fn` and the new session), so its maximum
+     resident memory includes the memory of the parent at the fork.
+    :param session_id: the session id, i.e., the pid of the command started in a new session.
+    :return: the larger of the total resident memory and the peak resident memory of a single process in KB,
+     or None if no process of the session is running.
+    """
+    try:
+        pids = [pid for pid in os.listdir('/proc') if pid.isdigit()]
+    except OSError:
+        return None
+    total, peak, found = 0, 0, False
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/stat', 'rb') as f:
+                stat = f.read()
+            # the fields after the command name (which may contain spaces): state, ppid, pgrp, session, ...
+            if int(stat[stat.rindex(b')') + 2:].split()[3]) != session_id:
+                continue
+            with open(f'/proc/{pid}/status', 'r') as f:
+                fields = dict(line.split(':', 1) for line in f if line.startswith(('VmRSS', 'VmHWM')))
+        except (OSError, ValueError, IndexError):
+            continue  # the process exited meanwhile
+        if 'VmRSS' not in fields:
+            continue  # a zombie, its memory is already released
+        found = True
+        total += int(fields.get('VmRSS', '0 kB').split()[0])
+        peak = max(peak, int(fields.get('VmHWM', '0 kB').split()[0]))
+    return max(total, peak) if found else None
+
+
+def _wait_with_usage(process: subprocess.Popen) -> Dict[str, Any]:
+    """
+    Wait for the process to exit, and collect the CPU time of it.
+    :param process: the process to wait.
+    :return: the resource usage of the process.
+    """
+    if not hasattr(os, 'wait4') or process.returncode is not None:
+        process.wait()
+        return {"cpu_time": None}
+
+    try:
+        _, status, usage = os.wait4(process.pid, 0)
+    except ChildProcessError:
+        process.wait()
+        return {"cpu_time": None}
+
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return {"cpu_time": round(usage.ru_utime + usage.ru_stime, 2)}
+
+
+def run_command(
+        command: str,
+        max_lines: int = 30,
+        head_lines: Optional[int] = None,
+        timeout: Optional[float] = None,
+        idle_timeout: Optional[float] = None,
+        max_memory_mb: Optional[int] = None,
+        max_cpu_seconds: Optional[int] = None,
+        verbose: bool = True,
+        cwd: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    """
+    Run a command in the shell with timeouts and resource limits, and keep the first and the most recent
+     lines of the output, so the errors raised at the start are not lost.
 
     Args:
         command (str): The input command to run.
-        max_lines (int): Maximum number of output lines to keep. Defaults to 100.
+        max_lines (int): Maximum number of the most recent output lines to keep. Defaults to 30.
+        head_lines (int): Maximum number of the first output lines to keep. Defaults to `max_lines // 3`.
+        timeout (float): The wall-clock timeout in seconds, None means no limit.
+        idle_timeout (float): The timeout in seconds without any new output, None means no limit.
+        max_memory_mb (int): The memory (address space) limit of the process in MB (POSIX only).
+        max_cpu_seconds (int): The CPU time limit of the process in seconds (POSIX only).
+        verbose (bool): Whether to print the output lines as they arrive.
+        cwd (str): The working directory of the command, the current directory if not given.
+        env (dict): The extra environment variables of the command.
 
-    Return: A string of the exit status and the limited output (most recent lines).
+    Return: A dictionary of the exit code, the head and tail output lines, the timeout status and the resource usage.
     """
+    if head_lines is None:
+        head_lines = max_lines // 3
+
+    start_time = time.monotonic()
+    process = subprocess.Popen(
+        command,
+        shell=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        start_new_session=os.name == 'posix',
+        preexec_fn=_set_limits(max_memory_mb, max_cpu_seconds),
+        cwd=cwd,
+        env={**os.environ, **env} if env else None,
+    )
+
+    head, tail = [], deque(maxlen=max_lines)
+    total_lines = 0
+    timed_out = None
+    last_output_time = start_time
+    # the peak memory is sampled while the command runs, a command which exits quickly is not measured
+    sample_memory = os.name == 'posix' and os.path.isdir('/proc')
+    peak_memory_kb, last_sample_time = None, 0.0
+    poll_interval = min([t for t in (timeout, idle_timeout) if t] + [MEMORY_SAMPLE_INTERVAL if sample_memory else 1.0])
     try:
-        process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
-        output_buffer = deque(maxlen=max_lines)
+        for line in _iter_output(process, poll_interval):
+            now = time.monotonic()
+            if sample_memory and now - last_sample_time >= MEMORY_SAMPLE_INTERVAL:
+                last_sample_time = now
+                memory_kb = _session_memory_kb(process.pid)
+                if memory_kb is not None:
+                    peak_memory_kb = max(peak_memory_kb or 0, memory_kb)
+            if line is not None:
+                last_output_time = now
+                total_lines += 1
+                if len(head) < head_lines:
+                    head.append(line)
+                else:
+                    tail.append(line)
+                if verbose:
+                    print(line)
 
-        while True:
-            line = process.stdout.readline()
-            if not line and process.poll() is not None:
+            if timeout is not None and now - start_time > timeout:
+                timed_out = f"wall-clock timeout ({timeout}s)"
+            elif idle_timeout is not None and now - last_output_time > idle_timeout:
+                timed_out = f"no output for {idle_timeout}s"
+            if timed_out:
+                _kill_process_group(process)
                 break
-            output_buffer.append(line.rstrip())
-            print(line, end='')
+    except KeyboardInterrupt:
+        _kill_process_group(process)
+        raise
+    finally:
+        process.stdout.close()
+
+    usage = _wait_with_usage(process)
+    return {
+        "exit_code": process.returncode,
+        "head": head,
+        "tail": list(tail),
+        "omitted_lines": total_lines - len(head) - len(tail),
+        "timed_out": timed_out,
+        "duration": round(time.monotonic() - start_time, 2),
+        "peak_memory_mb": round(peak_memory_kb / 1024, 2) if peak_memory_kb is not None else None,
+        **usage,
+    }
+
 
-        exit_code = process.wait()
+def execute_command(
+        command: str,
+        max_lines: int = 30,
+        timeout: Optional[float] = None,
+        idle_timeout: Optional[float] = DEFAULT_IDLE_TIMEOUT,
+        max_memory_mb: Optional[int] = None,
+        cwd: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+):
+    """
+    Run a command in the shell and return the outputs, errors, and exit status,
+    limiting the output to the first few and the most recent lines.
 
-        limited_output = "\n".join(output_buffer)
-        if len(output_buffer) == max_lines:
-            return f"Exit code: {exit_code}\nOutput (last {max_lines} lines):\n{limited_output}"
-        else:
-            return f"Exit code: {exit_code}\nOutput:\n{limited_output}"
+    Args:
+        command (str): The input command to run.
+        max_lines (int): Maximum number of output lines to keep. Defaults to 30.
+        timeout (float): The wall-clock timeout in seconds, None means no limit.
+        idle_timeout (float): The timeout in seconds without any new output, None means no limit.
+            Defaults to `DEFAULT_IDLE_TIMEOUT`.
+        max_memory_mb (int): The memory limit of the process in MB (POSIX only).
+        cwd (str): The working directory of the command, the current directory if not given.
+        env (dict): The extra environment variables of the command, those of `command_environment` if not given.
 
+    Return: A string of the exit status, the limited output and the resource usage.
+    """
+    try:
+        result = run_command(
+            command,
+            max_lines=max_lines,
+            timeout=timeout,
+            idle_timeout=idle_timeout,
+            max_memory_mb=max_memory_mb,
+            cwd=cwd,
+            env=env if env is not None else get_command_environment(),
+        )
     except Exception as e:
         return f"Error running command: {str(e)}"
+
+    return format_command_result(result)
+
+
+def format_command_result(result: Dict[str, Any]) -> str:
+    """
+    Format the result of `run_command` as the logs for the agents.
+    :param result: the result of `run_command`.
+    :return: a string of the exit status, the limited output and the resource usage.
+    """
+    output = [f"Exit code: {result['exit_code']}"]
+    if result['timed_out']:
+        output.append(f"The command was killed due to {result['timed_out']}.")
+    if result['omitted_lines'] > 0:
+        output.append(f"Output (first {len(result['head'])} lines):")
+        output.extend(result['head'])
+        output.append(f"... ({result['omitted_lines']} lines omitted) ...")
+        output.append(f"Output (last {len(result['tail'])} lines):")
+        output.extend(result['tail'])
+    else:
+        output.append("Output:")
+        output.extend(result['head'] + result['tail'])
+    if result['cpu_time'] is not None:
+        usage = f"Resource usage: {result['duration']}s wall-clock, {result['cpu_time']}s CPU time"
+        if result['peak_memory_mb'] is not None:
+            usage += f", ~{result['peak_memory_mb']} MB peak memory (sampled)"
+        output.append(usage)
+    return "\n".join(output)
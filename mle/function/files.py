@@ -1,4 +1,40 @@
 import os
+import re
+import mmap
+import bisect
+import threading
+from array import array
+from collections import OrderedDict
+
+from mle.utils.scheduler import file_lock
+
+# the maximum number of line indexes kept in memory
+MAX_LINE_INDEXES = 16
+# the maximum number of characters returned by the range reading functions
+MAX_OUTPUT_CHARS = 50000
+# the number of seconds to wait for a file written by another task
+FILE_LOCK_TIMEOUT = 120
+
+
+def _write_locked(path: str, content: str):
+    """
+    Write a file atomically, holding the file lock, so the tasks running in parallel never interleave
+     their writes (a task declaring the file holds the lock until it finishes).
+    """
+    lock = file_lock(path)
+    if not lock.acquire(timeout=FILE_LOCK_TIMEOUT):
+        raise TimeoutError(f"{path} is being written by another task, please retry later or use another file")
+    try:
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'w') as f:
+                f.write(content)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    finally:
+        lock.release()
 
 
 def read_file(file_path: str, limit: int = 2000):
@@ -34,8 +70,7 @@ def create_file(path, content):
         content (str): The initial content to write to the file.
     """
     try:
-        with open(path, 'w') as f:
-            f.write(content)
+        _write_locked(path, content)
         return f"File created: {path}"
     except Exception as e:
         return f"Error creating file: {str(e)}"
@@ -49,8 +84,7 @@ def write_file(path, content):
         content (str): The content to write to the file.
     """
     try:
-        with open(path, 'w') as f:
-            f.write(content)
+        _write_locked(path, content)
         return f"Content written to file: {path}"
     except Exception as e:
         return f"Error writing to file: {str(e)}"
@@ -105,3 +139,257 @@ def create_directory(path: str):
         return f"Directory '{path}' created successfully."
     except OSError as error:
         return f"Creation of the directory '{path}' failed due to: {error}"
+
+
+class _LineIndex:
+    """
+    The on-demand newline offset index of a file, built incrementally over a memory map, so
+     reading a line range only scans the file up to the last requested line once.
+    """
+
+    def __init__(self, path: str, stat: os.stat_result):
+        self.path = path
+        self.size = stat.st_size
+        self.mtime = stat.st_mtime_ns
+        self.offsets = array('q', [0])  # the start offset of each line
+        self.scanned = 0
+        self.lock = threading.Lock()
+
+    @property
+    def complete(self) -> bool:
+        return self.scanned >= self.size
+
+    def ensure(self, mm: mmap.mmap, line: int):
+        """
+        Extend the index until it covers the given (0-based) line, or the end of the file.
+        """
+        with self.lock:
+            while len(self.offsets) <= line + 1 and not self.complete:
+                position = mm.find(b'\n', self.scanned)
+                if position == -1:
+                    self.scanned = self.size
+                    break
+                self.scanned = position + 1
+                if self.scanned < self.size:
+                    self.offsets.append(self.scanned)
+
+    def line_of(self, mm: mmap.mmap, position: int) -> int:
+        """
+        Get the (0-based) line that contains the byte position, extending the index as needed.
+        """
+        while self.scanned <= position and not self.complete:
+            self.ensure(mm, len(self.offsets) * 2)
+        return bisect.bisect_right(self.offsets, position) - 1
+
+    def span(self, start: int, end: int):
+        """
+        Get the byte span of the (0-based, end-exclusive) line range, the index must cover it.
+        """
+        start = min(start, len(self.offsets))
+        begin = self.offsets[start] if start < len(self.offsets) else self.size
+        finish = self.offsets[end] if end < len(self.offsets) else self.size
+        return begin, finish
+
+
+_LINE_INDEXES = OrderedDict()
+_LINE_INDEXES_LOCK = threading.Lock()
+
+
+def _get_line_index(path: str) -> _LineIndex:
+    """
+    Get the cached line index of a file, it is rebuilt when the file is modified.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    with _LINE_INDEXES_LOCK:
+        index = _LINE_INDEXES.get(path)
+        if index is None or index.size != stat.st_size or index.mtime != stat.st_mtime_ns:
+            index = _LineIndex(path, stat)
+            _LINE_INDEXES[path] = index
+        _LINE_INDEXES.move_to_end(path)
+        while len(_LINE_INDEXES) > MAX_LINE_INDEXES:
+            _LINE_INDEXES.popitem(last=False)
+    return index
+
+
+def _open_mmap(path: str):
+    """
+    Memory-map a file for reading, return None for empty files (which can not be mapped).
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _truncate(text: str) -> str:
+    if len(text) > MAX_OUTPUT_CHARS:
+        return text[:MAX_OUTPUT_CHARS] + f"\n... (output truncated at {MAX_OUTPUT_CHARS} characters)"
+    return text
+
+
+def read_file_lines(file_path: str, start_line: int = 1, end_line: int = None):
+    """
+    Read a range of lines of a (possibly very large) file, without reading the lines before it
+     once the file has been indexed.
+
+    Args:
+    file_path (str): The path to the file.
+    start_line (int): The first line to read (1-based, inclusive).
+    end_line (int): The last line to read (1-based, inclusive), defaults to `start_line + 99`.
+
+    Returns:
+    str: The lines prefixed with their line numbers.
+    """
+    try:
+        start_line = max(int(start_line), 1)
+        end_line = int(end_line) if end_line is not None else start_line + 99
+        index = _get_line_index(file_path)
+        mm = _open_mmap(file_path)
+        if mm is None:
+            return f"The file is empty: {file_path}"
+        with mm:
+            index.ensure(mm, end_line)
+            begin, finish = index.span(start_line - 1, end_line)
+            lines = mm[begin:finish].decode('utf-8', errors='replace').splitlines()
+    except FileNotFoundError:
+        return f"File not found: {file_path}"
+    except Exception as e:
+        return f"Error reading file: {str(e)}"
+
+    if not lines:
+        return f"The file has fewer than {start_line} lines: {file_path}"
+    return _truncate("\n".join(f"{start_line + i}: {line}" for i, line in enumerate(lines)))
+
+
+def tail_file(file_path: str, lines: int = 50):
+    """
+    Read the last lines of a (possibly very large) file, e.g., a training log, by scanning backwards
+     from the end of the file.
+
+    Args:
+    file_path (str): The path to the file.
+    lines (int): The number of lines to read from the end, default is 50.
+
+    Returns:
+    str: The last lines of the file.
+    """
+    try:
+        lines = max(int(lines), 1)
+        mm = _open_mmap(file_path)
+        if mm is None:
+            return f"The file is empty: {file_path}"
+        with mm:
+            end = len(mm)
+            # ignore the trailing newline of the last line
+            position = end - 1 if mm[end - 1:end] == b'\n' else end
+            for _ in range(lines):
+                position = mm.rfind(b'\n', 0, position)
+                if position == -1:
+                    break
+            text = mm[position + 1:end].decode('utf-8', errors='replace')
+    except FileNotFoundError:
+        return f"File not found: {file_path}"
+    except Exception as e:
+        return f"Error reading file: {str(e)}"
+    return _truncate(text)
+
+
+def read_file_bytes(file_path: str, offset: int = 0, length: int = 4096):
+    """
+    Read a byte range of a file, negative offsets count from the end of the file.
+
+    Args:
+    file_path (str): The path to the file.
+    offset (int): The byte offset to start reading from, negative values count from the end.
+    length (int): The number of bytes to read, default is 4096.
+
+    Returns:
+    str: The decoded content of the byte range.
+    """
+    try:
+        size = os.path.getsize(file_path)
+        offset = int(offset)
+        if offset < 0:
+            offset = max(size + offset, 0)
+        length = min(int(length), MAX_OUTPUT_CHARS)
+        with open(file_path, 'rb') as f:
+            f.seek(offset)
+            data = f.read(length)
+    except FileNotFoundError:
+        return f"File not found: {file_path}"
+    except Exception as e:
+        return f"Error reading file: {str(e)}"
+    return f"Bytes {offset}-{offset + len(data)} of {size}:\n" + data.decode('utf-8', errors='replace')
+
+
+def grep_file(file_path: str, pattern: str, context: int = 2, max_matches: int = 20, ignore_case: bool = False):
+    """
+    Search a (possibly very large) file for a regular expression, and return the matched lines with
+     their surrounding lines.
+
+    Args:
+    file_path (str): The path to the file.
+    pattern (str): The regular expression to search for.
+    context (int): The number of lines to show before and after each match, default is 2.
+    max_matches (int): The maximum number of matches to return, default is 20.
+    ignore_case (bool): Whether to ignore the case, default is False.
+
+    Returns:
+    str: The matched lines (marked with '>') with their line numbers and context.
+    """
+    try:
+        # the file is searched as a whole, so `^` and `$` have to match at the line boundaries
+        regex = re.compile(pattern.encode('utf-8'), re.MULTILINE | (re.IGNORECASE if ignore_case else 0))
+        context = max(int(context), 0)
+        index = _get_line_index(file_path)
+        mm = _open_mmap(file_path)
+        if mm is None:
+            return f"The file is empty: {file_path}"
+
+        with mm:
+            matched_lines = []
+            truncated = False
+            for match in regex.finditer(mm):
+                line = index.line_of(mm, match.start())
+                if matched_lines and line == matched_lines[-1]:
+                    continue  # multiple matches in the same line
+                if len(matched_lines) >= max_matches:
+                    truncated = True
+                    break
+                matched_lines.append(line)
+            num_matches = len(matched_lines)
+
+            # merge the overlapping context windows, so every matched line is shown (and marked) once
+            windows = []
+            for line in matched_lines:
+                first, last = max(line - context, 0), line + context
+                if windows and first <= windows[-1][1] + 1:
+                    windows[-1][1] = last
+                else:
+                    windows.append([first, last])
+
+            matched = set(matched_lines)
+            blocks = []
+            for first, last in windows:
+                index.ensure(mm, last + 1)
+                begin, finish = index.span(first, last + 1)
+                text = mm[begin:finish].decode('utf-8', errors='replace').splitlines()
+                if blocks:
+                    blocks.append("--")
+                for i, text_line in enumerate(text):
+                    marker = '>' if first + i in matched else ' '
+                    blocks.append(f"{marker}{first + i + 1}: {text_line}")
+            if truncated:
+                blocks.append(f"... (stopped after {max_matches} matches)")
+    except FileNotFoundError:
+        return f"File not found: {file_path}"
+    except re.error as e:
+        return f"Invalid regular expression: {str(e)}"
+    except Exception as e:
+        return f"Error searching file: {str(e)}"
+
+    if not num_matches:
+        return f"No matches found for `{pattern}` in {file_path}"
+    return _truncate("\n".join(blocks))
+
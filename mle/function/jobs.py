@@ -0,0 +1,282 @@
+"""
+Tools to run long commands (e.g., model training) as background jobs, and check their progress.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import signal
+import subprocess
+from collections import deque
+from datetime import datetime
+from typing import Optional, Dict, Any
+
+from .execution import get_command_environment
+
+JOB_DIR = os.path.join('.mle', 'jobs')
+# the maximum size (in bytes) of a job log file before it is rotated
+LOG_MAX_BYTES = 10 * 1024 * 1024
+# the number of rotated log files kept for each job
+LOG_BACKUP_COUNT = 3
+
+# the log rotation runs inside a small supervisor process, so the job survives the agent process
+_SUPERVISOR = r"""
+import os, sys, json, time, subprocess
+command, log_path, state_path, max_bytes, backups = sys.argv[1:6]
+max_bytes, backups = int(max_bytes), int(backups)
+
+def rotate(log):
+    log.close()
+    for i in range(backups - 1, 0, -1):
+        if os.path.exists(f"{log_path}.{i}"):
+            os.replace(f"{log_path}.{i}", f"{log_path}.{i + 1}")
+    os.replace(log_path, f"{log_path}.1")
+    return open(log_path, "ab", buffering=0)
+
+log = open(log_path, "ab", buffering=0)
+process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+for line in iter(process.stdout.readline, b""):
+    log.write(line)
+    if log.tell() >= max_bytes:
+        log = rotate(log)
+exit_code = process.wait()
+log.close()
+
+# the job state is written by the parent right after spawning the supervisor
+for _ in range(100):
+    if os.path.exists(state_path):
+        break
+    time.sleep(0.1)
+with open(state_path) as f:
+    state = json.load(f)
+state.update({"status": "finished" if exit_code == 0 else "failed", "exit_code": exit_code})
+with open(state_path + ".tmp", "w") as f:
+    json.dump(state, f)
+os.replace(state_path + ".tmp", state_path)
+"""
+
+
+def _job_paths(job_id: str, job_dir: str = JOB_DIR):
+    """
+    Get the state file path and the log file path of a job.
+    """
+    return os.path.join(job_dir, f"{job_id}.json"), os.path.join(job_dir, f"{job_id}.log")
+
+
+def _write_job(state: Dict[str, Any], job_dir: str = JOB_DIR):
+    """
+    Atomically write the state of a job, so the supervisor never reads a partial state file.
+    """
+    state_path, _ = _job_paths(state["id"], job_dir)
+    with open(state_path + ".tmp", 'w') as f:
+        json.dump(state, f)
+    os.replace(state_path + ".tmp", state_path)
+
+
+def _load_job(job_id: str, job_dir: str = JOB_DIR) -> Optional[Dict[str, Any]]:
+    """
+    Load the state of a job, and mark it as lost if the supervisor died without recording the exit code.
+    """
+    state_path, _ = _job_paths(job_id, job_dir)
+    if not os.path.exists(state_path):
+        return None
+
+    with open(state_path, 'r') as f:
+        state = json.load(f)
+
+    if state.get("status") == "running" and not _is_alive(state.get("pid")):
+        # the supervisor may have just exited, re-read the state before judging
+        with open(state_path, 'r') as f:
+            state = json.load(f)
+        if state.get("status") == "running":
+            state["status"] = "lost"
+    return state
+
+
+def _is_alive(pid: Optional[int]) -> bool:
+    """
+    Check if a process is still alive.
+    """
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    # reap the zombie if the supervisor is a child of the current process
+    try:
+        waited_pid, _ = os.waitpid(pid, os.WNOHANG)
+        return waited_pid == 0
+    except (ChildProcessError, AttributeError):
+        return True
+
+
+def start_job(command: str, name: Optional[str] = None, job_dir: str = JOB_DIR):
+    """
+    Start a command as a background job, the output is written to a rotating log file.
+
+    Args:
+        command (str): The command to run in the system shell.
+        name (str): An optional human-readable name of the job.
+        job_dir (str): The directory to store the job states and logs.
+
+    Return: A string of the job id and the log file path.
+    """
+    os.makedirs(job_dir, exist_ok=True)
+    job_id = uuid.uuid4().hex[:8]
+    state_path, log_path = _job_paths(job_id, job_dir)
+
+    state = {
+        "id": job_id,
+        "name": name or command,
+        "command": command,
+        "cwd": os.getcwd(),
+        "log": log_path,
+        "status": "running",
+        "exit_code": None,
+        "start_time": datetime.now().isoformat(),
+    }
+
+    # the job runs with the environment of the agent commands, e.g., of the prepared dependencies
+    env = get_command_environment()
+    try:
+        process = subprocess.Popen(
+            [sys.executable, "-c", _SUPERVISOR, command, log_path, state_path, str(LOG_MAX_BYTES),
+             str(LOG_BACKUP_COUNT)],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=os.name == 'posix',
+            env={**os.environ, **env} if env else None,
+        )
+    except Exception as e:
+        return f"Error starting job: {str(e)}"
+
+    state["pid"] = process.pid
+    _write_job(state, job_dir)
+    return f"Job {job_id} started: {command}\nLog file: {log_path}"
+
+
+def job_status(job_id: Optional[str] = None, job_dir: str = JOB_DIR):
+    """
+    Get the status of a background job, or all jobs if no job id is given.
+
+    Args:
+        job_id (str): The job id.
+        job_dir (str): The directory of the job states and logs.
+
+    Return: A string of the job status.
+    """
+    if job_id is None:
+        if not os.path.isdir(job_dir):
+            return "No jobs found."
+        job_ids = sorted(f[:-len(".json")] for f in os.listdir(job_dir) if f.endswith(".json"))
+        states = [_load_job(job, job_dir) for job in job_ids]
+        if not states:
+            return "No jobs found."
+        return "\n".join(
+            f"Job {s['id']}: {s['status']} (exit code: {s['exit_code']}) - {s['name']}" for s in states if s
+        )
+
+    state = _load_job(job_id, job_dir)
+    if state is None:
+        return f"Job {job_id} not found."
+
+    elapsed = (datetime.now() - datetime.fromisoformat(state["start_time"])).total_seconds()
+    log_size = os.path.getsize(state["log"]) if os.path.exists(state["log"]) else 0
+    return (f"Job {state['id']}: {state['status']}\n"
+            f"Command: {state['command']}\n"
+            f"Exit code: {state['exit_code']}\n"
+            f"Elapsed: {elapsed:.0f}s\n"
+            f"Log file: {state['log']} ({log_size} bytes)")
+
+
+def tail_job_log(job_id: str, lines: int = 30, job_dir: str = JOB_DIR):
+    """
+    Read the last lines of a background job's log, without reading the whole log file.
+
+    Args:
+        job_id (str): The job id.
+        lines (int): The number of lines to read from the end of the log, default is 30.
+        job_dir (str): The directory of the job states and logs.
+
+    Return: A string of the job status and the last lines of the log.
+    """
+    state = _load_job(job_id, job_dir)
+    if state is None:
+        return f"Job {job_id} not found."
+    if not os.path.exists(state["log"]):
+        return f"Job {job_id}: {state['status']}\nNo output yet."
+
+    block_size = 8192
+    with open(state["log"], 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b''
+        while position > 0 and data.count(b'\n') <= lines:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            data = f.read(read_size) + data
+
+    tail = deque(data.decode('utf-8', errors='replace').splitlines(), maxlen=lines)
+    return f"Job {job_id}: {state['status']} (exit code: {state['exit_code']})\nLast {len(tail)} lines:\n" + \
+        "\n".join(tail)
+
+
+def wait_job(job_id: str, timeout: float = 60, lines: int = 30, job_dir: str = JOB_DIR):
+    """
+    Wait for a background job to finish, up to a timeout, and return the last lines of its log.
+
+    Args:
+        job_id (str): The job id.
+        timeout (float): The maximum number of seconds to wait, default is 60.
+        lines (int): The number of log lines to return, default is 30.
+        job_dir (str): The directory of the job states and logs.
+
+    Return: A string of the job status and the last lines of the log.
+    """
+    deadline = time.monotonic() + float(timeout)
+    while True:
+        state = _load_job(job_id, job_dir)
+        if state is None:
+            return f"Job {job_id} not found."
+        if state["status"] != "running" or time.monotonic() >= deadline:
+            break
+        time.sleep(min(1.0, max(deadline - time.monotonic(), 0)))
+    return tail_job_log(job_id, lines=lines, job_dir=job_dir)
+
+
+def kill_job(job_id: str, job_dir: str = JOB_DIR):
+    """
+    Kill a running background job.
+
+    Args:
+        job_id (str): The job id.
+        job_dir (str): The directory of the job states and logs.
+
+    Return: A string of the result.
+    """
+    state = _load_job(job_id, job_dir)
+    if state is None:
+        return f"Job {job_id} not found."
+    if state["status"] != "running":
+        return f"Job {job_id} is not running ({state['status']})."
+
+    try:
+        if os.name == 'posix':
+            os.killpg(state["pid"], signal.SIGTERM)
+        else:
+            os.kill(state["pid"], signal.SIGTERM)
+    except ProcessLookupError:
+        pass
+
+    state.update({"status": "killed"})
+    _write_job(state, job_dir)
+    return f"Job {job_id} killed."
@@ -2,54 +2,300 @@
 Search API functions based on Tavily.
 """
 import os
+import re
+import json
+import time
+import hashlib
+import functools
+import threading
+from xml.etree import ElementTree
+from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from tavily import TavilyClient
-from xml.etree import ElementTree
 
+from mle.utils.papers import PaperIndex, to_paper
 
-def search_github_repos(query, limit=5):
+SEARCH_CACHE_DIR = os.path.join('.mle', 'search')
+# the time-to-live (in seconds) of the cached search results
+SEARCH_CACHE_TTL = 24 * 60 * 60
+# the (connect, read) timeouts (in seconds) of the search requests
+REQUEST_TIMEOUT = (5, 30)
+# the providers used by `multi_search` by default, `web` is added when the search key is set
+DEFAULT_PROVIDERS = ['local', 'arxiv', 'papers_with_code', 'github']
+# the providers whose results are added into the local paper index
+PAPER_PROVIDERS = ['arxiv', 'papers_with_code']
+# the number of good local matches to answer a paper search without the network
+LOCAL_MIN_MATCHES = 3
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
     """
-    Search GitHub public repositories based on a keyword.
+    Get the shared HTTP session, the connections are pooled and the transient errors are retried.
+    :return: the requests session.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(total=2, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504],
+                          allowed_methods=['GET'])
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=retry)
+            _session = requests.Session()
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+        return _session
 
-    :param query: The query to search for in repository names or descriptions.
-    :param limit: The total number of repositories to return.
-    :return: A list of dictionaries containing repository details, limited to the specified number.
+
+@functools.lru_cache(maxsize=4)
+def get_tavily_client(api_key: str) -> TavilyClient:
+    """
+    Get the (cached) Tavily client of an API key.
+    """
+    return TavilyClient(api_key=api_key)
+
+
+class SearchCache:
+    """
+    SearchCache: an on-disk TTL cache of the search results, keyed by the provider, the normalized query
+     and the search parameters, shared across the agents and the sessions of a project.
+    """
+
+    def __init__(self, cache_dir: str = SEARCH_CACHE_DIR, ttl: float = SEARCH_CACHE_TTL):
+        """
+        Args:
+            cache_dir: the directory to store the cached results.
+            ttl: the time-to-live (in seconds) of the cached results.
+        """
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        return re.sub(r'\s+', ' ', str(query)).strip().lower()
+
+    def _path(self, provider: str, query: str, params: Dict[str, Any]) -> str:
+        key = json.dumps([provider, self.normalize_query(query), params], sort_keys=True)
+        return os.path.join(self.cache_dir, f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.json")
+
+    def get(self, provider: str, query: str, params: Dict[str, Any]) -> Optional[Any]:
+        """
+        Get the cached results, or None if they are missing or expired.
+        """
+        try:
+            with open(self._path(provider, query, params), 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get('time', 0) > self.ttl:
+            return None
+        return entry.get('results')
+
+    def set(self, provider: str, query: str, params: Dict[str, Any], results: Any) -> None:
+        """
+        Store the results, the file is written atomically so concurrent readers never see a partial entry.
+        """
+        path = self._path(provider, query, params)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'w') as f:
+                json.dump({'time': time.time(), 'provider': provider, 'query': query, 'results': results}, f)
+            os.replace(temp_path, path)
+        except OSError:
+            pass  # the cache is best-effort
+
+
+def cached_search(provider: str):
+    """
+    Decorator to cache the results of a search provider in the `SearchCache`, the failed searches
+     (raised exceptions) are not cached.
+    :param provider: the provider name.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(query: str, limit: int):
+            cache = SearchCache()
+            params = {'limit': int(limit)}
+            results = cache.get(provider, query, params)
+            if results is None:
+                results = func(query, int(limit))
+                cache.set(provider, query, params, results)
+                if provider in PAPER_PROVIDERS:
+                    _index_papers(results, provider)
+            return results
+
+        return wrapper
+
+    return decorator
+
+
+@functools.lru_cache(maxsize=1)
+def get_paper_index() -> PaperIndex:
+    """
+    Get the (shared) local paper index.
+    """
+    return PaperIndex()
+
+
+def _index_papers(results: List[Dict[str, Any]], provider: str):
+    """
+    Add the papers found online into the local paper index, they are indexed in the background.
     """
+    try:
+        get_paper_index().add([to_paper(result, provider) for result in results], reindex=False)
+    except Exception:
+        pass  # the local index is best-effort
+
+
+def _local_papers(query: str, limit: int, good_only: bool = True) -> List[Dict[str, Any]]:
+    try:
+        index = get_paper_index()
+        return index.good_matches(query, limit) if good_only else index.search(query, limit)
+    except Exception:
+        return []
+
+
+def _format_papers(papers: List[Dict[str, Any]]) -> str:
+    output = ""
+    for paper in papers:
+        output += f"""
+        Title: {paper['title']}
+        Summary: {paper['abstract']}
+        Link: {paper['link']}
+        Published: {paper['published']}
+        Authors: {paper['authors']}
+        """
+        if paper.get('code'):
+            output += f"Code URL: {paper['code']}\n"
+    return output
+
+
+def _fetch_local(query: str, limit: int) -> List[Dict[str, Any]]:
+    return [
+        {**paper, "summary": paper['abstract'], "code": paper['code'] or None}
+        for paper in _local_papers(query, limit)
+    ]
+
+
+@cached_search('github')
+def _fetch_github_repos(query: str, limit: int) -> List[Dict[str, Any]]:
     repos = []
     per_page = 10
     page = 1
     while len(repos) < limit:
-        url = f'https://api.github.com/search/repositories?q={query}&per_page={per_page}&page={page}'
-
-        response = requests.get(url)
-
-        if response.status_code == 200:
-            items = response.json().get('items', [])
-            for item in items:
-                formatted_repo = {
-                    "name": f"{item['owner']['login']}/{item['name']}",
-                    "author": item['owner']['login'],
-                    "description": item['description'],
-                    "link": item['html_url']
-                }
-                repos.append(formatted_repo)
-                if len(repos) >= limit:
-                    break
-
-            if len(items) < per_page:  # Stop if there are no more repos to fetch
-                break
-            page += 1
-        else:
+        response = get_session().get(
+            'https://api.github.com/search/repositories',
+            params={'q': query, 'per_page': per_page, 'page': page},
+            timeout=REQUEST_TIMEOUT,
+        )
+        if response.status_code != 200:
             raise Exception(f"GitHub API request failed with status code {response.status_code}: {response.text}")
 
+        items = response.json().get('items', [])
+        for item in items[:limit - len(repos)]:
+            repos.append({
+                "title": f"{item['owner']['login']}/{item['name']}",
+                "author": item['owner']['login'],
+                "summary": item['description'],
+                "link": item['html_url'],
+            })
+        if len(items) < per_page:  # Stop if there are no more repos to fetch
+            break
+        page += 1
+    return repos
+
+
+@cached_search('arxiv')
+def _fetch_arxiv(query: str, limit: int) -> List[Dict[str, Any]]:
+    response = get_session().get(
+        'https://export.arxiv.org/api/query',
+        params={'search_query': query, 'start': 0, 'max_results': limit},
+        timeout=REQUEST_TIMEOUT,
+    )
+    if response.status_code != 200:
+        raise Exception(f"Unable to fetch data from arXiv (Status code: {response.status_code})")
+
+    namespace = '{http://www.w3.org/2005/Atom}'
+    papers = []
+    for entry in ElementTree.fromstring(response.content).findall(f'{namespace}entry'):
+        papers.append({
+            "title": entry.find(f'{namespace}title').text.strip(),
+            "summary": entry.find(f'{namespace}summary').text.strip(),
+            "link": entry.find(f'{namespace}id').text.strip(),
+            "published": entry.find(f'{namespace}published').text.strip(),
+            "authors": [author.find(f'{namespace}name').text for author in entry.findall(f'{namespace}author')],
+        })
+    return papers
+
+
+@cached_search('papers_with_code')
+def _fetch_papers_with_code(query: str, limit: int) -> List[Dict[str, Any]]:
+    response = get_session().get(
+        'https://paperswithcode.com/api/v1/search/',
+        params={'page': 1, 'q': query},
+        timeout=REQUEST_TIMEOUT,
+    )
+    if response.status_code != 200:
+        raise Exception("Failed to retrieve data from Papers With Code.")
+
+    papers = []
+    for result in response.json().get('results', [])[:limit]:
+        paper = result['paper']
+        repository = result.get('repository') or {}
+        papers.append({
+            "title": paper.get('title') or 'No title available',
+            "summary": paper.get('abstract') or 'No abstract available',
+            "link": paper.get('url_pdf') or 'No PDF available',
+            "code": repository.get('url') or 'No official code link available',
+        })
+    return papers
+
+
+@cached_search('web')
+def _fetch_web(query: str, limit: int) -> List[Dict[str, Any]]:
+    response = get_tavily_client(os.environ['SEARCH_API_KEY']).search(
+        query=query, search_depth="advanced", max_results=limit
+    )
+    return [
+        {"title": item.get('title'), "summary": item.get('content'), "link": item.get('url')}
+        for item in response.get('results', [])
+    ]
+
+
+SEARCH_PROVIDERS = {
+    'local': _fetch_local,
+    'arxiv': _fetch_arxiv,
+    'papers_with_code': _fetch_papers_with_code,
+    'github': _fetch_github_repos,
+    'web': _fetch_web,
+}
+
+
+def search_github_repos(query, limit=5):
+    """
+    Search GitHub public repositories based on a keyword.
+
+    :param query: The query to search for in repository names or descriptions.
+    :param limit: The total number of repositories to return.
+    :return: A list of dictionaries containing repository details, limited to the specified number.
+    """
+    repos = _fetch_github_repos(query, limit)
+
     return_str = """
     Here are some of the repositories I found on GitHub:
     """
 
     for repo in repos:
         return_str += f"""
-        Name: {repo['name']}
-        Description: {repo['description']}
+        Name: {repo['title']}
+        Description: {repo['summary']}
         Link: {repo['link']}
         """
 
@@ -62,71 +308,136 @@ def web_search(query: str):
     Args:
         query: The search query.
     """
+    cache = SearchCache()
+    response = cache.get('web_qna', query, {})
+    if response is not None:
+        return response
+
     try:
-        client = TavilyClient(api_key=os.environ['SEARCH_API_KEY'])
+        client = get_tavily_client(os.environ['SEARCH_API_KEY'])
         response = client.qna_search(query=query, search_depth="advanced")
-        return response
     except Exception as e:
         return f"Error performing web search: {str(e)}"
+    cache.set('web_qna', query, {}, response)
+    return response
+
+
+def search_local_papers(query: str, limit: int = 5):
+    """
+    Search the local (offline) paper index, which contains the ingested arXiv metadata and the papers
+     found by the previous searches.
+
+    Args:
+        query: The search query.
+        limit: The maximum number of papers to return.
+
+    Return: A string of the matched papers.
+    """
+    papers = _local_papers(query, limit, good_only=False)
+    if not papers:
+        return "No papers found in the local paper index."
+    return _format_papers(papers)
 
 
 def search_arxiv(query, max_results=8):
-    url = 'https://export.arxiv.org/api/query'
-    params = {
-        'search_query': query,
-        'start': 0,
-        'max_results': max_results
-    }
-    response = requests.get(url, params=params)
-    if response.status_code != 200:
-        return f"Error: Unable to fetch data from arXiv (Status code: {response.status_code})"
+    local = _local_papers(query, max_results)
+    if len(local) >= min(max_results, LOCAL_MIN_MATCHES):
+        return "(from the local paper index)" + _format_papers(local)
 
-    root = ElementTree.fromstring(response.content)
-    output = ""
-    for entry in root.findall('{http://www.w3.org/2005/Atom}entry'):
-        title = entry.find('{http://www.w3.org/2005/Atom}title').text
-        summary = entry.find('{http://www.w3.org/2005/Atom}summary').text
-        link = entry.find('{http://www.w3.org/2005/Atom}id').text
-        published = entry.find('{http://www.w3.org/2005/Atom}published').text
-        authors = [author.find('{http://www.w3.org/2005/Atom}name').text for author in
-                   entry.findall('{http://www.w3.org/2005/Atom}author')]
+    try:
+        papers = _fetch_arxiv(query, max_results)
+    except Exception as e:
+        if local:
+            return f"(arXiv is unavailable: {str(e)}, from the local paper index)" + _format_papers(local)
+        return f"Error: {str(e)}"
 
+    output = ""
+    for paper in papers:
         output += f"""
-        Title: {title.strip()}
-        Summary: {summary.strip()}
-        Link: {link.strip()}
-        Published: {published.strip()}
-        Authors: {authors}
+        Title: {paper['title']}
+        Summary: {paper['summary']}
+        Link: {paper['link']}
+        Published: {paper['published']}
+        Authors: {paper['authors']}
         """
 
     return output
 
 
 def search_papers_with_code(query: str, k: int = 8) -> str:
-    url = f"https://paperswithcode.com/api/v1/search/"
-    response = requests.get(url, params={'page': 1, 'q': query})
-    if response.status_code != 200:
-        return "Failed to retrieve data from Papers With Code."
+    local = [paper for paper in _local_papers(query, k) if paper.get('code')]
+    if len(local) >= min(int(k), LOCAL_MIN_MATCHES):
+        return "(from the local paper index)" + _format_papers(local)
+
+    try:
+        papers = _fetch_papers_with_code(query, k)
+    except Exception as e:
+        if local:
+            return f"(Papers With Code is unavailable: {str(e)}, from the local paper index)" + _format_papers(local)
+        return str(e)
 
-    data = response.json()
-    if 'results' not in data:
+    if not papers:
         return "No results found for the given query."
 
-    results = data['results'][:int(k)]  # Get top-k results
-    result_strings = []
+    return "\n".join(
+        f"Title: {paper['title']}\nAbstract:{paper['summary']}\nPaper URL: {paper['link']}\nCode URL: {paper['code']}\n"
+        for paper in papers
+    )
+
+
+def multi_search(query: str, providers: Optional[List[str]] = None, limit: int = 5):
+    """
+    Search several providers concurrently with the same query, and merge the results. The results found
+     by multiple providers (e.g., the same paper on arXiv and Papers With Code) are merged into one.
+
+    Args:
+        query: The search query.
+        providers: The providers to search, from 'local', 'arxiv', 'papers_with_code', 'github' and 'web'.
+         Defaults to all the available providers.
+        limit: The maximum number of results from each provider.
+
+    Return: A string of the merged results, with the providers which found each result.
+    """
+    if not providers:
+        providers = DEFAULT_PROVIDERS + (['web'] if os.environ.get('SEARCH_API_KEY') else [])
+    unknown = [provider for provider in providers if provider not in SEARCH_PROVIDERS]
+    if unknown:
+        return f"Error: unknown search providers {unknown}, choose from {list(SEARCH_PROVIDERS)}."
+
+    def _search(provider):
+        try:
+            return SEARCH_PROVIDERS[provider](query, limit), None
+        except Exception as e:
+            return [], str(e)
+
+    with ThreadPoolExecutor(max_workers=len(providers)) as executor:
+        responses = list(executor.map(_search, providers))
 
+    merged = {}
+    errors = []
+    for provider, (results, error) in zip(providers, responses):
+        if error:
+            errors.append(f"{provider}: {error}")
+        for result in results:
+            key = SearchCache.normalize_query(result.get('title') or result.get('link'))
+            if key in merged:
+                merged[key]['providers'].append(provider)
+                merged[key].setdefault('code', result.get('code'))
+            else:
+                merged[key] = {**result, 'providers': [provider]}
+
+    if not merged:
+        return "No results found for the given query." + (f"\nErrors: {'; '.join(errors)}" if errors else "")
+
+    # the results found by more providers first, the provider order is kept otherwise
+    results = sorted(merged.values(), key=lambda item: len(item['providers']), reverse=True)
+    output = []
     for result in results:
-        paper = result['paper']
-        paper_title = paper.get('title', 'No title available')
-        abstract = paper.get('abstract', 'No abstract available')
-        paper_pdf_url = paper.get('url_pdf', 'No PDF available')
-        repository = result.get('repository', [])
-        if repository:
-            code_url = repository.get('url', 'No official code link available')
-        else:
-            code_url = 'No official code link available'
-
-        result_string = f"Title: {paper_title}\nAbstract:{abstract}\nPaper URL: {paper_pdf_url}\nCode URL: {code_url}\n"
-        result_strings.append(result_string)
-
-    return "\n".join(result_strings)
+        summary = (result.get('summary') or '').strip().replace('\n', ' ')
+        entry = f"Title: {result['title']}\nSources: {', '.join(result['providers'])}\nLink: {result['link']}\n"
+        if result.get('code'):
+            entry += f"Code URL: {result['code']}\n"
+        output.append(entry + f"Summary: {summary[:500]}\n")
+    if errors:
+        output.append(f"Errors: {'; '.join(errors)}")
+    return "\n".join(output)
@@ -1,4 +1,4 @@
 from .local_git import GitIntegration
 from .github import GitHubIntegration, github_login
 from .google_calendar import GoogleCalendarIntegration, google_calendar_login
-from .kaggle import KaggleIntegration
+from .kaggle import KaggleIntegration, describe_download
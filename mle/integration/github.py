@@ -1,10 +1,21 @@
 import os
+import json
 import base64
+import hashlib
 import requests
 import questionary
 from fnmatch import fnmatch
 from datetime import datetime, timezone, timedelta
 
+from mle.utils.cache import SharedCache
+
+
+def get_cache_ttl() -> float:
+    """
+    The seconds to cache the GitHub API responses (`MLE_GITHUB_CACHE_TTL`), 0 disables the cache.
+    """
+    return float(os.environ.get("MLE_GITHUB_CACHE_TTL", 0))
+
 
 def github_login():
     """
@@ -41,9 +52,23 @@ class GitHubIntegration:
         :return: The JSON response from the request.
         """
         url = f"{self.BASE_URL}/repos/{self.github_repo}" + (f"/{endpoint}" if endpoint else "")
+        ttl = get_cache_ttl()
+        if ttl > 0:
+            # the token is part of the key, so private data is only served to the same token
+            key = "github:" + hashlib.sha256(
+                json.dumps([url, params, self.headers["Authorization"]], sort_keys=True).encode("utf-8")
+            ).hexdigest()
+            cache = SharedCache(ttl=ttl)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+
         response = requests.get(url, headers=self.headers, params=params)
         response.raise_for_status()
-        return response.json()
+        result = response.json()
+        if ttl > 0:
+            cache.set(key, result)
+        return result
 
     def _process_items(self, endpoint, start_date=None, end_date=None, username=None, limit=None):
         """
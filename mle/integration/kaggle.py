@@ -1,8 +1,246 @@
 import os
 import json
+import time
+import base64
+import hashlib
+import threading
 import requests
 import questionary
-from zipfile import ZipFile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, Dict, Any, List
+
+from mle.utils.archive import extract_archive, detect_archive_format
+
+KAGGLE_API_URL = "https://www.kaggle.com/api/v1"
+# the manifest of the downloaded files, kept in the download directory
+DOWNLOAD_MANIFEST = ".mle_download.json"
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_TIMEOUT = (10, 60)
+OVERVIEW_CACHE_DIR = os.path.join('.mle', 'kaggle', 'overviews')
+# the number of seconds a cached overview is used without fetching (`MLE_OVERVIEW_TTL`)
+OVERVIEW_TTL = float(os.environ.get('MLE_OVERVIEW_TTL', 7 * 24 * 3600))
+OVERVIEW_MAX_RETRIES = 4
+OVERVIEW_BACKOFF = 2.0
+
+
+def _file_md5(path: str) -> str:
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _archive_suffix(path: str, name: str) -> str:
+    """
+    The suffix to add to a downloaded file, Kaggle may serve a file compressed (e.g., `train.csv` as a zip
+     archive), which must not be extracted over itself.
+    """
+    try:
+        archive_format = detect_archive_format(path)
+    except ValueError:
+        return ''
+    suffix = {'zip': '.zip', '7z': '.7z', 'tar': '.tar'}.get(archive_format, '')
+    if not suffix or suffix in name.lower():
+        return ''
+    return suffix
+
+
+class KaggleDownloader:
+    """
+    KaggleDownloader: downloads the files of a competition one by one, in parallel, resuming the
+     partial downloads (HTTP range requests), verifying the sizes and the MD5 checksums, and extracting
+     each archive as soon as it is downloaded. The state is kept in a manifest, so an intact download
+     directory is reused without any network request.
+    """
+
+    def __init__(self, auth: tuple, download_dir: str, workers: int = 4):
+        """
+        :param auth: the Kaggle (username, key).
+        :param download_dir: the directory to save the files.
+        :param workers: the number of files downloaded at the same time.
+        """
+        self.auth = auth
+        self.download_dir = download_dir
+        self.workers = workers
+        self.manifest_path = os.path.join(download_dir, DOWNLOAD_MANIFEST)
+        self._lock = threading.Lock()
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self.manifest_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"competition": None, "files": {}}
+
+    def _save_manifest(self):
+        """
+        Save the manifest atomically. (Call with the lock held)
+        """
+        temp_path = self.manifest_path + ".tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(temp_path, self.manifest_path)
+
+    def _update(self, name: str, **fields):
+        with self._lock:
+            self.manifest["files"].setdefault(name, {}).update(fields)
+            self._save_manifest()
+
+    def is_intact(self, competition: str) -> bool:
+        """
+        Check if all the files of the competition are downloaded, verified and extracted.
+        """
+        files = self.manifest.get("files") or {}
+        if self.manifest.get("competition") != competition or not self.manifest.get("complete") or not files:
+            return False
+        for entry in files.values():
+            path = os.path.join(self.download_dir, entry.get("file") or "")
+            if not entry.get("verified") or not os.path.isfile(path) or os.path.getsize(path) != entry.get("size"):
+                return False
+        return True
+
+    def list_files(self, competition: str) -> List[str]:
+        """
+        List the data files of a competition.
+        """
+        names, page_token = [], None
+        while True:
+            response = requests.get(
+                f"{KAGGLE_API_URL}/competitions/data/list/{competition}",
+                params={"pageToken": page_token} if page_token else None,
+                auth=self.auth,
+                timeout=DOWNLOAD_TIMEOUT,
+            )
+            response.raise_for_status()
+            result = response.json()
+            # the older API returns a list, the newer one pages the files
+            files = result if isinstance(result, list) else result.get("files") or []
+            names += [file.get("name") or file.get("ref") for file in files]
+            page_token = None if isinstance(result, list) else result.get("nextPageToken")
+            if not page_token:
+                return names
+
+    def _download_file(self, competition: str, name: str) -> Dict[str, Any]:
+        """
+        Download (or resume) a file, verify it and extract it if it is an archive.
+        """
+        entry = dict(self.manifest["files"].get(name) or {})
+        target = os.path.join(self.download_dir, entry.get("file") or name)
+        if entry.get("verified") and os.path.isfile(target) and os.path.getsize(target) == entry.get("size"):
+            downloaded = 0
+        else:
+            part_path = os.path.join(self.download_dir, name.replace('/', '_') + ".part")
+            offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+            headers = {"Range": f"bytes={offset}-"} if offset else {}
+            url = f"{KAGGLE_API_URL}/competitions/data/download/{competition}/{name}"
+            with requests.get(url, auth=self.auth, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+                if response.status_code == 416:
+                    # the partial file may be complete, but the response has neither the size nor the checksum
+                    #  of the file, so they are read from the headers of a plain request (its body is not read)
+                    with requests.get(url, auth=self.auth, stream=True, timeout=DOWNLOAD_TIMEOUT) as probe:
+                        probe.raise_for_status()
+                        total = int(probe.headers.get("Content-Length") or 0)
+                        hash_header = probe.headers.get("x-goog-hash", "")
+                    if not total and "md5=" not in hash_header:
+                        os.remove(part_path)
+                        raise IOError(f"Unable to verify the partial download of {name}, it has been removed.")
+                else:
+                    response.raise_for_status()
+                    if response.status_code != 206:
+                        offset = 0  # the server ignored the range, start over
+                    content_range = response.headers.get("Content-Range", "")
+                    if '/' in content_range and content_range.rsplit('/', 1)[1].isdigit():
+                        total = int(content_range.rsplit('/', 1)[1])
+                    else:
+                        total = offset + int(response.headers.get("Content-Length") or 0)
+                    with open(part_path, 'ab' if offset else 'wb') as f:
+                        for block in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                            f.write(block)
+                    hash_header = response.headers.get("x-goog-hash", "")
+                # the storage reports the MD5 checksum of the whole file, e.g., `crc32c=...,md5=...`
+                goog_hash = dict(item.strip().split('=', 1) for item in hash_header.split(',') if '=' in item)
+
+            size = os.path.getsize(part_path)
+            if total and size > total:
+                os.remove(part_path)
+                raise IOError(f"The partial download of {name} is larger than the file, it has been removed.")
+            if total and size != total:
+                raise IOError(f"Incomplete download of {name}: {size} of {total} bytes.")
+            md5 = _file_md5(part_path)
+            if "md5" in goog_hash and base64.b64decode(goog_hash["md5"]).hex() != md5:
+                os.remove(part_path)
+                raise IOError(f"Checksum mismatch of {name}, the partial download has been removed.")
+
+            target = os.path.join(self.download_dir, name + _archive_suffix(part_path, name))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(part_path, target)
+            downloaded = size - offset
+            entry = {"file": os.path.relpath(target, self.download_dir), "size": size, "md5": md5,
+                     "verified": True, "extracted": False}
+            self._update(name, **entry)
+
+        if not entry.get("extracted"):
+            try:
+                detect_archive_format(target)
+            except ValueError:
+                pass  # not an archive
+            else:
+                extract_archive(target, os.path.dirname(target), verbose=False)
+            self._update(name, extracted=True)
+        return {"name": name, "downloaded": downloaded}
+
+    def download(self, competition: str, force: bool = False) -> Dict[str, Any]:
+        """
+        Download all the files of a competition.
+        :param competition: the competition name.
+        :param force: re-check the files with the server even if the download directory is intact.
+        :return: the download statistics.
+        """
+        os.makedirs(self.download_dir, exist_ok=True)
+        if not force and self.is_intact(competition):
+            return {"files": len(self.manifest["files"]), "downloaded": 0, "skipped_network": True}
+
+        if self.manifest.get("competition") != competition:
+            self.manifest = {"competition": competition, "files": {}}
+        self.manifest["complete"] = False
+        names = self.list_files(competition)
+
+        downloaded, errors = 0, {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self._download_file, competition, name): name for name in names}
+            for future in as_completed(futures):
+                try:
+                    downloaded += future.result()["downloaded"]
+                except Exception as e:
+                    errors[futures[future]] = str(e)
+
+        with self._lock:
+            self.manifest["complete"] = not errors
+            self._save_manifest()
+        if errors:
+            raise IOError(f"Failed to download {len(errors)} files (re-run to resume): {errors}")
+        return {"files": len(names), "downloaded": downloaded, "skipped_network": False}
+
+
+def describe_download(stats: Dict[str, Any]) -> List[str]:
+    """
+    Describe the statistics of `KaggleIntegration.download_competition_dataset`.
+    :param stats: the download statistics.
+    :return: the lines to print.
+    """
+    competition = stats["competition"]
+    if "fallback" in stats:
+        lines = [f"Unable to list the files of {competition} ({stats['fallback']}), downloaded the whole bundle."]
+        for file, extracted in stats["extracted"].items():
+            lines.append(f"Extracted {file}: {extracted['extracted']} files ({extracted['throughput_mb_s']} MB/s), "
+                         f"{extracted['skipped']} files up to date")
+        return lines
+    if stats["skipped_network"]:
+        return [f"The dataset of {competition} is up to date ({stats['files']} files)."]
+    return [f"Downloaded {stats['files']} files of {competition} "
+            f"({stats['downloaded'] / 1024 / 1024:.1f} MB transferred)."]
 
 
 class KaggleIntegration:
@@ -35,44 +273,109 @@ class KaggleIntegration:
         return tuple([comp.ref for comp in competitions])
 
     def download_competition_dataset(
-            self, competition: str, download_dir: str = "./data"
+            self, competition: str, download_dir: str = "./data", workers: int = 4, force: bool = False
     ):
         """
-        Downloads and extracts the dataset for a specific competition.
+        Downloads and extracts the dataset for a specific competition. The files are downloaded in parallel
+         and resumed if interrupted, and an intact download directory is reused without any network request.
         :param competition: The URL or name of the Kaggle competition.
         :param download_dir: Directory to save the downloaded files. Defaults to './data'.
-        :return: The directory where the dataset has been downloaded and extracted.
+        :param workers: The number of files downloaded at the same time.
+        :param force: Re-check the files with Kaggle even if the download directory is intact.
+        :return: The directory where the dataset has been downloaded and extracted, and the download
+         statistics (see `describe_download`).
         """
         if competition.startswith("https://www.kaggle.com/competitions/"):
             competition = competition.split("/")[-1]
 
         os.makedirs(download_dir, exist_ok=True)
+        downloader = KaggleDownloader(self._auth(), download_dir, workers=workers)
+        try:
+            stats = downloader.download(competition, force=force)
+            return download_dir, {"competition": competition, **stats}
+        except requests.exceptions.HTTPError as e:
+            if e.request is None or "/competitions/data/list/" not in e.request.url:
+                raise
+            stats = {"competition": competition, "fallback": str(e), "extracted": {}}
+
         self.api.competition_download_files(competition, path=download_dir)
 
-        # Unzip downloaded files
+        # Unzip downloaded files, the members are extracted in parallel and the extracted ones are skipped
         for file in os.listdir(download_dir):
             if file.endswith(".zip"):
-                with ZipFile(os.path.join(download_dir, file), "r") as zip_ref:
-                    zip_ref.extractall(download_dir)
-        return download_dir
+                stats["extracted"][file] = extract_archive(os.path.join(download_dir, file), download_dir)
+        return download_dir, stats
 
-    def fetch_competition_overview(self, competition: str):
+    def _auth(self) -> tuple:
+        """
+        The Kaggle (username, key) used by the direct API requests.
         """
-        Fetches competition overview information using the Kaggle API.
+        config = getattr(self.api, "config_values", None) or {}
+        username = config.get("username") or os.environ.get("KAGGLE_USERNAME")
+        key = config.get("key") or os.environ.get("KAGGLE_KEY")
+        if not (username and key):
+            kaggle_file = os.path.join(os.path.expanduser("~"), ".kaggle", "kaggle.json")
+            with open(kaggle_file, "r") as f:
+                credentials = json.load(f)
+            username, key = credentials["username"], credentials["key"]
+        return username, key
+
+    def fetch_competition_overview(
+            self,
+            competition: str,
+            local_path: Optional[str] = None,
+            ttl: float = OVERVIEW_TTL,
+            force: bool = False,
+    ):
+        """
+        Fetches the competition overview (markdown) with the Jina reader. The overview is cached per competition
+         under `.mle/kaggle/overviews/`, and the timeouts, the connection errors and the server errors are
+         retried with exponential backoff.
         :param competition: The URL or name of the Kaggle competition.
-        :return: A dictionary containing competition overview information, or None if not found.
+        :param local_path: A local markdown file of the overview, read instead of fetching.
+        :param ttl: The number of seconds the cached overview is used without fetching.
+        :param force: Fetch the overview even if the cache is fresh.
+        :return: The competition overview in markdown.
         """
-        for _ in range(3):  # Retry 3 times if the request fails
+        if local_path:
+            with open(local_path, 'r', encoding='utf-8') as f:
+                return f.read()
+
+        slug = competition.rstrip("/").split("/")[-1]
+        cache_path = os.path.join(OVERVIEW_CACHE_DIR, f"{slug}.md")
+        if not force and os.path.exists(cache_path) and time.time() - os.path.getmtime(cache_path) < ttl:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                return f.read()
+
+        reader_url = f"https://r.jina.ai/https://www.kaggle.com/competitions/{slug}/overview/description"
+        error = None
+        for attempt in range(OVERVIEW_MAX_RETRIES):
+            if attempt:
+                time.sleep(OVERVIEW_BACKOFF * 2 ** (attempt - 1))
             try:
-                reader_url = f"https://r.jina.ai/{competition}/overview/description"
                 response = requests.get(
                     reader_url,
-                    timeout=30,
+                    timeout=(10, 30),
                     headers={"X-Return-Format": "markdown"},
                 )
                 response.raise_for_status()
-                overview = response.text
-                break
-            except requests.exceptions.HTTPError:
-                continue
-        return overview.encode('utf-8', 'ignore').decode('utf-8')
+                overview = response.text.encode('utf-8', 'ignore').decode('utf-8')
+                os.makedirs(OVERVIEW_CACHE_DIR, exist_ok=True)
+                temp_path = f"{cache_path}.{os.getpid()}.tmp"
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    f.write(overview)
+                os.replace(temp_path, cache_path)
+                return overview
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                error = e
+            except requests.exceptions.HTTPError as e:
+                error = e
+                # only the rate limits and the server errors are worth retrying
+                if e.response is not None and e.response.status_code < 500 and e.response.status_code != 429:
+                    break
+
+        if os.path.exists(cache_path):
+            print(f"Unable to fetch the overview of {slug} ({error}), using the cached one.")
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                return f.read()
+        raise ConnectionError(f"Unable to fetch the overview of {slug}: {error}")
@@ -6,6 +6,11 @@ from .openai import *
 from .gemini import *
 from .vllm import *
 
+import os
+import time
+import threading
+from typing import Optional
+
 from mle.utils import get_config
 
 
@@ -18,6 +23,42 @@ MODEL_GEMINI = 'Gemini'
 MODEL_VLLM = 'vLLM'
 
 
+class TokenBudgetExceeded(Exception):
+    """
+    Raised when a model is queried after the token budget of the process has been used up.
+    """
+
+
+class TokenBudget:
+    """
+    The token usage of the models in this process, with an optional limit (`MLE_TOKEN_BUDGET`).
+    """
+
+    def __init__(self, limit: Optional[int] = None):
+        """
+        Args:
+            limit: the maximum number of tokens (input and output), None means no limit.
+        """
+        self.limit = limit
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def charge(self, num_tokens: int):
+        # the agents of a parallel workflow share the budget
+        with self._lock:
+            self.used += num_tokens
+
+    def check(self):
+        """
+        Raise `TokenBudgetExceeded` if the budget has been used up.
+        """
+        if self.limit is not None and self.used >= self.limit:
+            raise TokenBudgetExceeded(f"The token budget ({self.limit}) has been used up ({self.used} tokens).")
+
+
+token_budget = TokenBudget(int(os.environ["MLE_TOKEN_BUDGET"]) if os.environ.get("MLE_TOKEN_BUDGET") else None)
+
+
 class ObservableModel:
     """
     A class that wraps a model to make it trackable by the metric platform (e.g., Langfuse).
@@ -37,14 +78,62 @@ class ObservableModel:
             model: The model to be wrapped and made observable.
         """
         self.model = model
+        self.stream_metrics = {}
+
+    def _charge(self, previous_usage, fallback_tokens: int = 0):
+        """
+        Charge the token usage of the latest completion to the process token budget, the backends
+         which do not report the usage are charged with the fallback estimate.
+        """
+        usage = getattr(self.model, "usage", None) or {}
+        tokens = 0
+        if usage is not previous_usage:
+            tokens = usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+        token_budget.charge(tokens or fallback_tokens)
 
     @_observe
     def query(self, *args, **kwargs):
-        return self.model.query(*args, **kwargs)
+        token_budget.check()
+        previous_usage = getattr(self.model, "usage", None)
+        try:
+            return self.model.query(*args, **kwargs)
+        finally:
+            self._charge(previous_usage)
 
     @_observe
     def stream(self, *args, **kwargs):
-        return self.model.query(*args, **kwargs)
+        """
+        Stream the output from the wrapped model chunk by chunk. The time-to-first-token and
+        the throughput are recorded in `stream_metrics` once the consumer stops iterating.
+        """
+        token_budget.check()
+        previous_usage = getattr(self.model, "usage", None)
+        start_time = time.perf_counter()
+        first_token_time = None
+        num_chunks = 0
+        stream = self.model.stream(*args, **kwargs)
+        try:
+            for chunk in stream:
+                if first_token_time is None:
+                    first_token_time = time.perf_counter()
+                if chunk:
+                    num_chunks += 1
+                yield chunk
+        finally:
+            # close the backend stream so the underlying HTTP connection is released early
+            if hasattr(stream, "close"):
+                stream.close()
+            end_time = time.perf_counter()
+            ttft = first_token_time - start_time if first_token_time is not None else None
+            generation_time = end_time - first_token_time if first_token_time is not None else 0.0
+            self.stream_metrics = {
+                "time_to_first_token": ttft,
+                "total_time": end_time - start_time,
+                # each streamed delta approximates one token
+                "output_tokens": num_chunks,
+                "tokens_per_second": num_chunks / generation_time if generation_time > 0 else None,
+            }
+            self._charge(previous_usage, fallback_tokens=num_chunks)
 
 
 def load_model(project_dir: str, model_name: str=None, observable=True):
@@ -61,42 +61,91 @@ class ClaudeModel(Model):
             },
         ])
 
-    def query(self, chat_history, **kwargs):
+    @staticmethod
+    def _build_system_blocks(chat_history, **kwargs):
         """
-        Query the LLM model.
-
-        Args:
-            chat_history: The context (chat history).
+        Build the system prompt blocks, with a prompt-cache breakpoint on the last stable block.
         """
         # claude has not system role in chat_history
         # https://docs.anthropic.com/en/docs/build-with-claude/prompt-engineering/system-prompts
-        system_prompt = ""
-        for idx, msg in enumerate(chat_history):
-            if msg["role"] == "system":
-                system_prompt += msg["content"]
+        system_blocks = [
+            {"type": "text", "text": msg["content"]}
+            for msg in chat_history if msg["role"] == "system" and msg["content"]
+        ]
+        if system_blocks:
+            system_blocks[-1]["cache_control"] = {"type": "ephemeral"}
 
-        # claude does not support mannual `response_format`, so we append it into system prompt
+        # claude does not support mannual `response_format`, so we append it into system prompt,
+        # after the cache breakpoint to keep the cached prefix identical across calls
         if "response_format" in kwargs.keys():
-            system_prompt += (
-                f"\nOutputs only valid {kwargs['response_format']['type']} without any explanatory words"
-            )
+            system_blocks.append({
+                "type": "text",
+                "text": f"Outputs only valid {kwargs['response_format']['type']} without any explanatory words"
+            })
+        return system_blocks
+
+    @staticmethod
+    def _build_tools(functions):
+        """
+        Map the openai function_schema to claude tool_schema, with a prompt-cache breakpoint on the last tool.
+        """
+        tools = []
+        for func in functions or []:
+            tool = {k: v for k, v in func.items() if k != "parameters"}
+            if "parameters" in func.keys():
+                tool["input_schema"] = func["parameters"]
+            tools.append(tool)
+        if tools:
+            tools[-1]["cache_control"] = {"type": "ephemeral"}
+        return tools
 
-        # mapping the openai function_schema to claude tool_schema
-        tools = kwargs.get("functions",[])
-        for tool in tools:
-            if "parameters" in tool.keys():
-                tool["input_schema"] = tool["parameters"]
-                del tool["parameters"]
+    @staticmethod
+    def _build_messages(chat_history):
+        """
+        Build the conversation messages, with a prompt-cache breakpoint on the latest message, so that
+         the next turn (e.g., the next debug iteration) can read the whole conversation from the cache.
+        """
+        messages = [msg for msg in chat_history if msg["role"] != "system"]
+        if messages:
+            last = dict(messages[-1])
+            content = last.get("content")
+            if isinstance(content, str) and content:
+                last["content"] = [{"type": "text", "text": content, "cache_control": {"type": "ephemeral"}}]
+            elif isinstance(content, list) and content:
+                last["content"] = content[:-1] + [dict(content[-1], cache_control={"type": "ephemeral"})]
+            messages[-1] = last
+        return messages
 
+    def _update_usage(self, usage):
+        """
+        Record the token usage of the latest completion, including the prompt-cache hits.
+        """
+        if usage is None:
+            return
+        self.usage = {
+            "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+            "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+            "cache_read_tokens": getattr(usage, "cache_read_input_tokens", 0) or 0,
+            "cache_write_tokens": getattr(usage, "cache_creation_input_tokens", 0) or 0,
+        }
+
+    def query(self, chat_history, **kwargs):
+        """
+        Query the LLM model.
+
+        Args:
+            chat_history: The context (chat history).
+        """
         completion = self.client.messages.create(
             max_tokens=4096,
             model=self.model,
-            system=system_prompt,
-            messages=[msg for msg in chat_history if msg["role"] != "system"],
+            system=self._build_system_blocks(chat_history, **kwargs),
+            messages=self._build_messages(chat_history),
             temperature=self.temperature,
             stream=False,
-            tools=tools,
+            tools=self._build_tools(kwargs.get("functions", [])),
         )
+        self._update_usage(completion.usage)
         if completion.stop_reason == "tool_use":
             for func in completion.content:
                 if func.type != "tool_use":
@@ -121,24 +170,13 @@ class ClaudeModel(Model):
         Args:
             chat_history: The context (chat history).
         """
-        # claude has not system role in chat_history
-        # https://docs.anthropic.com/en/docs/build-with-claude/prompt-engineering/system-prompts
-        system_prompt = ""
-        for idx, msg in enumerate(chat_history):
-            if msg["role"] == "system":
-                system_prompt += msg["content"]
-        chat_history = [msg for msg in chat_history if msg["role"] != "system"]
-
-        # claude does not support mannual `response_format`, so we append it into system prompt
-        if "response_format" in kwargs.keys():
-            system_prompt += (
-                f"\nOutputs only valid {kwargs['response_format']['type']} without any explanatory words"
-            )
-
         with self.client.messages.stream(
             max_tokens=4096,
             model=self.model,
-            messages=chat_history,
+            system=self._build_system_blocks(chat_history, **kwargs),
+            messages=self._build_messages(chat_history),
+            temperature=self.temperature,
         ) as stream:
             for chunk in stream.text_stream:
                 yield chunk
+            self._update_usage(stream.get_final_message().usage)
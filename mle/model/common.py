@@ -8,6 +8,8 @@ class Model(ABC):
         Initialize the model.
         """
         self.model_type = None
+        # token usage of the latest completion, including the prompt-cache hits if reported
+        self.usage = {}
 
     @abstractmethod
     def query(self, chat_history, **kwargs):
@@ -37,6 +37,19 @@ class OpenAIModel(Model):
         )
         self.func_call_history = []
 
+    def _update_usage(self, usage):
+        """
+        Record the token usage of the latest completion, including the prompt-cache hits.
+        """
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        self.usage = {
+            "input_tokens": usage.prompt_tokens,
+            "output_tokens": usage.completion_tokens,
+            "cache_read_tokens": (getattr(details, "cached_tokens", 0) or 0) if details else 0,
+        }
+
     def query(self, chat_history, **kwargs):
         """
         Query the LLM model.
@@ -52,6 +65,7 @@ class OpenAIModel(Model):
             stream=False,
             **parameters
         )
+        self._update_usage(completion.usage)
 
         resp = completion.choices[0].message
         if resp.function_call:
@@ -83,8 +97,14 @@ class OpenAIModel(Model):
                 messages=chat_history,
                 temperature=self.temperature,
                 stream=True,
+                stream_options={"include_usage": True},
                 **kwargs
         ):
+            # the usage (with the cached prompt tokens) comes in the final chunk without choices
+            if not chunk.choices:
+                self._update_usage(chunk.usage)
+                continue
+
             delta = chunk.choices[0].delta
             if delta.function_call:
                 if delta.function_call.name:
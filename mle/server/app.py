@@ -1,16 +1,36 @@
 import os
-import json
+import time
+import uuid
+import threading
 from typing import Optional
-from datetime import datetime
+from collections import OrderedDict
 from pydantic import BaseModel
-from fastapi import FastAPI, HTTPException, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse, Response, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
+from starlette.routing import Match
 
-from mle.workflow import report
+from mle.workflow import report, report_stream
 from mle.utils import check_config
+from mle.utils.reports import ReportStore
+from mle.server.jobs import JobStore, JobQueue, QueueFullError
+from mle.server.streaming import stream_events
+from mle.server.metrics import RequestMetrics
+
+# the number of chat sessions kept in memory, the least recently used ones are dropped
+MAX_CHAT_SESSIONS = 32
 
 app = FastAPI()
+_job_queue = None
+_report_store = None
+_metrics = None
+# guard the creation of the server singletons, as the sync handlers run in the threadpool
+_job_queue_lock = threading.Lock()
+_report_store_lock = threading.Lock()
+_metrics_lock = threading.Lock()
+_chat_sessions = OrderedDict()
+_chat_sessions_lock = threading.Lock()
 
 # Add CORS middleware
 app.add_middleware(
@@ -32,6 +52,126 @@ class ReportRequest(BaseModel):
     okr: Optional[str] = None
 
 
+class ChatRequest(BaseModel):
+    """
+    ChatRequest: the request body for chatting with the agent
+    """
+    message: str
+    session_id: Optional[str] = None
+
+
+def get_job_queue() -> JobQueue:
+    """
+    get_job_queue: get the job queue of the server process, created on the first use.
+    :return: the job queue.
+    """
+    global _job_queue
+    if _job_queue is not None:
+        return _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            store = JobStore()
+            store.recover()
+            _job_queue = JobQueue(store)
+        return _job_queue
+
+
+def get_metrics() -> RequestMetrics:
+    """
+    get_metrics: get the request metrics of the server process, created on the first use.
+    :return: the request metrics.
+    """
+    global _metrics
+    if _metrics is not None:
+        return _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = RequestMetrics()
+        return _metrics
+
+
+@app.on_event("shutdown")
+def shutdown_job_queue():
+    """
+    shutdown_job_queue: wait for the running jobs, and cancel the queued ones.
+    """
+    if _job_queue is not None:
+        _job_queue.shutdown(wait=True)
+    if _metrics is not None:
+        _metrics.remove()
+
+
+@app.middleware("http")
+async def record_metrics(request: Request, call_next):
+    """
+    record_metrics: record the latency of each request (the time to the response headers for the streams).
+    """
+    route = "unmatched"
+    for candidate in app.router.routes:
+        match, _ = candidate.matches(request.scope)
+        if match == Match.FULL:
+            route = candidate.path
+            break
+
+    metrics = get_metrics()
+    metrics.start()
+    start, status = time.perf_counter(), 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        metrics.observe(request.method, route, status, time.perf_counter() - start)
+
+
+def submit_report_job(report_request: ReportRequest):
+    """
+    submit_report_job: submit a report generation job, the identical in-flight requests share one job.
+    :param report_request: the report request.
+    :return: the job and whether it was de-duplicated.
+    """
+    try:
+        return get_job_queue().submit(
+            "report",
+            {"repo": report_request.repo, "username": report_request.username, "okr": report_request.okr},
+            report,
+            os.getcwd(),
+            report_request.repo,
+            report_request.username,
+            report_request.token,
+            okr_str=report_request.okr,
+            model="gpt-4o",
+            secrets={"token": report_request.token},
+        )
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+
+def get_chat_session(session_id: Optional[str] = None):
+    """
+    get_chat_session: get a chat session, or create a new one if the id is unknown. The agents only read the
+     project, the clients of the server can not run commands or write files on the host.
+    :param session_id: the session id.
+    :return: the session id, the chat agent and the lock of the session.
+    """
+    from rich.console import Console
+    from mle.agents import ChatAgent
+    from mle.model import load_model
+
+    with _chat_sessions_lock:
+        if session_id in _chat_sessions:
+            _chat_sessions.move_to_end(session_id)
+            return (session_id, *_chat_sessions[session_id])
+
+    session_id = session_id or uuid.uuid4().hex
+    agent = ChatAgent(load_model(os.getcwd()), working_dir=os.getcwd(), console=Console(quiet=True), read_only=True)
+    with _chat_sessions_lock:
+        _chat_sessions[session_id] = (agent, threading.Lock())
+        while len(_chat_sessions) > MAX_CHAT_SESSIONS:
+            _chat_sessions.popitem(last=False)
+        return (session_id, *_chat_sessions[session_id])
+
+
 @app.get("/")
 def root():
     """
@@ -41,11 +181,52 @@ def root():
     return {"Welcome to": "MLE-Agent!"}
 
 
+def get_report_store() -> ReportStore:
+    """
+    get_report_store: get the report store of the working directory, created on the first use.
+    :return: the report store.
+    """
+    global _report_store
+    if _report_store is not None:
+        return _report_store
+    with _report_store_lock:
+        if _report_store is None:
+            _report_store = ReportStore(os.getcwd())
+        return _report_store
+
+
+def report_response(stored_report, request: Request) -> Response:
+    """
+    report_response: serve a stored report, or `304 Not Modified` if the client has the same version.
+    :param stored_report: the stored report.
+    :param request: the request, with the optional `If-None-Match` header.
+    :return: the response.
+    """
+    headers = {"ETag": stored_report.etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if stored_report.etag in (tag.strip() for tag in if_none_match.split(",")) or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    return Response(content=stored_report.body, media_type="application/json", headers=headers)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def read_metrics():
+    """
+    read_metrics: the server metrics in the Prometheus text format, the request counts and latencies of
+     all the workers, and the number of jobs by status.
+    """
+    job_queue = get_job_queue()
+    return PlainTextResponse(
+        get_metrics().render(job_queue.store.count_by_status(), job_queue.pending),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
 @app.get("/latest_report", response_class=JSONResponse)
-def read_latest_report():
+def read_latest_report(request: Request):
     """
     read_latest_report: read the latest progress report.
-    :return: the content of the latest progress report as plain text.
+    :return: the content of the latest progress report, with an ETag for the conditional requests.
     """
     if not check_config():
         raise HTTPException(
@@ -53,20 +234,34 @@ def read_latest_report():
             detail="`project.yml` not found. Please start the MLE server under an MLE-Agent project directory."
         )
 
-    reports_dir = os.getcwd()
-    report_files = [f for f in os.listdir(reports_dir) if f.startswith("progress_report_") and f.endswith(".json")]
-
-    if not report_files:
-        raise HTTPException(status_code=404, detail="No progress reports found.")
-
-    latest_report = max(report_files, key=lambda f: datetime.strptime(f, "progress_report_%Y_%m_%d.json"))
     try:
-        with open(os.path.join(reports_dir, latest_report), 'r') as file:
-            report_dict = json.load(file)
-            report_dict.update({"file": latest_report})
-            return JSONResponse(content=report_dict)
-    except IOError:
+        latest_report = get_report_store().latest()
+    except (IOError, ValueError):
         raise HTTPException(status_code=500, detail="Error reading the latest report file.")
+    if latest_report is None:
+        raise HTTPException(status_code=404, detail="No progress reports found.")
+    return report_response(latest_report, request)
+
+
+@app.get("/reports")
+def list_reports(limit: int = 20):
+    """
+    List the progress reports, the latest first.
+    :param limit: the maximum number of reports to list.
+    """
+    return {"reports": get_report_store().list(limit=limit)}
+
+
+@app.get("/reports/{name}", response_class=JSONResponse)
+def read_report(name: str, request: Request):
+    """
+    Read a progress report by its file name.
+    :param name: the report file name, as listed by `GET /reports`.
+    """
+    stored_report = get_report_store().get(name)
+    if stored_report is None:
+        raise HTTPException(status_code=404, detail=f"Report {name} not found.")
+    return report_response(stored_report, request)
 
 
 @app.post("/gen_report")
@@ -86,30 +281,24 @@ def gen_report(report_request: ReportRequest):
            "okr": "Improve system efficiency by 20% this quarter"
          }'
     """
-    try:
-        # Run report generation synchronously
-        result = report(
-            os.getcwd(),
-            report_request.repo,
-            report_request.username,
-            report_request.token,
-            okr_str=report_request.okr,
-            model="gpt-4o",
-        )
+    # Run report generation in the job queue and wait for it, so the concurrency limit still applies
+    job, _ = submit_report_job(report_request)
+    job = get_job_queue().wait(job["id"])
+    if job["status"] != "finished":
+        raise HTTPException(status_code=500, detail=f"Error in report generation process: {job['error']}")
 
-        return {
-            "message": "Report generation completed",
-            "repo": report_request.repo,
-            "username": report_request.username,
-            "okr_provided": report_request.okr is not None,
-            "result": result  # Assuming the report function returns some result
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error in report generation process: {e}")
+    return {
+        "message": "Report generation completed",
+        "job_id": job["id"],
+        "repo": report_request.repo,
+        "username": report_request.username,
+        "okr_provided": report_request.okr is not None,
+        "result": job["result"]
+    }
 
 
 @app.post("/gen_report_async")
-async def gen_report_async(report_request: ReportRequest, background_tasks: BackgroundTasks):
+def gen_report_async(report_request: ReportRequest):
     """
     Generate a report (async) based on the provided GitHub repository and username.
     Optionally includes OKR text.
@@ -125,23 +314,122 @@ async def gen_report_async(report_request: ReportRequest, background_tasks: Back
            "okr": "Improve system efficiency by 20% this quarter"
          }'
     """
-    try:
-        # Trigger report generation in the background
-        background_tasks.add_task(
-            report,
-            os.getcwd(),
-            report_request.repo,
-            report_request.username,
-            report_request.token,
-            okr_str=report_request.okr,
-            model="gpt-4o",
+    # Trigger report generation in the job queue, check the status with `GET /jobs/{job_id}`
+    job, deduplicated = submit_report_job(report_request)
+    return {
+        "message": "Report generation already in progress" if deduplicated else "Report generation started",
+        "job_id": job["id"],
+        "status": job["status"],
+        "repo": report_request.repo,
+        "username": report_request.username,
+        "okr_provided": report_request.okr is not None
+    }
+
+
+@app.post("/jobs/report")
+def create_report_job(report_request: ReportRequest):
+    """
+    Create a report generation job, the identical in-flight requests share one job.
+    :return: the job id and status, the server returns 429 if the job queue is full.
+    """
+    job, deduplicated = submit_report_job(report_request)
+    return {"job_id": job["id"], "status": job["status"], "deduplicated": deduplicated}
+
+
+@app.get("/jobs")
+def list_jobs(status: Optional[str] = None, limit: int = 20):
+    """
+    List the recent jobs.
+    :param status: only list the jobs in this status (queued, running, finished, failed, ...).
+    :param limit: the maximum number of jobs to list.
+    """
+    return {"jobs": get_job_queue().store.list(status=status, limit=limit)}
+
+
+@app.get("/jobs/{job_id}")
+def read_job(job_id: str):
+    """
+    Get the status of a job, and its result once finished.
+    :param job_id: the job id.
+    """
+    job = get_job_queue().store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found.")
+    return job
+
+
+@app.post("/chat/stream")
+async def chat_stream(chat_request: ChatRequest, request: Request):
+    """
+    Chat with the agent, streaming the reply as server-sent events: a `session` event with the session id
+     (pass it back to continue the conversation), `token` events with the text deltas, and a `done` event.
+
+    Example:
+
+    curl -N -X POST http://localhost:8000/chat/stream \
+     -H "Content-Type: application/json" \
+     -d '{"message": "How can I improve the accuracy of my model?"}'
+    """
+    if not check_config():
+        raise HTTPException(
+            status_code=400,
+            detail="`project.yml` not found. Please start the MLE server under an MLE-Agent project directory."
         )
 
-        return {
-            "message": "Report generation started",
-            "repo": report_request.repo,
-            "username": report_request.username,
-            "okr_provided": report_request.okr is not None
-        }
+    # create the session before streaming, so the model config errors are reported as the response status
+    try:
+        session_id, agent, lock = await run_in_threadpool(get_chat_session, chat_request.session_id)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error in report generation process: {e}")
+        raise HTTPException(status_code=400, detail=f"Failed to start the chat session: {e}")
+
+    def events():
+        yield "session", {"session_id": session_id}
+        # one reply at a time per session, the chat history is not shared safely
+        with lock:
+            sent = 0
+            for text in agent.chat(chat_request.message):
+                yield "token", text[sent:]
+                sent = len(text)
+
+    return StreamingResponse(
+        stream_events(events, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/gen_report/stream")
+async def gen_report_stream(report_request: ReportRequest, request: Request):
+    """
+    Generate a report, streaming the progress as server-sent events: `phase` events while fetching
+     and summarizing the GitHub activities, `token` events of the report text, and the final `report` event.
+     The generation holds a slot of the job queue, so it shares the concurrency and queue depth limits of the
+     report jobs, and it is cancelled (and the model request closed) when the client disconnects.
+
+    Example:
+
+    curl -N -X POST http://localhost:8000/gen_report/stream \
+     -H "Content-Type: application/json" \
+     -d '{"repo": "MLSysOps/MLE-agent", "username": "huangyz0918"}'
+    """
+    job_queue = await run_in_threadpool(get_job_queue)
+    if job_queue.full:
+        raise HTTPException(status_code=429, detail="Too many jobs in the queue, please retry later.")
+
+    def events():
+        yield "phase", "waiting for a worker"
+        with job_queue.slot():
+            yield from report_stream(
+                os.getcwd(),
+                report_request.repo,
+                report_request.username,
+                report_request.token,
+                okr_str=report_request.okr,
+                model="gpt-4o",
+            )
+
+    return StreamingResponse(
+        stream_events(events, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,326 @@
+"""
+The job subsystem of the server: a bounded worker pool, with the job states persisted in SQLite.
+"""
+import os
+import json
+import time
+import uuid
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Callable, Tuple, List
+
+JOB_DB_PATH = os.path.join('.mle', 'server', 'jobs.db')
+# the number of jobs running at the same time in a server process
+DEFAULT_MAX_WORKERS = int(os.environ.get('MLE_SERVER_WORKERS', 2))
+# the number of jobs waiting for a worker before new jobs are rejected
+DEFAULT_MAX_QUEUED = int(os.environ.get('MLE_SERVER_MAX_QUEUED', 16))
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+class QueueFullError(Exception):
+    """
+    Raised when the job queue has reached its depth limit.
+    """
+
+
+def request_key(kind: str, request: Dict[str, Any]) -> str:
+    """
+    The de-duplication key of a job request.
+    :param kind: the job kind.
+    :param request: the job request (may include secrets, they are only hashed).
+    :return: the key.
+    """
+    payload = json.dumps([kind, request], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class JobStore:
+    """
+    JobStore: the job states in a SQLite database, shared by all the server processes on the host.
+    """
+
+    def __init__(self, path: str = JOB_DB_PATH):
+        """
+        Args:
+            path: the path to the SQLite database.
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    request TEXT,
+                    result TEXT,
+                    error TEXT,
+                    pid INTEGER,
+                    created_at TEXT,
+                    started_at TEXT,
+                    finished_at TEXT
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_key_status ON jobs (key, status)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_created_at ON jobs (created_at)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        for field in ('request', 'result'):
+            if job.get(field) is not None:
+                job[field] = json.loads(job[field])
+        job.pop('key', None)
+        return job
+
+    def create(self, kind: str, key: str, request: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        """
+        Create a queued job, or return the in-flight job with the same key.
+        :param kind: the job kind.
+        :param key: the de-duplication key.
+        :param request: the job request to record (without secrets).
+        :return: the job and whether it was created.
+        """
+        with self._connect() as conn:
+            # an immediate transaction, so two processes never create the same job twice
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                placeholders = ', '.join('?' * len(ACTIVE_STATUSES))
+                row = conn.execute(
+                    f"SELECT * FROM jobs WHERE key = ? AND status IN ({placeholders}) LIMIT 1",
+                    (key, *ACTIVE_STATUSES),
+                ).fetchone()
+                if row is None:
+                    job_id = uuid.uuid4().hex
+                    conn.execute(
+                        "INSERT INTO jobs (id, kind, key, status, request, pid, created_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (job_id, kind, key, 'queued', json.dumps(request, default=str), os.getpid(),
+                         datetime.now().isoformat()),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        if row is not None:
+            return self._to_dict(row), False
+        return self.get(job_id), True
+
+    def update(self, job_id: str, **fields) -> None:
+        """
+        Update the fields of a job, the result is stored as JSON.
+        """
+        if 'result' in fields:
+            fields['result'] = json.dumps(fields['result'], default=str)
+        assignments = ', '.join(f"{field} = ?" for field in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    def list(self, status: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        query, params = "SELECT * FROM jobs", ()
+        if status:
+            query, params = query + " WHERE status = ?", (status,)
+        with self._connect() as conn:
+            rows = conn.execute(query + " ORDER BY created_at DESC LIMIT ?", (*params, limit)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def count_by_status(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def recover(self) -> int:
+        """
+        Mark the in-flight jobs of the dead server processes as interrupted.
+        :return: the number of interrupted jobs.
+        """
+        placeholders = ', '.join('?' * len(ACTIVE_STATUSES))
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT id, pid FROM jobs WHERE status IN ({placeholders})", ACTIVE_STATUSES
+            ).fetchall()
+        # called at startup, so the jobs recorded with the current pid belong to a previous process
+        dead = [job_id for job_id, pid in rows if pid == os.getpid() or not _is_alive(pid)]
+        for job_id in dead:
+            self.update(job_id, status='interrupted', error='The server stopped before the job finished.',
+                        finished_at=datetime.now().isoformat())
+        return len(dead)
+
+
+def _is_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobQueue:
+    """
+    JobQueue: runs the jobs in a bounded thread pool, rejects new jobs beyond the queue depth limit,
+     and de-duplicates the identical in-flight requests.
+    """
+
+    def __init__(
+            self,
+            store: JobStore,
+            max_workers: int = DEFAULT_MAX_WORKERS,
+            max_queued: int = DEFAULT_MAX_QUEUED,
+    ):
+        """
+        Args:
+            store: the job store.
+            max_workers: the number of jobs running at the same time.
+            max_queued: the number of jobs waiting for a worker before new jobs are rejected.
+        """
+        self.store = store
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='mle-job')
+        self._futures = {}
+        self._streams = 0
+        self._lock = threading.Lock()
+        # the worker slots, shared by the jobs and the work run outside the pool (see `slot`)
+        self._slots = threading.Semaphore(max_workers)
+
+    @property
+    def pending(self) -> int:
+        """
+        The number of the queued and running jobs (and slots) of this process.
+        """
+        with self._lock:
+            return len(self._futures) + self._streams
+
+    @property
+    def full(self) -> bool:
+        """
+        Whether the queue has reached its depth limit.
+        """
+        return self.pending >= self.max_workers + self.max_queued
+
+    @contextmanager
+    def slot(self):
+        """
+        Hold a worker slot to run work outside the pool (e.g., a streamed report): it waits for a worker like
+         a job does, and counts in the queue depth limit.
+        :raise QueueFullError: if the queue is full.
+        """
+        with self._lock:
+            if len(self._futures) + self._streams >= self.max_workers + self.max_queued:
+                raise QueueFullError(
+                    f"Too many jobs in the queue ({len(self._futures) + self._streams}), please retry later."
+                )
+            self._streams += 1
+        try:
+            with self._slots:
+                yield
+        finally:
+            with self._lock:
+                self._streams -= 1
+
+    def submit(
+            self,
+            kind: str,
+            request: Dict[str, Any],
+            func: Callable,
+            *args,
+            secrets: Optional[Dict[str, Any]] = None,
+            **kwargs,
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Submit a job, or join the identical in-flight job.
+        :param kind: the job kind.
+        :param request: the job request, recorded in the store.
+        :param func: the function to run.
+        :param secrets: the request fields which take part in the de-duplication but are never stored.
+        :return: the job and whether it was de-duplicated.
+        """
+        key = request_key(kind, {**request, **(secrets or {})})
+        with self._lock:
+            if len(self._futures) + self._streams >= self.max_workers + self.max_queued:
+                raise QueueFullError(
+                    f"Too many jobs in the queue ({len(self._futures) + self._streams}), please retry later."
+                )
+            job, created = self.store.create(kind, key, request)
+            if not created:
+                return job, True
+            self._futures[job['id']] = self.executor.submit(self._run, job['id'], func, args, kwargs)
+        return job, False
+
+    def _run(self, job_id: str, func: Callable, args: tuple, kwargs: dict):
+        try:
+            with self._slots:
+                self.store.update(job_id, status='running', started_at=datetime.now().isoformat())
+                try:
+                    result = func(*args, **kwargs)
+                    self.store.update(job_id, status='finished', result=result,
+                                      finished_at=datetime.now().isoformat())
+                except Exception as e:
+                    self.store.update(job_id, status='failed', error=str(e), finished_at=datetime.now().isoformat())
+        finally:
+            with self._lock:
+                self._futures.pop(job_id, None)
+
+    def wait(self, job_id: str, timeout: Optional[float] = None, poll_interval: float = 1.0) -> Dict[str, Any]:
+        """
+        Wait for a job to finish, the jobs of the other server processes are polled from the store.
+        :param job_id: the job id.
+        :param timeout: the maximum number of seconds to wait, None means no limit.
+        :param poll_interval: the interval (in seconds) to poll the store.
+        :return: the job.
+        """
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None:
+            try:
+                future.result(timeout=timeout)
+            except Exception:
+                pass
+            return self.store.get(job_id)
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.store.get(job_id)
+            if job is None or job['status'] not in ACTIVE_STATUSES:
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                return job
+            time.sleep(poll_interval)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stop accepting jobs, and wait for the running jobs to finish (the queued jobs are cancelled).
+        """
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+        with self._lock:
+            cancelled = [job_id for job_id, future in self._futures.items() if future.cancelled()]
+            for job_id in cancelled:
+                self._futures.pop(job_id)
+        for job_id in cancelled:
+            self.store.update(job_id, status='cancelled', finished_at=datetime.now().isoformat())
@@ -0,0 +1,178 @@
+"""
+The server metrics: request counts and latencies of each worker process, shared through SQLite so any
+ worker can serve `/metrics` for the whole server, in the Prometheus text format.
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Tuple, List, Optional
+
+METRICS_DB_PATH = os.path.join('.mle', 'server', 'metrics.db')
+# the upper bounds (in seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# the minimum interval (in seconds) between two flushes of a worker's metrics
+FLUSH_INTERVAL = 1.0
+
+
+class RequestMetrics:
+    """
+    RequestMetrics: the request metrics of a worker process, flushed as a snapshot into the shared database.
+    """
+
+    def __init__(self, path: str = METRICS_DB_PATH):
+        """
+        Args:
+            path: the path to the SQLite database.
+        """
+        self.path = path
+        self.pid = os.getpid()
+        self.started_at = time.time()
+        self.in_flight = 0
+        # (method, route, status) -> count
+        self.requests: Dict[Tuple[str, str, str], int] = {}
+        # (method, route) -> [bucket counts..., sum]
+        self.latencies: Dict[Tuple[str, str], List[float]] = {}
+        self._lock = threading.Lock()
+        self._flushed_at = 0.0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS workers (pid INTEGER PRIMARY KEY, updated_at REAL, snapshot TEXT)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def start(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def observe(self, method: str, route: str, status: int, duration: float) -> None:
+        """
+        Record a finished request.
+        :param method: the HTTP method.
+        :param route: the route path template (not the raw path, to keep the label values bounded).
+        :param status: the response status code.
+        :param duration: the request latency in seconds.
+        """
+        with self._lock:
+            self.in_flight -= 1
+            key = (method, route, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            buckets = self.latencies.setdefault((method, route), [0] * (len(LATENCY_BUCKETS) + 1))
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if duration <= bound:
+                    buckets[i] += 1
+            buckets[-1] += duration
+            due = time.monotonic() - self._flushed_at >= FLUSH_INTERVAL
+        if due:
+            self.flush()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "started_at": self.started_at,
+                "requests": [[*key, count] for key, count in self.requests.items()],
+                "latencies": [[*key, buckets] for key, buckets in self.latencies.items()],
+            }
+
+    def flush(self) -> None:
+        """
+        Write the snapshot of this worker into the shared database.
+        """
+        self._flushed_at = time.monotonic()
+        snapshot = json.dumps(self.snapshot())
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO workers (pid, updated_at, snapshot) VALUES (?, ?, ?)",
+                (self.pid, time.time(), snapshot),
+            )
+
+    def remove(self) -> None:
+        """
+        Remove this worker from the shared database, called when the worker shuts down.
+        """
+        with self._connect() as conn:
+            conn.execute("DELETE FROM workers WHERE pid = ?", (self.pid,))
+
+    def _collect(self) -> List[Dict]:
+        """
+        Collect the snapshots of the live workers, the rows of the dead workers are removed.
+        """
+        from mle.server.jobs import _is_alive
+
+        self.flush()
+        with self._connect() as conn:
+            rows = conn.execute("SELECT pid, snapshot FROM workers").fetchall()
+            dead = [pid for pid, _ in rows if not _is_alive(pid)]
+            for pid in dead:
+                conn.execute("DELETE FROM workers WHERE pid = ?", (pid,))
+        return [json.loads(snapshot) for pid, snapshot in rows if pid not in dead]
+
+    def render(self, job_counts: Optional[Dict[str, int]] = None, jobs_pending: int = 0) -> str:
+        """
+        Render the metrics of all the workers in the Prometheus text format.
+        :param job_counts: the number of jobs by status, from the shared job store.
+        :param jobs_pending: the number of queued and running jobs of this worker.
+        :return: the metrics text.
+        """
+        snapshots = self._collect()
+        requests, latencies = {}, {}
+        for snapshot in snapshots:
+            for method, route, status, count in snapshot["requests"]:
+                key = (method, route, status)
+                requests[key] = requests.get(key, 0) + count
+            for method, route, buckets in snapshot["latencies"]:
+                total = latencies.setdefault((method, route), [0] * len(buckets))
+                for i, value in enumerate(buckets):
+                    total[i] += value
+
+        lines = [
+            "# HELP mle_server_workers The number of live server worker processes.",
+            "# TYPE mle_server_workers gauge",
+            f"mle_server_workers {len(snapshots)}",
+            "# HELP mle_http_requests_in_flight The number of requests being served.",
+            "# TYPE mle_http_requests_in_flight gauge",
+            f"mle_http_requests_in_flight {sum(snapshot['in_flight'] for snapshot in snapshots)}",
+            "# HELP mle_http_requests_total The number of finished requests.",
+            "# TYPE mle_http_requests_total counter",
+        ]
+        for (method, route, status), count in sorted(requests.items()):
+            lines.append(f'mle_http_requests_total{{method="{method}",route="{route}",status="{status}"}} {count}')
+
+        lines += [
+            "# HELP mle_http_request_duration_seconds The request latencies.",
+            "# TYPE mle_http_request_duration_seconds histogram",
+        ]
+        for (method, route), buckets in sorted(latencies.items()):
+            labels = f'method="{method}",route="{route}"'
+            count = sum(requests[key] for key in requests if key[:2] == (method, route))
+            for bound, value in zip(LATENCY_BUCKETS, buckets):
+                lines.append(f'mle_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {value}')
+            lines.append(f'mle_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f'mle_http_request_duration_seconds_sum{{{labels}}} {buckets[-1]:.6f}')
+            lines.append(f'mle_http_request_duration_seconds_count{{{labels}}} {count}')
+
+        lines += [
+            "# HELP mle_jobs The number of jobs by status, across all the workers.",
+            "# TYPE mle_jobs gauge",
+        ]
+        for status, count in sorted((job_counts or {}).items()):
+            lines.append(f'mle_jobs{{status="{status}"}} {count}')
+        lines += [
+            "# HELP mle_worker_jobs_pending The number of queued and running jobs of the worker serving this scrape.",
+            "# TYPE mle_worker_jobs_pending gauge",
+            f"mle_worker_jobs_pending {jobs_pending}",
+        ]
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,105 @@
+"""
+Server-sent events (SSE) helpers: run a blocking generator in a thread and stream its events to the client.
+"""
+import json
+import queue
+import asyncio
+import threading
+from typing import Callable, Iterator, Tuple, Any, AsyncIterator
+
+# the number of events buffered for a slow client before the producer blocks
+MAX_BUFFERED_EVENTS = 64
+# the interval (in seconds) of the keep-alive comments when no event is produced
+HEARTBEAT_INTERVAL = 15.0
+# the interval (in seconds) to check for the client disconnection while waiting for events
+POLL_INTERVAL = 0.5
+
+_DONE = object()
+
+
+def format_sse(event: str, data: Any) -> str:
+    """
+    Format an event in the SSE wire format.
+    :param event: the event name.
+    :param data: the event data, encoded as JSON.
+    :return: the SSE message.
+    """
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _produce(events: Iterator[Tuple[str, Any]], buffer: queue.Queue, cancelled: threading.Event):
+    """
+    Pull the events from the blocking generator into the bounded buffer. When the buffer is full the
+     producer waits (backpressure), and when the client is gone the generator is closed, which
+     propagates `GeneratorExit` down to the model stream so the upstream request is closed as well.
+    """
+    try:
+        for item in events:
+            while not cancelled.is_set():
+                try:
+                    buffer.put(item, timeout=POLL_INTERVAL)
+                    break
+                except queue.Full:
+                    continue
+            if cancelled.is_set():
+                break
+    except Exception as e:
+        if not cancelled.is_set():
+            buffer.put(("error", {"detail": str(e)}))
+    finally:
+        close = getattr(events, 'close', None)
+        if close is not None:
+            close()
+        # never block on a full buffer once the consumer is gone
+        while not cancelled.is_set():
+            try:
+                buffer.put(_DONE, timeout=POLL_INTERVAL)
+                break
+            except queue.Full:
+                continue
+
+
+async def stream_events(
+        make_events: Callable[[], Iterator[Tuple[str, Any]]],
+        is_disconnected: Callable[[], Any],
+) -> AsyncIterator[str]:
+    """
+    Stream the (event, data) tuples of a blocking generator as SSE messages.
+    :param make_events: the factory of the blocking generator, called in the producer thread.
+    :param is_disconnected: the coroutine function to check if the client is disconnected.
+    :return: the async iterator of the SSE messages.
+    """
+    buffer = queue.Queue(maxsize=MAX_BUFFERED_EVENTS)
+    cancelled = threading.Event()
+    loop = asyncio.get_running_loop()
+
+    def _start():
+        _produce(iter(make_events()), buffer, cancelled)
+
+    def _get():
+        try:
+            return buffer.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            return None
+
+    threading.Thread(target=_start, daemon=True, name="mle-sse").start()
+    idle = 0.0
+    try:
+        while True:
+            item = await loop.run_in_executor(None, _get)
+            if item is _DONE:
+                yield format_sse("done", {})
+                break
+            if await is_disconnected():
+                break
+            if item is None:
+                idle += POLL_INTERVAL
+                if idle >= HEARTBEAT_INTERVAL:
+                    idle = 0.0
+                    yield ": keep-alive\n\n"
+                continue
+            idle = 0.0
+            yield format_sse(*item)
+    finally:
+        # the client is gone (or the stream ended), stop the producer and the model stream
+        cancelled.set()
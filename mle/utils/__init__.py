@@ -3,3 +3,7 @@ from .cache import *
 from .memory import *
 from .data import *
 from .chunk import *
+from .context import *
+from .reports import *
+from .scheduler import *
+from .dependency import *
@@ -0,0 +1,535 @@
+"""
+Archive utilities: parallel zip extraction, streaming tar extraction with idempotent re-runs, and lazy
+ archive inspection from the central directory or headers.
+"""
+import os
+import bz2
+import gzip
+import lzma
+import time
+import zlib
+import struct
+import shutil
+import fnmatch
+import tarfile
+import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Any, Iterable
+
+import py7zr
+
+# the buffer size when copying the member data to disk
+COPY_BUFFER_SIZE = 1024 * 1024
+# the minimum interval (in seconds) between two progress reports
+PROGRESS_INTERVAL = 1.0
+# the single-file compression formats (not tar archives), by file extension
+SINGLE_FILE_OPENERS = {
+    '.gz': gzip.open,
+    '.bz2': bz2.open,
+    '.xz': lzma.open,
+}
+
+
+class ExtractionProgress:
+    """
+    ExtractionProgress: a thread-safe counter of the extracted members and bytes, which reports the
+     progress and the throughput at most once per `PROGRESS_INTERVAL`.
+    """
+
+    def __init__(self, total_files: Optional[int] = None, total_bytes: Optional[int] = None, verbose: bool = True):
+        self.total_files = total_files
+        self.total_bytes = total_bytes
+        self.verbose = verbose
+        self.extracted = 0
+        self.skipped = 0
+        self.bytes = 0
+        self.start_time = time.monotonic()
+        self._last_report = self.start_time
+        self._lock = threading.Lock()
+
+    def update(self, num_bytes: int = 0, skipped: bool = False):
+        with self._lock:
+            if skipped:
+                self.skipped += 1
+            else:
+                self.extracted += 1
+                self.bytes += num_bytes
+            now = time.monotonic()
+            if self.verbose and now - self._last_report >= PROGRESS_INTERVAL:
+                self._last_report = now
+                print(self.report())
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.start_time
+
+    def report(self) -> str:
+        done = self.extracted + self.skipped
+        total = f"/{self.total_files}" if self.total_files is not None else ""
+        throughput = self.bytes / max(self.elapsed, 1e-6) / (1024 * 1024)
+        return (f"Extracted {done}{total} files ({self.skipped} up to date), "
+                f"{self.bytes / (1024 * 1024):.1f} MB in {self.elapsed:.1f}s ({throughput:.1f} MB/s)")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "extracted": self.extracted,
+            "skipped": self.skipped,
+            "bytes": self.bytes,
+            "seconds": round(self.elapsed, 3),
+            "throughput_mb_s": round(self.bytes / max(self.elapsed, 1e-6) / (1024 * 1024), 2),
+        }
+
+
+def _is_selected(name: str, patterns: Optional[List[str]]) -> bool:
+    """
+    Check if a member is selected by the glob patterns, matched against the full name and the base name.
+    """
+    if not patterns:
+        return True
+    base_name = os.path.basename(name.rstrip('/'))
+    return any(fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(base_name, pattern) for pattern in patterns)
+
+
+def _safe_target(dest: str, name: str) -> str:
+    """
+    Resolve the target path of a member, and reject the members escaping the destination (zip slip).
+    """
+    target = os.path.realpath(os.path.join(dest, name))
+    if os.path.commonpath([target, os.path.realpath(dest)]) != os.path.realpath(dest):
+        raise ValueError(f"Refusing to extract {name} outside of {dest}")
+    return target
+
+
+def _file_crc32(path: str) -> int:
+    crc = 0
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(COPY_BUFFER_SIZE), b''):
+            crc = zlib.crc32(block, crc)
+    return crc
+
+
+def _is_up_to_date(target: str, size: int, mtime: Optional[float] = None, crc: Optional[int] = None) -> bool:
+    """
+    Check if an extracted file matches the member, by the size and the CRC (if given), or else the mtime.
+    """
+    try:
+        stat = os.stat(target)
+    except OSError:
+        return False
+    if stat.st_size != size:
+        return False
+    if crc is not None:
+        return _file_crc32(target) == crc
+    return mtime is None or abs(stat.st_mtime - mtime) < 2  # zip timestamps have a 2-second resolution
+
+
+def _write_member(source, target: str, mtime: Optional[float] = None) -> int:
+    """
+    Stream a member to disk through a temporary file, so an interrupted extraction never leaves
+     a truncated file that looks up to date.
+    """
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    temp_path = f"{target}.part"
+    with open(temp_path, 'wb') as out:
+        shutil.copyfileobj(source, out, COPY_BUFFER_SIZE)
+        num_bytes = out.tell()
+    os.replace(temp_path, target)
+    if mtime is not None:
+        os.utime(target, (mtime, mtime))
+    return num_bytes
+
+
+def _zip_mtime(info: zipfile.ZipInfo) -> float:
+    return time.mktime(info.date_time + (0, 0, -1))
+
+
+def extract_zip(
+        path: str,
+        dest: str,
+        patterns: Optional[List[str]] = None,
+        workers: Optional[int] = None,
+        verify_crc: bool = False,
+        verbose: bool = True,
+) -> Dict[str, Any]:
+    """
+    Extract a zip archive with a thread pool, each thread reads the archive through its own handle
+     (the decompression releases the GIL). The members already extracted are skipped.
+    :param path: the path to the zip archive.
+    :param dest: the destination directory.
+    :param patterns: the glob patterns of the members to extract, None to extract all.
+    :param workers: the number of threads, defaults to the number of CPUs (at most 8).
+    :param verify_crc: whether to compare the CRC of existing files, instead of the size and mtime only.
+    :param verbose: whether to print the progress.
+    :return: the extraction statistics.
+    """
+    with zipfile.ZipFile(path) as archive:
+        members = [info for info in archive.infolist() if _is_selected(info.filename, patterns)]
+
+    files = []
+    for info in members:
+        target = _safe_target(dest, info.filename)
+        if info.is_dir():
+            os.makedirs(target, exist_ok=True)
+        else:
+            files.append((info, target))
+
+    progress = ExtractionProgress(len(files), sum(info.file_size for info, _ in files), verbose)
+    local = threading.local()
+    handles = []
+    handles_lock = threading.Lock()
+
+    def _extract(item):
+        info, target = item
+        mtime = _zip_mtime(info)
+        if _is_up_to_date(target, info.file_size, mtime, info.CRC if verify_crc else None):
+            progress.update(skipped=True)
+            return
+        if not hasattr(local, 'archive'):
+            local.archive = zipfile.ZipFile(path)
+            with handles_lock:
+                handles.append(local.archive)
+        with local.archive.open(info) as source:
+            progress.update(_write_member(source, target, mtime))
+
+    # the large members first, so a single huge member does not become the tail of the run
+    files.sort(key=lambda item: item[0].compress_size, reverse=True)
+    workers = workers or min(os.cpu_count() or 1, 8)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(_extract, files))
+    finally:
+        for handle in handles:
+            handle.close()
+    return progress.to_dict()
+
+
+def extract_tar(
+        path: str,
+        dest: str,
+        patterns: Optional[List[str]] = None,
+        verbose: bool = True,
+) -> Dict[str, Any]:
+    """
+    Extract a (compressed) tar archive in a single streaming pass, the member data is copied straight
+     to disk and the members already extracted (same size and mtime) are skipped.
+    :param path: the path to the tar archive.
+    :param dest: the destination directory.
+    :param patterns: the glob patterns of the members to extract, None to extract all.
+    :param verbose: whether to print the progress.
+    :return: the extraction statistics.
+    """
+    progress = ExtractionProgress(verbose=verbose)
+    extract_kwargs = {'filter': 'data'} if hasattr(tarfile, 'data_filter') else {}
+    with tarfile.open(path, mode='r|*') as archive:
+        for member in archive:
+            if not _is_selected(member.name, patterns):
+                continue
+            target = _safe_target(dest, member.name)
+            if member.isdir():
+                os.makedirs(target, exist_ok=True)
+            elif member.isfile():
+                if _is_up_to_date(target, member.size, member.mtime):
+                    progress.update(skipped=True)
+                    continue
+                source = archive.extractfile(member)
+                progress.update(_write_member(source, target, member.mtime))
+            else:
+                # links and special files, extracted with the safe filter when available
+                archive.extract(member, dest, **extract_kwargs)
+    return progress.to_dict()
+
+
+def extract_7z(
+        path: str,
+        dest: str,
+        patterns: Optional[List[str]] = None,
+        verbose: bool = True,
+) -> Dict[str, Any]:
+    """
+    Extract a 7z archive, 7z archives are usually solid (the members share a compression stream),
+     so they are extracted sequentially, only the missing or outdated members are extracted.
+    :param path: the path to the 7z archive.
+    :param dest: the destination directory.
+    :param patterns: the glob patterns of the members to extract, None to extract all.
+    :param verbose: whether to print the progress.
+    :return: the extraction statistics.
+    """
+    progress = ExtractionProgress(verbose=verbose)
+    with py7zr.SevenZipFile(path, mode='r') as archive:
+        targets = []
+        for info in archive.list():
+            if not _is_selected(info.filename, patterns):
+                continue
+            target = _safe_target(dest, info.filename)
+            if info.is_directory:
+                os.makedirs(target, exist_ok=True)
+            elif _is_up_to_date(target, info.uncompressed):
+                progress.update(skipped=True)
+            else:
+                targets.append((info.filename, info.uncompressed))
+
+        if targets:
+            archive.extract(path=dest, targets=[name for name, _ in targets])
+            for _, size in targets:
+                progress.update(size)
+    return progress.to_dict()
+
+
+def extract_single_file(path: str, dest: str, verbose: bool = True) -> Dict[str, Any]:
+    """
+    Decompress a single-file (non-tar) .gz, .bz2 or .xz file as a stream.
+    :param path: the path to the compressed file.
+    :param dest: the destination directory.
+    :param verbose: whether to print the progress.
+    :return: the extraction statistics.
+    """
+    base_name, extension = os.path.splitext(os.path.basename(path))
+    target = os.path.join(dest, base_name)
+    progress = ExtractionProgress(total_files=1, verbose=verbose)
+    if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+        progress.update(skipped=True)
+    else:
+        with SINGLE_FILE_OPENERS[extension.lower()](path, 'rb') as source:
+            progress.update(_write_member(source, target))
+    return progress.to_dict()
+
+
+def detect_archive_format(path: str) -> str:
+    """
+    Detect the archive format by the content (and the extension for single-file compression).
+    :param path: the path to the archive.
+    :return: one of 'zip', '7z', 'tar', 'single'.
+    """
+    if zipfile.is_zipfile(path):
+        return 'zip'
+    if py7zr.is_7zfile(path):
+        return '7z'
+    if tarfile.is_tarfile(path):
+        return 'tar'
+    if os.path.splitext(path)[1].lower() in SINGLE_FILE_OPENERS:
+        return 'single'
+    raise ValueError(f"Unsupported file format: {os.path.splitext(path)[1]}")
+
+
+def extract_archive(
+        path: str,
+        dest: str,
+        patterns: Optional[Iterable[str]] = None,
+        workers: Optional[int] = None,
+        verify_crc: bool = False,
+        verbose: bool = True,
+) -> Dict[str, Any]:
+    """
+    Extract an archive (zip, 7z, tar, tar.gz/bz2/xz or a single compressed file) into a directory.
+     Re-running the extraction only extracts the missing or changed members.
+    :param path: the path to the archive.
+    :param dest: the destination directory.
+    :param patterns: the glob patterns of the members to extract, None to extract all.
+    :param workers: the number of threads for zip archives.
+    :param verify_crc: whether to compare the CRC of existing files (zip only).
+    :param verbose: whether to print the progress.
+    :return: the extraction statistics, with the archive format.
+    """
+    os.makedirs(dest, exist_ok=True)
+    patterns = list(patterns) if patterns else None
+    archive_format = detect_archive_format(path)
+    if archive_format == 'zip':
+        stats = extract_zip(path, dest, patterns, workers, verify_crc, verbose)
+    elif archive_format == '7z':
+        stats = extract_7z(path, dest, patterns, verbose)
+    elif archive_format == 'tar':
+        stats = extract_tar(path, dest, patterns, verbose)
+    else:
+        stats = extract_single_file(path, dest, verbose)
+    stats["format"] = archive_format
+    return stats
+
+
+# the signature, flags, uncompressed size, name/extra/comment lengths of a central directory header
+_ZIP_CENTRAL_HEADER = struct.Struct('<4s4xH14xL3H')
+
+
+def _iter_zip_entries(path: str):
+    """
+    Iterate the (name, size, is_dir) of the zip members by parsing the central directory directly,
+     which is several times faster than building a `ZipInfo` per member for huge archives.
+    """
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        file_size = f.tell()
+        tail_size = min(file_size, 65536 + 22)
+        f.seek(file_size - tail_size)
+        tail = f.read(tail_size)
+        eocd = tail.rfind(b'PK\x05\x06')
+        if eocd == -1:
+            raise ValueError(f"'{path}' is not a valid zip file.")
+        eocd_position = file_size - tail_size + eocd
+        num_entries, cd_size, _ = struct.unpack_from('<HLL', tail, eocd + 10)
+        cd_end = eocd_position
+
+        if num_entries == 0xFFFF or cd_size == 0xFFFFFFFF:
+            # zip64: the locator precedes the end of central directory record
+            locator = tail.rfind(b'PK\x06\x07', 0, eocd)
+            if locator == -1:
+                raise ValueError(f"'{path}' has a corrupted zip64 record.")
+            zip64_position, = struct.unpack_from('<4xQ', tail, locator + 4)
+            f.seek(zip64_position)
+            record = f.read(56)
+            num_entries, cd_size = struct.unpack_from('<QQ', record, 32)
+            cd_end = zip64_position
+
+        # the data prepended to the archive (e.g., a self-extractor) shifts all the offsets
+        f.seek(cd_end - cd_size)
+        cd = f.read(cd_size)
+
+    position = 0
+    unpack = _ZIP_CENTRAL_HEADER.unpack_from
+    for _ in range(num_entries):
+        signature, flags, size, name_length, extra_length, comment_length = unpack(cd, position)
+        if signature != b'PK\x01\x02':
+            raise ValueError(f"'{path}' has a corrupted central directory.")
+        name_start = position + 46
+        name_end = name_start + name_length
+        try:
+            # names without the UTF-8 flag are nearly always ASCII, which decodes the same in both codecs
+            name = cd[name_start:name_end].decode('utf-8')
+        except UnicodeDecodeError:
+            name = cd[name_start:name_end].decode('utf-8' if flags & 0x800 else 'cp437', errors='replace')
+        if size == 0xFFFFFFFF:
+            size = _zip64_size(cd, name_end, extra_length, size)
+        position = name_end + extra_length + comment_length
+        yield name, size, name.endswith('/')
+
+
+def _zip64_size(cd: bytes, position: int, length: int, default: int) -> int:
+    """
+    Read the uncompressed size from the zip64 extra field of a member.
+    """
+    end = position + length
+    while position + 4 <= end:
+        header_id, data_length = struct.unpack_from('<HH', cd, position)
+        if header_id == 0x0001:
+            return struct.unpack_from('<Q', cd, position + 4)[0]
+        position += 4 + data_length
+    return default
+
+
+def _iter_tar_entries(path: str):
+    """
+    Iterate the (name, size, is_dir) of the tar members from the headers, uncompressed archives are
+     inspected by seeking over the member data, compressed ones have to be decompressed.
+    """
+    with tarfile.open(path, mode='r:*') as archive:
+        for member in archive:
+            if member.isdir():
+                yield member.name.rstrip('/') + '/', 0, True
+            else:
+                yield member.name, member.size, False
+
+
+def _iter_7z_entries(path: str):
+    """
+    Iterate the (name, size, is_dir) of the 7z members from the archive header.
+    """
+    with py7zr.SevenZipFile(path, mode='r') as archive:
+        for info in archive.list():
+            if info.is_directory:
+                yield info.filename.rstrip('/') + '/', 0, True
+            else:
+                yield info.filename, info.uncompressed or 0, False
+
+
+ARCHIVE_ENTRY_READERS = {
+    'zip': _iter_zip_entries,
+    'tar': _iter_tar_entries,
+    '7z': _iter_7z_entries,
+}
+
+
+def inspect_archive(path: str, show_hidden: bool = False, max_files: int = 50) -> Dict[str, Any]:
+    """
+    Inspect an archive from its central directory or headers only (no member is decompressed, except for
+     compressed tar archives), and aggregate the member statistics.
+    :param path: the path to the archive.
+    :param show_hidden: whether to include the hidden members (starting with a dot).
+    :param max_files: the maximum number of file names to keep as examples.
+    :return: the format, the file/directory/hidden counts, the total uncompressed size, the directory
+     rollups (`{directory: [files, size]}` including the subdirectories), the extension counts and
+     the example files.
+    """
+    archive_format = detect_archive_format(path)
+    if archive_format not in ARCHIVE_ENTRY_READERS:
+        raise ValueError(f"'{path}' is not an archive (zip, tar or 7z).")
+
+    direct = {}  # directory -> [files, size] of the files directly in it
+    extensions = {}
+    top_files, nested_files = [], []
+    num_hidden = 0
+    for name, size, is_dir in ARCHIVE_ENTRY_READERS[archive_format](path):
+        # the members of an archive of a directory (e.g., `tar -C dir -czf x.tar.gz .`) are named `./...`
+        name = name.lstrip('/')
+        while name.startswith('./'):
+            name = name[2:].lstrip('/')
+        if name in ('', '.'):
+            continue
+        if not show_hidden and any(part.startswith('.') for part in name.split('/') if part not in ('', '.')):
+            num_hidden += 1
+            continue
+        if is_dir:
+            if name not in direct:
+                direct[name] = [0, 0]
+            continue
+
+        slash = name.rfind('/')
+        directory = name[:slash + 1]
+        stats = direct.get(directory)
+        if stats is None:
+            stats = direct[directory] = [0, 0]
+        stats[0] += 1
+        stats[1] += size
+
+        dot = name.rfind('.')
+        extension = name[dot:].lower() if dot > slash + 1 else '(no extension)'
+        extensions[extension] = extensions.get(extension, 0) + 1
+        if slash == -1:
+            if len(top_files) < max_files:
+                top_files.append((name, size))
+        elif len(nested_files) < max_files:
+            nested_files.append((name, size))
+
+    # roll the file counts and sizes up to all the ancestor directories
+    directories = {}
+    total = [0, 0]
+    for directory, (count, size) in direct.items():
+        total[0] += count
+        total[1] += size
+        position = directory.find('/') + 1
+        while position:
+            stats = directories.get(directory[:position])
+            if stats is None:
+                stats = directories[directory[:position]] = [0, 0]
+            stats[0] += count
+            stats[1] += size
+            position = directory.find('/', position) + 1
+
+    return {
+        "format": archive_format,
+        "num_files": total[0],
+        "num_dirs": len(directories),
+        "num_hidden": num_hidden,
+        "total_size": total[1],
+        "directories": directories,
+        "extensions": extensions,
+        "files": (top_files + nested_files)[:max_files],
+    }
+
+
+def format_size(num_bytes: float) -> str:
+    """
+    Format a number of bytes as a human-readable size.
+    """
+    for unit in ('B', 'KB', 'MB', 'GB', 'TB'):
+        if num_bytes < 1024 or unit == 'TB':
+            return f"{num_bytes:.0f} {unit}" if unit == 'B' else f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
@@ -1,9 +1,15 @@
+import os
+import time
 import pickle
+import sqlite3
+from contextlib import contextmanager
 from typing import Dict, Any, Optional
 from datetime import datetime
 
 from mle.utils.system import get_config, write_config
 
+SHARED_CACHE_PATH = os.path.join('.mle', 'cache.db')
+
 
 class WorkflowCacheOperator:
     """
@@ -184,4 +190,77 @@ class WorkflowCache:
         Returns:
             str: The string representation of the cache.
         """
-        return "\n".join(f"[{k}] {v['name']} ({v['time']})" for k, v in self.cache.items())
\ No newline at end of file
+        return "\n".join(f"[{k}] {v['name']} ({v['time']})" for k, v in self.cache.items())
+
+
+class SharedCache:
+    """
+    SharedCache: a key-value cache with expiry in a SQLite database, shared by all the processes
+     on the host (e.g., the workers of `mle serve`).
+    """
+
+    def __init__(self, path: str = SHARED_CACHE_PATH, ttl: float = 300):
+        """
+        Args:
+            path (str): The path to the SQLite database.
+            ttl (float): The default number of seconds a value is kept.
+        """
+        self.path = path
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, expires_at REAL)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Any:
+        """
+        Get a value from the cache.
+
+        Args:
+            key (str): The key of the value.
+
+        Returns:
+            object: The value, or None if the key does not exist or has expired.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return pickle.loads(row[0]) if row is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store a value into the cache.
+
+        Args:
+            key (str): The key of the value.
+            value (object): The value to be stored.
+            ttl (float): The number of seconds the value is kept, the default TTL if not given.
+        """
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, pickle.dumps(value), expires_at),
+            )
+
+    def purge(self) -> int:
+        """
+        Remove the expired values.
+
+        Returns:
+            int: The number of removed values.
+        """
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),)).rowcount
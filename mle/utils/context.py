@@ -0,0 +1,235 @@
+"""
+Context window management for the agents' chat histories.
+"""
+import json
+import functools
+from typing import List, Dict, Any, Optional, Callable
+
+import tiktoken
+
+# the context window sizes (in tokens) by model name prefix, the longest matched prefix wins
+MODEL_CONTEXT_WINDOWS = {
+    'gpt-4o': 128000,
+    'gpt-4.1': 1047576,
+    'gpt-4-turbo': 128000,
+    'gpt-4': 8192,
+    'gpt-3.5-turbo': 16385,
+    'o1': 200000,
+    'o3': 200000,
+    'o4': 200000,
+    'claude': 200000,
+    'gemini': 1048576,
+    'deepseek': 64000,
+    'mistral-large': 128000,
+    'mistral': 32000,
+    'codestral': 256000,
+    'llama3': 8192,
+    'llama3.1': 128000,
+    'qwen2.5': 32768,
+}
+
+# the fallback context window sizes (in tokens) by model platform
+PLATFORM_CONTEXT_WINDOWS = {
+    'OpenAI': 128000,
+    'Claude': 200000,
+    'Gemini': 1048576,
+    'DeepSeek': 64000,
+    'MistralAI': 32000,
+    'Ollama': 8192,
+    'vLLM': 32768,
+}
+
+DEFAULT_CONTEXT_WINDOW = 8192
+# the number of tokens reserved for the model's completion
+DEFAULT_OUTPUT_RESERVE = 4096
+# the fixed token overhead of each message (role, separators, etc.)
+MESSAGE_TOKEN_OVERHEAD = 4
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoder(model_name: Optional[str] = None):
+    """
+    Get the (cached) tiktoken encoder of a model, fallback to `o200k_base` for unknown models.
+    :param model_name: the model name.
+    :return: the tiktoken encoder, or None if it can not be loaded (e.g., offline, without the cached BPE file).
+    """
+    try:
+        try:
+            return tiktoken.encoding_for_model(model_name)
+        except (KeyError, TypeError):
+            return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+
+@functools.lru_cache(maxsize=8192)
+def count_text_tokens(text: str, model_name: Optional[str] = None) -> int:
+    """
+    Count the tokens of a text with the model's encoder, the results are cached by text. Without the
+     encoder, the tokens are estimated as 4 characters each.
+    :param text: the text to count.
+    :param model_name: the model name.
+    :return: the number of tokens.
+    """
+    encoder = get_encoder(model_name)
+    if encoder is None:
+        return len(text) // 4
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(message: Dict[str, Any], model_name: Optional[str] = None) -> int:
+    """
+    Count the tokens of a chat message.
+    :param message: the chat message.
+    :param model_name: the model name.
+    :return: the number of tokens.
+    """
+    num_tokens = MESSAGE_TOKEN_OVERHEAD
+    for key, value in message.items():
+        if value is None:
+            continue
+        if not isinstance(value, str):
+            value = json.dumps(value, default=str)
+        num_tokens += count_text_tokens(value, model_name)
+    return num_tokens
+
+
+def get_context_window(model_name: Optional[str] = None, platform: Optional[str] = None) -> int:
+    """
+    Get the context window size of a model.
+    :param model_name: the model name.
+    :param platform: the model platform, used when the model name is unknown.
+    :return: the context window size in tokens.
+    """
+    if model_name:
+        name = model_name.lower().split('/')[-1]
+        matched = [prefix for prefix in MODEL_CONTEXT_WINDOWS if name.startswith(prefix)]
+        if matched:
+            return MODEL_CONTEXT_WINDOWS[max(matched, key=len)]
+    return PLATFORM_CONTEXT_WINDOWS.get(platform, DEFAULT_CONTEXT_WINDOW)
+
+
+class ContextWindowManager:
+    """
+    ContextWindowManager keeps a chat history under a token budget. The leading system prompts and the most
+    recent turns are pinned, the turns in between are dropped (or summarized) when the budget is exceeded,
+    the order of the kept messages never changes.
+    """
+
+    def __init__(
+            self,
+            model,
+            budget: Optional[int] = None,
+            keep_turns: int = 2,
+            summarize: bool = False,
+            output_reserve: int = DEFAULT_OUTPUT_RESERVE,
+    ):
+        """
+        Args:
+            model: the model (or the observable model) the chat history is sent to.
+            budget: the maximum number of prompt tokens, capped by the model's context window.
+            keep_turns: the number of the most recent turns that are always kept.
+            summarize: whether to summarize the dropped turns with the model instead of discarding them.
+            output_reserve: the number of tokens reserved for the model's completion.
+        """
+        backend = model
+        if not isinstance(getattr(model, "model", None), str):
+            # unwrap the observable model to get the backend
+            backend = getattr(model, "model", model)
+
+        self.model = model
+        self.model_name = getattr(backend, "model", None)
+        window = get_context_window(self.model_name, getattr(backend, "model_type", None))
+        self.budget = max(window - output_reserve, 0)
+        if budget:
+            self.budget = min(self.budget, int(budget))
+        self.keep_turns = keep_turns
+        self.summarize = summarize
+        self.summary_message = None
+
+    def count_tokens(self, messages: List[Dict[str, Any]]) -> int:
+        """
+        Count the tokens of a list of chat messages.
+        :param messages: the chat messages.
+        :return: the number of tokens.
+        """
+        return sum(count_message_tokens(msg, self.model_name) for msg in messages)
+
+    @staticmethod
+    def _split_turns(messages: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """
+        Split the messages into turns, a turn starts from a user's text message and includes the following
+         function calls and results, so a function call is never separated from its result.
+        """
+        turns = []
+        for msg in messages:
+            if not turns or (msg.get("role") == "user" and isinstance(msg.get("content"), str)):
+                turns.append([])
+            turns[-1].append(msg)
+        return turns
+
+    def _summarize_turns(self, turns: List[List[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """
+        Summarize the dropped turns (together with the previous summary) into a system message.
+        """
+        conversation = "\n".join(
+            f"{msg.get('role')}: {msg.get('content')}" for turn in turns for msg in turn if msg.get("content")
+        )
+        if self.summary_message:
+            conversation = f"{self.summary_message['content']}\n{conversation}"
+
+        try:
+            summary = self.model.query([
+                {
+                    "role": "system",
+                    "content": "Summarize the conversation below within 200 words, keep the key facts, "
+                               "decisions, file paths and unresolved issues."
+                },
+                {"role": "user", "content": conversation},
+            ])
+        except Exception:
+            return self.summary_message
+        return {"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"}
+
+    def fit(self, chat_history: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Trim the chat history to fit the token budget.
+        :param chat_history: the chat history.
+        :return: the trimmed chat history (the input list is returned as is if it already fits).
+        """
+        if self.count_tokens(chat_history) <= self.budget:
+            return chat_history
+
+        messages = [msg for msg in chat_history if msg is not self.summary_message]
+        # the leading system prompts are pinned, the later system messages stay in their turns
+        num_leading = 0
+        while num_leading < len(messages) and messages[num_leading].get("role") == "system":
+            num_leading += 1
+        system_messages = messages[:num_leading]
+        turns = self._split_turns(messages[num_leading:])
+        pinned_turns = turns[-self.keep_turns:] if self.keep_turns > 0 else []
+        candidate_turns = turns[:len(turns) - len(pinned_turns)]
+
+        used = self.count_tokens(system_messages) + sum(self.count_tokens(turn) for turn in pinned_turns)
+        if self.summary_message:
+            used += count_message_tokens(self.summary_message, self.model_name)
+
+        # keep as many of the newer turns as the budget allows
+        kept_turns = []
+        for turn in reversed(candidate_turns):
+            turn_tokens = self.count_tokens(turn)
+            if used + turn_tokens > self.budget:
+                break
+            kept_turns.insert(0, turn)
+            used += turn_tokens
+
+        dropped_turns = candidate_turns[:len(candidate_turns) - len(kept_turns)]
+        if dropped_turns and self.summarize:
+            self.summary_message = self._summarize_turns(dropped_turns)
+
+        trimmed = list(system_messages)
+        if self.summary_message:
+            trimmed.append(self.summary_message)
+        for turn in kept_turns + pinned_turns:
+            trimmed.extend(turn)
+        return trimmed
@@ -0,0 +1,284 @@
+"""
+The dependency manager: installs the dependencies listed by the coder into cached virtual environments, keyed
+ by the content of the requirement set (and the interpreter), so the same dependencies are installed once across
+ the runs and the projects. The environments see the packages of the base environment, and an environment of a
+ larger requirement set is layered on the cached environment of a subset, so only the new requirements are
+ installed.
+"""
+import os
+import re
+import sys
+import json
+import glob
+import shutil
+import hashlib
+import threading
+import subprocess
+from contextlib import contextmanager
+from importlib import metadata
+from typing import Optional, Dict, Any, List, Iterable
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows, the environments are then only guarded within the process
+    fcntl = None
+
+try:
+    from packaging.requirements import Requirement, InvalidRequirement
+except ImportError:  # without `packaging`, the requirements are only checked by the package names
+    Requirement, InvalidRequirement = None, ValueError
+
+ENV_CACHE_DIR = os.environ.get("MLE_ENV_CACHE", os.path.join(os.path.expanduser("~"), ".mle", "envs"))
+ENV_MARKER = ".mle_env.json"
+# the .pth file which adds the site-packages of the base and the layered environments
+LAYERS_PTH = "_mle_layers.pth"
+# the time limit (in seconds) of installing an environment
+INSTALL_TIMEOUT = 1800
+# the import names which are often listed instead of the package names
+PACKAGE_ALIASES = {
+    "sklearn": "scikit-learn",
+    "cv2": "opencv-python",
+    "pil": "pillow",
+    "yaml": "pyyaml",
+    "bs4": "beautifulsoup4",
+    "skimage": "scikit-image",
+}
+_NAME = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)")
+# a requirement (the name, the extras and the version specifiers), the trailing notes are dropped
+_REQUIREMENT = re.compile(
+    r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)\s*(\[[A-Za-z0-9._,\s-]*\])?\s*"
+    r"((?:[<>=!~]=?=?\s*[A-Za-z0-9.*+!-]+)(?:\s*,\s*[<>=!~]=?=?\s*[A-Za-z0-9.*+!-]+)*)?"
+)
+# the standard library modules, which are never installed
+_STDLIB_MODULES = set(getattr(sys, "stdlib_module_names", ()))
+
+
+def _canonical_name(name: str) -> str:
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+class DependencyManager:
+    """
+    DependencyManager: prepares the environment of the dependencies required by the generated code. The
+     requirements of a project accumulate, so the code of every task of the project runs in one environment,
+     which is shared with the other projects of the same requirement set. The commands run in the environment
+     with `variables`.
+    """
+
+    def __init__(self, cache_dir: str = ENV_CACHE_DIR):
+        """
+        Args:
+            cache_dir: the directory of the cached environments.
+        """
+        self.cache_dir = cache_dir
+        self.requirements: Dict[str, Dict[str, str]] = {}  # the requirements by the project directory
+        self._lock = threading.Lock()
+        self._env_locks: Dict[str, threading.Lock] = {}
+
+    @staticmethod
+    def parse(dependencies: Optional[Iterable[str]]) -> Dict[str, str]:
+        """
+        Parse the dependency list of the coder into the requirements by the canonical package name, the
+         standard library modules and the malformed entries are dropped.
+        :param dependencies: the dependency list, e.g. ["pandas", "torch>=2.0", "sklearn"].
+        :return: the requirements by the package name.
+        """
+        if isinstance(dependencies, str):
+            dependencies = re.split(r"[,\n]", dependencies)
+        requirements = {}
+        for dependency in dependencies or []:
+            dependency = str(dependency).strip().strip("'\"")
+            if dependency.lower().startswith("pip install "):
+                dependency = dependency[len("pip install "):].strip()
+            match = _REQUIREMENT.match(dependency)
+            if not match:
+                continue
+            name, extras, specifier = match.group(1), match.group(2) or "", match.group(3) or ""
+            if name in _STDLIB_MODULES or name.lower() == "python":
+                continue
+            name = PACKAGE_ALIASES.get(name.lower(), name)
+            requirements[_canonical_name(name)] = (name + extras + specifier).replace(" ", "")
+        return requirements
+
+    @staticmethod
+    def _interpreter() -> str:
+        """
+        The interpreter the environments are built on, the environments of another interpreter are not reused.
+        """
+        return f"{sys.implementation.cache_tag}\n{sys.platform}\n{sys.prefix}"
+
+    def env_dir(self, requirements: Iterable[str]) -> str:
+        """
+        The directory of the environment of a requirement set, keyed by its normalized content and the interpreter.
+        :param requirements: the requirements.
+        """
+        key = self._interpreter() + "\n" + "\n".join(sorted(requirements))
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode("utf-8")).hexdigest()[:16])
+
+    @staticmethod
+    def _python(env_dir: str) -> str:
+        return os.path.join(env_dir, "Scripts" if os.name == "nt" else "bin", "python")
+
+    @staticmethod
+    def _site_packages(env_dir: str) -> List[str]:
+        return glob.glob(os.path.join(env_dir, "lib", "python*", "site-packages")) + \
+            glob.glob(os.path.join(env_dir, "Lib", "site-packages"))
+
+    @staticmethod
+    def _read_marker(env_dir: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(env_dir, ENV_MARKER), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def is_satisfied(requirement: str, paths: Optional[List[str]] = None) -> bool:
+        """
+        Whether a requirement is satisfied by the packages in the paths, which shadow the base environment.
+        :param requirement: the requirement, e.g. "torch>=2.0".
+        :param paths: the site-packages directories of an environment, None for the base environment only.
+        """
+        name, specifier = _NAME.match(requirement).group(1), None
+        if Requirement is not None:
+            try:
+                parsed = Requirement(requirement)
+                name, specifier = parsed.name, parsed.specifier
+            except InvalidRequirement:
+                pass
+        version = None
+        if paths:
+            dist = next(iter(metadata.distributions(name=name, path=paths)), None)
+            version = dist.version if dist is not None else None
+        if version is None:
+            try:
+                version = metadata.version(name)
+            except metadata.PackageNotFoundError:
+                return False
+        return specifier is None or specifier.contains(version, prereleases=True)
+
+    def _find_layer(self, requirements: List[str]) -> Optional[Dict[str, Any]]:
+        """
+        Find the cached environment of the largest subset of the requirements (of the same interpreter), to
+         layer the new environment on.
+        """
+        best = None
+        for marker_path in glob.glob(os.path.join(self.cache_dir, "*", ENV_MARKER)):
+            marker = self._read_marker(os.path.dirname(marker_path))
+            if not marker or marker.get("interpreter") != self._interpreter():
+                continue
+            if set(marker["requirements"]) <= set(requirements):
+                if best is None or len(marker["requirements"]) > len(best["requirements"]):
+                    best = marker
+        return best
+
+    @contextmanager
+    def _env_lock(self, env_dir: str):
+        """
+        Hold the lock of an environment, across the threads and the processes installing it.
+        """
+        with self._lock:
+            lock = self._env_locks.setdefault(env_dir, threading.Lock())
+        with lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(env_dir + ".lock", "w") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _install(self, env_dir: str, requirements: List[str], layers: List[str]) -> None:
+        """
+        Create the environment (on top of the base environment and the layers) and install the requirements.
+        """
+        import venv
+        import site
+
+        uv = shutil.which("uv")
+        if os.path.exists(env_dir):
+            shutil.rmtree(env_dir)  # a failed install of an earlier run
+        venv.EnvBuilder(system_site_packages=True, with_pip=uv is None).create(env_dir)
+        # the agent may run in a virtual environment itself, whose packages are not the system site-packages
+        base = site.getsitepackages() if sys.prefix != sys.base_prefix else []
+        if layers or base:
+            with open(os.path.join(self._site_packages(env_dir)[0], LAYERS_PTH), "w") as f:
+                f.write("\n".join(layers + base) + "\n")
+        if uv is not None:
+            command = [uv, "pip", "install", "--python", self._python(env_dir), *requirements]
+        else:
+            command = [self._python(env_dir), "-m", "pip", "install", "--disable-pip-version-check", *requirements]
+        process = subprocess.run(command, capture_output=True, text=True, timeout=INSTALL_TIMEOUT)
+        if process.returncode != 0:
+            raise RuntimeError((process.stderr or process.stdout).strip()[-2000:])
+
+    def prepare(self, dependencies: Optional[Iterable[str]], project_dir: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Prepare the environment of the project dependencies: the cached environment of the requirement set is
+         reused, otherwise only the requirements which neither the base environment nor the cached environment
+         of a subset satisfy are installed.
+        :param dependencies: the new dependencies, added to the requirements of the project.
+        :param project_dir: the project directory, the current directory if not given.
+        :return: the environment, with the `env_dir` (None for the base environment), the `python` interpreter
+         to run the code, the `requirements`, the `installed` requirements, whether it was `cached` and the
+         install `error` if any.
+        """
+        project = os.path.realpath(project_dir or os.getcwd())
+        with self._lock:
+            previous = dict(self.requirements.get(project, {}))
+            project_requirements = {**previous, **self.parse(dependencies)}
+            self.requirements[project] = project_requirements
+        requirements = sorted(project_requirements.values())
+        env_dir = self.env_dir(requirements)
+        env = {"env_dir": None, "requirements": requirements, "installed": [], "cached": True, "error": None}
+
+        if self._read_marker(env_dir) is not None:
+            env["env_dir"] = env_dir
+        elif not all(self.is_satisfied(requirement) for requirement in requirements):
+            with self._env_lock(env_dir):
+                marker = self._read_marker(env_dir)  # another thread or process may have installed it meanwhile
+                if marker is None:
+                    layer = self._find_layer(requirements)
+                    layers = layer["site_packages"] if layer else []
+                    missing = [
+                        requirement for requirement in requirements if not self.is_satisfied(requirement, layers)
+                    ]
+                    env.update({"installed": missing, "cached": False})
+                    try:
+                        self._install(env_dir, missing, layers)
+                        marker = {
+                            "interpreter": self._interpreter(),
+                            "requirements": requirements,
+                            "installed": missing,
+                            "site_packages": self._site_packages(env_dir) + layers,
+                        }
+                        with open(os.path.join(env_dir, ENV_MARKER), "w") as f:
+                            json.dump(marker, f)
+                    except Exception as e:
+                        # not cached, so the next run retries, and the failed requirements are not kept
+                        env.update({"installed": [], "error": str(e)})
+                        with self._lock:
+                            self.requirements[project] = previous
+                        marker = None
+                if marker is not None:
+                    env["env_dir"] = env_dir
+        env["python"] = self._python(env["env_dir"]) if env["env_dir"] else sys.executable
+        return env
+
+    @staticmethod
+    def variables(env: Dict[str, Any]) -> Dict[str, str]:
+        """
+        The environment variables to run the commands in a prepared environment: `python` is the interpreter
+         the requirements were checked against, not another one on the PATH.
+        :param env: the environment, from `prepare`.
+        """
+        path = os.path.dirname(env["python"]) + os.pathsep + os.environ.get("PATH", "")
+        if env.get("env_dir"):
+            return {"VIRTUAL_ENV": env["env_dir"], "PATH": path}
+        return {"PATH": path}
+
+
+dependency_manager = DependencyManager()
@@ -0,0 +1,287 @@
+"""
+Offline paper index: a local LanceDB table of papers with a full-text index and an optional vector
+ index, used as a search backend without network access.
+"""
+import os
+import re
+import json
+import hashlib
+import threading
+from typing import List, Dict, Any, Iterable, Iterator
+
+import lancedb
+
+PAPER_INDEX_DIR = os.environ.get('MLE_PAPER_INDEX', os.path.join(os.path.expanduser('~'), '.mle', 'papers'))
+PAPER_TABLE = 'papers'
+# the number of papers written to the table at once when ingesting
+INGEST_BATCH_SIZE = 10_000
+# the fraction of the query terms a paper must contain to be a good match
+GOOD_MATCH_COVERAGE = 0.6
+# the minimum number of rows to build an ANN index, smaller tables are searched exhaustively
+MIN_ROWS_FOR_VECTOR_INDEX = 5_000
+# the fields of an indexed paper
+PAPER_FIELDS = ['id', 'title', 'abstract', 'authors', 'categories', 'published', 'link', 'code', 'source']
+
+_TERM_PATTERN = re.compile(r'[a-z0-9]+')
+# the FTS query syntax characters, removed from the free-text queries
+_QUERY_SPECIAL = re.compile(r'[+\-&|!(){}\[\]^"~*?:\\/]')
+# guards the first-use creation of the tables, e.g., by the concurrent searches of `multi_search`
+_CREATE_LOCK = threading.Lock()
+
+
+def _paper_id(title: str) -> str:
+    """
+    The id of a paper without a source id, derived from the normalized title so duplicates merge.
+    """
+    normalized = ' '.join(_TERM_PATTERN.findall((title or '').lower()))
+    return 'title:' + hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+
+
+def _to_record(paper: Dict[str, Any]) -> Dict[str, str]:
+    record = {field: paper.get(field) or '' for field in PAPER_FIELDS}
+    if isinstance(paper.get('authors'), (list, tuple)):
+        record['authors'] = ', '.join(str(author) for author in paper['authors'])
+    record['title'] = ' '.join(record['title'].split())
+    record['id'] = str(record['id'] or _paper_id(record['title']))
+    record['text'] = f"{record['title']}\n{record['abstract']}"
+    return record
+
+
+def iter_arxiv_dump(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Iterate the papers of an arXiv metadata dump (JSON lines, e.g., the Kaggle `arxiv-metadata-oai-snapshot.json`).
+    :param path: the path to the dump.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            yield {
+                'id': f"arxiv:{item['id']}",
+                'title': item.get('title'),
+                'abstract': ' '.join((item.get('abstract') or '').split()),
+                'authors': item.get('authors'),
+                'categories': item.get('categories'),
+                'published': item.get('update_date'),
+                'link': f"https://arxiv.org/abs/{item['id']}",
+                'source': 'arxiv',
+            }
+
+
+def iter_search_cache(cache_dir: str) -> Iterator[Dict[str, Any]]:
+    """
+    Iterate the papers in the cached search results of the arXiv and Papers With Code providers.
+    :param cache_dir: the search cache directory.
+    """
+    if not os.path.isdir(cache_dir):
+        return
+    for file_name in os.listdir(cache_dir):
+        if not file_name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(cache_dir, file_name), 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if entry.get('provider') in ('arxiv', 'papers_with_code'):
+            for paper in entry.get('results') or []:
+                yield to_paper(paper, entry['provider'])
+
+
+def to_paper(result: Dict[str, Any], provider: str) -> Dict[str, Any]:
+    """
+    Convert a search result of the arXiv or Papers With Code provider into a paper.
+    :param result: the search result.
+    :param provider: the provider name.
+    """
+    link = result.get('link') or ''
+    match = re.search(r'arxiv\.org/(?:abs|pdf)/(.+?)(?:v\d+)?(?:\.pdf)?$', link)
+    arxiv_id = match.group(1) if match else None
+    code = result.get('code')
+    return {
+        'id': f"arxiv:{arxiv_id}" if arxiv_id else None,
+        'title': result.get('title'),
+        'abstract': result.get('summary'),
+        'authors': result.get('authors'),
+        'published': result.get('published'),
+        'link': link,
+        'code': code if code and code.startswith('http') else None,
+        'source': provider,
+    }
+
+
+class PaperIndex:
+    """
+    PaperIndex: the local paper index, papers are upserted by id, searched by BM25 full-text search
+     (and by vectors when an embedding function is given), and ranked by reciprocal rank fusion.
+    """
+
+    def __init__(self, uri: str = PAPER_INDEX_DIR, embedding=None, table_name: str = PAPER_TABLE):
+        """
+        Args:
+            uri: the LanceDB directory of the index.
+            embedding: an optional LanceDB embedding function to build the vector index.
+            table_name: the name of the table.
+        """
+        self.uri = uri
+        self.table_name = table_name
+        self.embedding = embedding
+        self.client = lancedb.connect(uri=uri)
+        self._index_lock = threading.Lock()
+        self._index_requested = False
+        self._index_thread = None
+
+    def _open_table(self):
+        """
+        Open the paper table. (Return None if not exists)
+        """
+        if self.table_name not in self.client.table_names():
+            return None
+        return self.client.open_table(self.table_name)
+
+    def count(self) -> int:
+        table = self._open_table()
+        return table.count_rows() if table is not None else 0
+
+    def add(self, papers: Iterable[Dict[str, Any]], reindex: bool = True) -> int:
+        """
+        Upsert papers into the index.
+        :param papers: the papers, with the `PAPER_FIELDS` keys.
+        :param reindex: whether to rebuild the indices now (e.g., after a bulk ingest), otherwise the new papers are
+         indexed incrementally in the background, and the searches serve the existing indices meanwhile.
+        :return: the number of papers written.
+        """
+        total = 0
+        batch = {}
+        for paper in papers:
+            record = _to_record(paper)
+            if record['title']:
+                batch[record['id']] = record
+            if len(batch) >= INGEST_BATCH_SIZE:
+                total += self._write(list(batch.values()))
+                batch = {}
+        if batch:
+            total += self._write(list(batch.values()))
+
+        if total:
+            if reindex:
+                self.reindex()
+            else:
+                self.update_index_in_background()
+        return total
+
+    def _write(self, records: List[Dict[str, Any]]) -> int:
+        if self.embedding is not None:
+            vectors = self.embedding.compute_source_embeddings([record['text'] for record in records])
+            for record, vector in zip(records, vectors):
+                record['vector'] = vector
+
+        with _CREATE_LOCK:
+            table = self._open_table()
+            if table is None:
+                self.client.create_table(self.table_name, data=records)
+                return len(records)
+        table.merge_insert('id').when_matched_update_all().when_not_matched_insert_all().execute(records)
+        return len(records)
+
+    def reindex(self) -> None:
+        """
+        Rebuild the full-text index (and the vector index of a large table).
+        """
+        table = self._open_table()
+        if table is None:
+            return
+        # the native (Lance) full-text index, which `optimize` updates incrementally, unlike the tantivy one
+        table.create_fts_index('text', use_tantivy=False, replace=True)
+        if self.embedding is not None and table.count_rows() >= MIN_ROWS_FOR_VECTOR_INDEX:
+            table.create_index(metric='cosine', replace=True)
+
+    def update_index(self) -> None:
+        """
+        Add the papers written since the last indexing into the existing indices, the missing indices are built.
+        """
+        table = self._open_table()
+        if table is None:
+            return
+        indexed = {column for index in table.list_indices() for column in index.columns}
+        if 'text' not in indexed:
+            self.reindex()
+            return
+        if self.embedding is not None and 'vector' not in indexed and table.count_rows() >= MIN_ROWS_FOR_VECTOR_INDEX:
+            table.create_index(metric='cosine')
+        table.optimize()
+
+    def update_index_in_background(self) -> None:
+        """
+        Request an incremental index update, run by a background thread; the requests made while it runs
+         are merged into one more update.
+        """
+        with self._index_lock:
+            self._index_requested = True
+            if self._index_thread is not None:
+                return
+            self._index_thread = threading.Thread(target=self._update_index_worker, daemon=True)
+            self._index_thread.start()
+
+    def _update_index_worker(self) -> None:
+        while True:
+            with self._index_lock:
+                if not self._index_requested:
+                    self._index_thread = None
+                    return
+                self._index_requested = False
+            try:
+                self.update_index()
+            except Exception:
+                pass  # the papers stay searchable by the existing index, the next update retries
+
+    @staticmethod
+    def _coverage(query_terms: set, paper: Dict[str, Any]) -> float:
+        if not query_terms:
+            return 0.0
+        paper_terms = set(_TERM_PATTERN.findall(f"{paper['title']} {paper['abstract']}".lower()))
+        return len(query_terms & paper_terms) / len(query_terms)
+
+    def search(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Search the index.
+        :param query: the free-text query.
+        :param limit: the maximum number of papers to return.
+        :return: the papers, each with a `coverage` (the fraction of the query terms it contains).
+        """
+        table = self._open_table()
+        if table is None:
+            return []
+
+        text_query = _QUERY_SPECIAL.sub(' ', query).strip()
+        ranked_lists = []
+        if text_query:
+            ranked_lists.append(table.search(text_query, query_type='fts').limit(limit * 2).to_list())
+        if self.embedding is not None:
+            vector = self.embedding.compute_query_embeddings(query)[0]
+            ranked_lists.append(table.search(vector).limit(limit * 2).to_list())
+
+        # reciprocal rank fusion of the full-text and the vector results
+        scores, papers = {}, {}
+        for results in ranked_lists:
+            for rank, paper in enumerate(results):
+                scores[paper['id']] = scores.get(paper['id'], 0.0) + 1.0 / (60 + rank)
+                papers[paper['id']] = paper
+
+        query_terms = set(_TERM_PATTERN.findall(query.lower()))
+        output = []
+        for paper_id in sorted(scores, key=scores.get, reverse=True)[:limit]:
+            paper = {field: papers[paper_id].get(field) for field in PAPER_FIELDS}
+            paper['coverage'] = self._coverage(query_terms, paper)
+            output.append(paper)
+        return output
+
+    def good_matches(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Search the index and keep only the good matches, which contain most of the query terms.
+        """
+        try:
+            return [paper for paper in self.search(query, limit) if paper['coverage'] >= GOOD_MATCH_COVERAGE]
+        except Exception:
+            return []
@@ -0,0 +1,689 @@
+"""
+Streaming dataset profiler: computes the column statistics of large tabular files in bounded memory.
+"""
+import os
+import json
+import math
+import hashlib
+from typing import Dict, Any, List, Optional, Iterable
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+# the rows per chunk when streaming a file
+DEFAULT_CHUNK_SIZE = 100_000
+# the number of rows used to infer the column dtypes before streaming
+DTYPE_SAMPLE_ROWS = 10_000
+# the maximum number of distinct values tracked exactly, HyperLogLog is used beyond it
+EXACT_DISTINCT_LIMIT = 1_000
+# the fraction of distinct values in the sampled rows beyond which a column is taken as unique in the whole file
+UNIQUE_SAMPLE_RATIO = 0.95
+# the number of example values kept per column
+RESERVOIR_SIZE = 20
+# the size of each block read for the content fingerprint (head, middle and tail)
+FINGERPRINT_BLOCK_SIZE = 64 * 1024
+PROFILE_CACHE_DIR = os.path.join('.mle', 'profiles')
+
+
+class HyperLogLog:
+    """
+    HyperLogLog: estimate the number of distinct values in a stream with a fixed memory (2^p registers).
+    """
+
+    def __init__(self, p: int = 12):
+        """
+        Args:
+            p: the precision, the relative error is about 1.04 / sqrt(2^p) (1.6% for p=12).
+        """
+        self.p = p
+        self.m = 1 << p
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def add_hashes(self, hashes: np.ndarray) -> None:
+        """
+        Add a batch of 64-bit hashes into the sketch.
+        :param hashes: the uint64 hashes of the values.
+        """
+        if len(hashes) == 0:
+            return
+        hashes = hashes.astype(np.uint64, copy=False)
+        index = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - self.p)) - 1)
+        # the position of the leftmost 1-bit in the remaining (64 - p) bits
+        bit_length = np.zeros(len(rest), dtype=np.int64)
+        nonzero = rest > 0
+        bit_length[nonzero] = np.floor(np.log2(rest[nonzero].astype(np.float64))).astype(np.int64) + 1
+        rank = np.minimum(64 - self.p - bit_length + 1, 64 - self.p + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: 'HyperLogLog') -> None:
+        """
+        Merge another sketch (with the same precision) into this one.
+        """
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> int:
+        """
+        Estimate the number of distinct values.
+        """
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m ** 2 / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * self.m and zeros > 0:
+            # small range correction with linear counting
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+
+class ColumnProfile:
+    """
+    ColumnProfile accumulates the statistics of a single column chunk by chunk.
+    """
+
+    def __init__(self, name: str, reservoir_size: int = RESERVOIR_SIZE):
+        self.name = name
+        self.dtypes = []
+        self.count = 0
+        self.nan_count = 0
+        self.true_count = 0
+        self.min = None
+        self.max = None
+        self.distinct = set()
+        self.hll = HyperLogLog()
+        self.reservoir = []
+        self.reservoir_size = reservoir_size
+        self._seen = 0
+
+    def update(self, series: pd.Series) -> None:
+        """
+        Update the statistics with a chunk of the column.
+        :param series: the column values of the chunk.
+        """
+        dtype = str(series.dtype)
+        if dtype not in self.dtypes:
+            self.dtypes.append(dtype)
+
+        self.count += len(series)
+        nan_mask = series.isna()
+        self.nan_count += int(nan_mask.sum())
+        values = series[~nan_mask]
+        if values.empty:
+            return
+
+        if is_bool_dtype(values.dtype):
+            self.true_count += int(values.sum())
+        elif is_numeric_dtype(values.dtype):
+            chunk_min, chunk_max = values.min(), values.max()
+            self.min = chunk_min if self.min is None else min(self.min, chunk_min)
+            self.max = chunk_max if self.max is None else max(self.max, chunk_max)
+
+        self.hll.add_hashes(pd.util.hash_pandas_object(values, index=False).to_numpy())
+        if self.distinct is not None:
+            self.distinct.update(values.unique().tolist())
+            if len(self.distinct) > EXACT_DISTINCT_LIMIT:
+                self.distinct = None
+        self._sample(values)
+
+    def _sample(self, values: pd.Series) -> None:
+        """
+        Keep a uniform random sample of the values (reservoir sampling, Algorithm R).
+        """
+        if len(self.reservoir) < self.reservoir_size:
+            take = self.reservoir_size - len(self.reservoir)
+            self.reservoir.extend(values.iloc[:take].tolist())
+            self._seen += min(take, len(values))
+            values = values.iloc[take:]
+        if values.empty:
+            return
+
+        # the i-th value replaces a random slot with probability k / (seen + i + 1)
+        positions = np.random.randint(0, np.arange(self._seen + 1, self._seen + len(values) + 1))
+        for i in np.nonzero(positions < self.reservoir_size)[0]:
+            self.reservoir[positions[i]] = values.iloc[i]
+        self._seen += len(values)
+
+    @property
+    def dtype(self) -> str:
+        """
+        The overall dtype of the column across all chunks.
+        """
+        if len(self.dtypes) == 1:
+            return self.dtypes[0]
+        if all(d.startswith(("int", "uint", "float")) for d in self.dtypes):
+            return "float64"
+        return "object"
+
+    @property
+    def distinct_count(self) -> int:
+        """
+        The number of distinct (non-null) values, exact for low-cardinality columns, estimated otherwise.
+        """
+        if self.distinct is not None:
+            return len(self.distinct)
+        return self.hll.count()
+
+    @property
+    def is_exact_distinct(self) -> bool:
+        return self.distinct is not None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert the profile to a dictionary of plain values.
+        """
+        return {
+            "name": self.name,
+            "dtype": self.dtype,
+            "count": self.count,
+            "nan_count": self.nan_count,
+            "true_count": self.true_count,
+            "min": _to_python(self.min),
+            "max": _to_python(self.max),
+            "distinct_count": self.distinct_count,
+            "exact_distinct": self.is_exact_distinct,
+            "distinct_values": _sorted_values(self.distinct) if self.distinct is not None else None,
+            "examples": [_to_python(v) for v in self.reservoir],
+        }
+
+
+def _to_python(value):
+    """
+    Convert numpy scalars into python values.
+    """
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _sorted_values(values) -> list:
+    """
+    Sort the values if they are comparable, keep the original order otherwise.
+    """
+    values = [_to_python(v) for v in values]
+    try:
+        return sorted(values)
+    except TypeError:
+        return values
+
+
+def _infer_dtypes(path: str, usecols: Optional[List[str]], **read_kwargs) -> Dict[str, Any]:
+    """
+    Infer the column dtypes from the head of the file, text columns are pinned to strings so that
+     the chunks are parsed consistently.
+    """
+    sample = pd.read_csv(path, nrows=DTYPE_SAMPLE_ROWS, usecols=usecols, **read_kwargs)
+    return {
+        col: str for col in sample.columns
+        if not is_numeric_dtype(sample[col]) and not is_bool_dtype(sample[col])
+    }
+
+
+def profile_chunks(chunks: Iterable[pd.DataFrame]) -> Dict[str, Any]:
+    """
+    Profile a stream of data frames.
+    :param chunks: the data frame chunks of the dataset.
+    :return: the dataset profile with the row count and the column statistics.
+    """
+    profiles = {}
+    num_rows = 0
+    for chunk in chunks:
+        num_rows += len(chunk)
+        for col in chunk.columns:
+            if col not in profiles:
+                profiles[col] = ColumnProfile(col)
+            profiles[col].update(chunk[col])
+
+    return {
+        "num_rows": num_rows,
+        "columns": [profiles[col].to_dict() for col in profiles],
+    }
+
+
+def profile_csv(
+        path: str,
+        columns: Optional[List[str]] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        **read_kwargs,
+) -> Dict[str, Any]:
+    """
+    Profile a (possibly very large) CSV file by streaming it in chunks, the memory usage is bounded by
+     the chunk size regardless of the file size.
+    :param path: the path to the CSV file.
+    :param columns: the columns to profile, None means all columns.
+    :param chunk_size: the number of rows per chunk.
+    :param read_kwargs: extra arguments for `pd.read_csv` (e.g., compression).
+    :return: the dataset profile with the row count and the column statistics.
+    """
+    dtypes = _infer_dtypes(path, columns, **read_kwargs)
+    chunks = pd.read_csv(path, usecols=columns, dtype=dtypes, chunksize=chunk_size, **read_kwargs)
+    return profile_chunks(chunks)
+
+
+def profile_jsonl(
+        path: str,
+        columns: Optional[List[str]] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Dict[str, Any]:
+    """
+    Profile a (possibly compressed) JSON Lines file by streaming it in chunks.
+    :param path: the path to the JSON Lines file.
+    :param columns: the columns to profile, None means all columns.
+    :param chunk_size: the number of rows per chunk.
+    :return: the dataset profile with the row count and the column statistics.
+    """
+    chunks = pd.read_json(path, lines=True, chunksize=chunk_size)
+    if columns is not None:
+        chunks = (chunk.reindex(columns=columns) for chunk in chunks)
+    return profile_chunks(chunks)
+
+
+def profile_json(path: str, columns: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Profile a (possibly compressed) JSON file of records, e.g. an array of objects. Unlike JSON Lines,
+     it can not be streamed, so it is read as a whole.
+    :param path: the path to the JSON file.
+    :param columns: the columns to profile, None means all columns.
+    :return: the dataset profile with the row count and the column statistics.
+    """
+    data = pd.read_json(path)
+    if columns is not None:
+        data = data.reindex(columns=columns)
+    return profile_chunks([data])
+
+
+def _sample_indices(total: int, num_samples: int) -> List[int]:
+    """
+    Pick evenly spaced indices (e.g., of the row groups) to sample.
+    """
+    if total <= num_samples:
+        return list(range(total))
+    return sorted({round(i * (total - 1) / (num_samples - 1)) for i in range(num_samples)})
+
+
+def _merge_sampled_profile(profile: Dict[str, Any], num_rows: int, exact: bool) -> Dict[str, Any]:
+    """
+    Scale a profile computed on sampled row groups to the whole dataset. The distinct count of a column
+     which is (nearly) unique in the sample is scaled as well, otherwise the values repeat and the count in
+     the sample is kept, as a lower bound (`distinct_sampled`).
+    """
+    for col in profile["columns"]:
+        if not exact and col["count"]:
+            col["exact_distinct"] = False
+            scale = num_rows / col["count"]
+            sampled_non_null = col["count"] - col["nan_count"]
+            if sampled_non_null and col["distinct_count"] >= UNIQUE_SAMPLE_RATIO * sampled_non_null:
+                col["distinct_count"] = round(col["distinct_count"] * scale)
+            else:
+                col["distinct_sampled"] = True
+            col["nan_count"] = round(col["nan_count"] * scale)
+            col["true_count"] = round(col["true_count"] * scale)
+            col["count"] = num_rows
+    profile["num_rows"] = num_rows
+    return profile
+
+
+def profile_parquet(
+        path: str,
+        columns: Optional[List[str]] = None,
+        sample_row_groups: int = 4,
+) -> Dict[str, Any]:
+    """
+    Profile a Parquet file. The row count, the NaN counts and the numeric ranges come from the footer
+     metadata, while the distinct counts and the example values come from a few sampled row groups
+     of the projected columns.
+    :param path: the path to the Parquet file.
+    :param columns: the columns to profile, None means all columns.
+    :param sample_row_groups: the number of row groups to sample.
+    :return: the dataset profile with the row count and the column statistics.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    metadata = parquet_file.metadata
+    columns = columns if columns is not None else parquet_file.schema_arrow.names
+    row_groups = _sample_indices(metadata.num_row_groups, sample_row_groups)
+
+    batches = (
+        batch.to_pandas()
+        for batch in parquet_file.iter_batches(
+            batch_size=DEFAULT_CHUNK_SIZE, row_groups=row_groups, columns=columns
+        )
+    )
+    profile = _merge_sampled_profile(
+        profile_chunks(batches), metadata.num_rows, len(row_groups) == metadata.num_row_groups
+    )
+
+    # the exact statistics from the footer metadata, if every row group has them
+    leaf_index = {metadata.schema.column(i).path: i for i in range(metadata.num_columns)}
+    for col in profile["columns"]:
+        index = leaf_index.get(col["name"])
+        if index is None or metadata.num_row_groups == 0:
+            continue
+        field_type = parquet_file.schema_arrow.field(col["name"]).type
+        stats = [metadata.row_group(rg).column(index).statistics for rg in range(metadata.num_row_groups)]
+        if any(stat is None for stat in stats):
+            continue
+        if all(stat.has_null_count for stat in stats):
+            col["nan_count"] = sum(stat.null_count for stat in stats)
+        is_numeric = pa.types.is_integer(field_type) or pa.types.is_floating(field_type)
+        min_max = [stat for stat in stats if stat.has_min_max]
+        if is_numeric and min_max:
+            col["min"] = min(stat.min for stat in min_max)
+            col["max"] = max(stat.max for stat in min_max)
+    return profile
+
+
+def profile_arrow(
+        path: str,
+        columns: Optional[List[str]] = None,
+        sample_batches: int = 4,
+) -> Dict[str, Any]:
+    """
+    Profile a Feather (v2) / Arrow IPC file through a memory map. The row count is exact, the column
+     statistics come from a few sampled record batches of the projected columns.
+    :param path: the path to the Feather / Arrow file.
+    :param columns: the columns to profile, None means all columns.
+    :param sample_batches: the number of record batches to sample.
+    :return: the dataset profile with the row count and the column statistics.
+    """
+    import pyarrow as pa
+
+    with pa.memory_map(path, 'r') as source:
+        reader = pa.ipc.open_file(source)
+        columns = columns if columns is not None else reader.schema.names
+        sampled = set(_sample_indices(reader.num_record_batches, sample_batches))
+
+        num_rows = 0
+        chunks = []
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            num_rows += batch.num_rows
+            if i in sampled:
+                chunks.append(batch.select(columns).to_pandas())
+        profile = profile_chunks(chunks)
+    return _merge_sampled_profile(profile, num_rows, len(sampled) == reader.num_record_batches)
+
+
+# the compression suffixes which pandas decompresses on the fly
+COMPRESSION_SUFFIXES = ('.gz', '.bz2', '.xz', '.zst', '.zip')
+
+
+def detect_format(path: str) -> str:
+    """
+    Detect the dataset format by the file name, the compression suffix is ignored.
+    :param path: the dataset file path.
+    :return: one of 'csv', 'tsv', 'parquet', 'arrow', 'json' and 'jsonl'.
+    """
+    name = path.lower()
+    for suffix in COMPRESSION_SUFFIXES:
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+
+    ext = os.path.splitext(name)[1]
+    if ext in ('.parquet', '.pq'):
+        return 'parquet'
+    if ext in ('.feather', '.arrow', '.ipc'):
+        return 'arrow'
+    if ext in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    if ext == '.json':
+        return 'jsonl' if _is_json_lines(path) else 'json'
+    if ext == '.tsv':
+        return 'tsv'
+    return 'csv'
+
+
+def _is_json_lines(path: str) -> bool:
+    """
+    Whether a .json file is in JSON Lines, i.e. its first line is a complete JSON object.
+    """
+    from pandas.io.common import get_handle
+
+    try:
+        with get_handle(path, 'r', compression='infer') as handles:
+            for line in handles.handle:
+                if line.strip():
+                    return isinstance(json.loads(line), dict)
+    except (OSError, ValueError):
+        pass
+    return False
+
+
+def read_columns(path: str, **read_kwargs) -> List[str]:
+    """
+    Read the column names of a dataset file from its header (or footer) only.
+    """
+    fmt = detect_format(path)
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.read_schema(path).names
+    if fmt == 'arrow':
+        import pyarrow as pa
+        with pa.memory_map(path, 'r') as source:
+            return pa.ipc.open_file(source).schema.names
+    if fmt == 'jsonl':
+        return next(pd.read_json(path, lines=True, chunksize=100)).columns.tolist()
+    if fmt == 'json':
+        return pd.read_json(path).columns.tolist()
+    if fmt == 'tsv':
+        read_kwargs.setdefault('sep', '\t')
+    return pd.read_csv(path, nrows=0, **read_kwargs).columns.tolist()
+
+
+def read_schema(path: str) -> Dict[str, Any]:
+    """
+    Read the schema of a dataset file. Parquet and Arrow files only read the footer / header,
+     and give the exact row count, text files infer the column types from the first rows.
+    :param path: the dataset file path.
+    :return: the format, the row count (None if unknown without a full scan) and the column types.
+    """
+    fmt = detect_format(path)
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(path)
+        schema = parquet_file.schema_arrow
+        num_rows = parquet_file.metadata.num_rows
+        types = {field.name: str(field.type) for field in schema}
+    elif fmt == 'arrow':
+        import pyarrow as pa
+        with pa.memory_map(path, 'r') as source:
+            reader = pa.ipc.open_file(source)
+            num_rows = sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+            types = {field.name: str(field.type) for field in reader.schema}
+    else:
+        if fmt == 'jsonl':
+            sample = next(pd.read_json(path, lines=True, chunksize=DTYPE_SAMPLE_ROWS))
+        elif fmt == 'json':
+            sample = pd.read_json(path).head(DTYPE_SAMPLE_ROWS)
+        else:
+            sample = pd.read_csv(path, nrows=DTYPE_SAMPLE_ROWS, sep='\t' if fmt == 'tsv' else ',')
+        num_rows = None
+        types = {col: str(dtype) for col, dtype in sample.dtypes.items()}
+    return {"format": fmt, "num_rows": num_rows, "columns": types}
+
+
+def profile_dataset(path: str, columns: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Profile a dataset file with the profiler of its format.
+    :param path: the dataset file path.
+    :param columns: the columns to profile, None means all columns.
+    :return: the dataset profile with the row count and the column statistics.
+    """
+    fmt = detect_format(path)
+    if fmt == 'parquet':
+        return profile_parquet(path, columns)
+    if fmt == 'arrow':
+        return profile_arrow(path, columns)
+    if fmt == 'jsonl':
+        return profile_jsonl(path, columns)
+    if fmt == 'json':
+        return profile_json(path, columns)
+    if fmt == 'tsv':
+        return profile_csv(path, columns, sep='\t')
+    return profile_csv(path, columns)
+
+
+def summarize_profile(profile: Dict[str, Any], limit_rows: int = 5) -> List[str]:
+    """
+    Describe the column statistics of a dataset profile in natural language.
+    :param profile: the dataset profile.
+    :param limit_rows: the number of example values to show.
+    :return: the list of the column descriptions.
+    """
+    summary = []
+    for col in profile["columns"]:
+        name = f"{col['name']} ({col['dtype']})"
+        non_null = col["count"] - col["nan_count"]
+        if col["dtype"] == "bool" and non_null:
+            true_percentage = col["true_count"] / non_null * 100
+            summary.append(f"{name} is {true_percentage:.2f}% True, {100 - true_percentage:.2f}% False")
+        elif col["distinct_values"] is not None and col["distinct_count"] < 10:
+            summary.append(f"{name} has {col['distinct_count']} unique values: {col['distinct_values']}")
+        elif isinstance(col["min"], (int, float)) and not isinstance(col["min"], bool):
+            summary.append(
+                f"{name} has range: {col['min']:.2f} - {col['max']:.2f}, {col['nan_count']} NaN values"
+            )
+        else:
+            if col.get("distinct_sampled"):
+                distinct = f">={col['distinct_count']} unique values (in the sampled rows)"
+            else:
+                distinct = f"{'' if col['exact_distinct'] else '~'}{col['distinct_count']} unique values"
+            examples = list(dict.fromkeys(col["examples"]))[:limit_rows]
+            summary.append(
+                f"{name} has {distinct}, {col['nan_count']} NaN values. Some example values: {examples}"
+            )
+    return summary
+
+
+def file_fingerprint(path: str) -> str:
+    """
+    Fingerprint a file by its path, size, modification time and a sampled content hash (the head,
+     the middle and the tail blocks), without reading the whole file.
+    :param path: the file path.
+    :return: the hex digest of the fingerprint.
+    """
+    stat = os.stat(path)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode('utf-8'))
+    with open(path, 'rb') as f:
+        for offset in (0, stat.st_size // 2, max(stat.st_size - FINGERPRINT_BLOCK_SIZE, 0)):
+            f.seek(offset)
+            digest.update(f.read(FINGERPRINT_BLOCK_SIZE))
+    return digest.hexdigest()
+
+
+class DatasetProfileCache:
+    """
+    DatasetProfileCache stores the dataset profiles as columnar Parquet files under `.mle/profiles/`,
+    keyed by the file fingerprint, so the repeated previews of an unchanged file skip the parsing.
+    """
+
+    # the column statistics stored as JSON strings, since the values may have mixed types
+    _JSON_FIELDS = ("min", "max", "distinct_values", "examples")
+
+    def __init__(self, cache_dir: str = PROFILE_CACHE_DIR):
+        """
+        Args:
+            cache_dir: the directory to store the cached profiles.
+        """
+        self.cache_dir = cache_dir
+
+    def _cache_path(self, path: str) -> str:
+        key = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.parquet")
+
+    def load(self, path: str) -> Optional[Dict[str, Any]]:
+        """
+        Load the cached profile of a file, return None if it is missing or stale.
+        :param path: the dataset file path.
+        :return: the cached dataset profile.
+        """
+        import pyarrow.parquet as pq
+
+        cache_path = self._cache_path(path)
+        if not os.path.exists(cache_path):
+            return None
+
+        try:
+            table = pq.read_table(cache_path)
+        except Exception:
+            return None
+        metadata = json.loads(table.schema.metadata[b"mle_profile"])
+        if metadata.get("fingerprint") != file_fingerprint(path):
+            return None
+
+        columns = table.to_pylist()
+        for col in columns:
+            for field in self._JSON_FIELDS:
+                col[field] = json.loads(col[field])
+        return {"num_rows": metadata["num_rows"], "all_columns": metadata["all_columns"], "columns": columns}
+
+    def store(self, path: str, profile: Dict[str, Any]) -> None:
+        """
+        Store the profile of a file.
+        :param path: the dataset file path.
+        :param profile: the dataset profile.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        rows = []
+        for col in profile["columns"]:
+            row = dict(col)
+            for field in self._JSON_FIELDS:
+                row[field] = json.dumps(row[field], default=str)
+            rows.append(row)
+
+        metadata = {
+            "fingerprint": file_fingerprint(path),
+            "path": os.path.abspath(path),
+            "num_rows": profile["num_rows"],
+            "all_columns": profile.get("all_columns"),
+        }
+        table = pa.Table.from_pylist(rows).replace_schema_metadata({"mle_profile": json.dumps(metadata)})
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        cache_path = self._cache_path(path)
+        pq.write_table(table, cache_path + ".tmp")
+        os.replace(cache_path + ".tmp", cache_path)
+
+
+def get_dataset_profile(
+        path: str,
+        columns: Optional[List[str]] = None,
+        cache: Optional['DatasetProfileCache'] = None,
+) -> Dict[str, Any]:
+    """
+    Get the profile of a dataset file from the cache, only the columns missing in the cache are profiled.
+    :param path: the dataset file path (CSV, TSV, Parquet, Feather/Arrow or JSON Lines, optionally compressed).
+    :param columns: the columns to profile, None means all columns.
+    :param cache: the profile cache, defaults to the project's profile cache.
+    :return: the dataset profile of the requested columns, with the full column list in `all_columns`.
+    """
+    cache = cache or DatasetProfileCache()
+    try:
+        cached = cache.load(path)
+    except Exception:
+        cached = None
+
+    if cached is None:
+        cached = {"num_rows": None, "all_columns": read_columns(path), "columns": []}
+
+    requested = columns if columns is not None else cached["all_columns"]
+    profiled = {col["name"]: col for col in cached["columns"]}
+    missing = [col for col in requested if col not in profiled]
+    if missing:
+        profile = profile_dataset(path, columns=missing)
+        for col in profile["columns"]:
+            profiled[col["name"]] = col
+        cached.update({"num_rows": profile["num_rows"], "columns": list(profiled.values())})
+        try:
+            cache.store(path, cached)
+        except Exception:
+            pass  # caching is best-effort, e.g., the project directory is read-only
+
+    return {
+        "num_rows": cached["num_rows"],
+        "all_columns": cached["all_columns"],
+        "columns": [profiled[col] for col in requested if col in profiled],
+    }
@@ -0,0 +1,224 @@
+"""
+The report store: timestamped progress reports under `.mle/reports/`, with a small index and an
+ in-memory LRU cache, so serving the latest report does not touch the reports on every request.
+"""
+import os
+import json
+import hashlib
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows, the index is then only guarded within the process
+    fcntl = None
+
+REPORT_DIR = os.path.join('.mle', 'reports')
+REPORT_INDEX = 'index.json'
+REPORT_PREFIX = 'progress_report_'
+# the number of reports kept in memory
+MAX_CACHED_REPORTS = 16
+
+
+class StoredReport:
+    """
+    StoredReport: a report loaded from the store, with the serialized body served to the clients.
+    """
+
+    def __init__(self, name: str, created_at: str, body: bytes):
+        """
+        Args:
+            name: the report file name.
+            created_at: the creation time of the report, in ISO format.
+            body: the report JSON (with the `file` field), encoded in UTF-8.
+        """
+        self.name = name
+        self.created_at = created_at
+        self.body = body
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+    @property
+    def content(self) -> Dict[str, Any]:
+        return json.loads(self.body)
+
+
+class ReportStore:
+    """
+    ReportStore: writes the reports with timestamped names and keeps an index of them. The index is
+     reloaded only when its file changes, so the reports written by other processes are picked up too.
+    """
+
+    def __init__(self, project_dir: str = '.', max_cached: int = MAX_CACHED_REPORTS):
+        """
+        Args:
+            project_dir: the project directory.
+            max_cached: the number of reports kept in memory.
+        """
+        self.project_dir = project_dir
+        self.report_dir = os.path.join(project_dir, REPORT_DIR)
+        self.index_path = os.path.join(self.report_dir, REPORT_INDEX)
+        self.max_cached = max_cached
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._index = None
+        self._index_stamp = None
+
+    def _write_json(self, path: str, data: Any) -> None:
+        """
+        Write a JSON file atomically, readers never see a partial file.
+        """
+        os.makedirs(self.report_dir, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(temp_path, path)
+
+    @contextmanager
+    def _index_lock(self):
+        """
+        Hold the lock of the index, across the threads and the processes writing reports.
+        """
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(self.report_dir, exist_ok=True)
+            with open(self.index_path + '.lock', 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _stamp(self):
+        try:
+            stat = os.stat(self.index_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _build_index(self) -> List[Dict[str, str]]:
+        """
+        Build the index from the report directory, the day-named reports of the older versions in the
+         project directory are imported on the way.
+        """
+        os.makedirs(self.report_dir, exist_ok=True)
+        for file_name in os.listdir(self.project_dir):
+            if not (file_name.startswith(REPORT_PREFIX) and file_name.endswith('.json')):
+                continue
+            try:
+                day = datetime.strptime(file_name, f"{REPORT_PREFIX}%Y_%m_%d.json")
+            except ValueError:
+                continue
+            target = os.path.join(self.report_dir, f"{REPORT_PREFIX}{day:%Y_%m_%d_%H%M%S_%f}.json")
+            if not os.path.exists(target):
+                with open(os.path.join(self.project_dir, file_name), 'r') as f:
+                    self._write_json(target, json.load(f))
+
+        entries = []
+        for file_name in os.listdir(self.report_dir):
+            if not (file_name.startswith(REPORT_PREFIX) and file_name.endswith('.json')):
+                continue
+            try:
+                created_at = datetime.strptime(file_name, f"{REPORT_PREFIX}%Y_%m_%d_%H%M%S_%f.json")
+            except ValueError:
+                continue
+            entries.append({"name": file_name, "created_at": created_at.isoformat()})
+        entries.sort(key=lambda entry: entry["created_at"])
+        self._write_json(self.index_path, entries)
+        return entries
+
+    def _load_index(self) -> List[Dict[str, str]]:
+        """
+        Load the index, from memory unless the index file has changed. (Call with the lock held)
+        """
+        stamp = self._stamp()
+        if stamp is None:
+            self._index = self._build_index()
+            stamp = self._stamp()
+        elif stamp != self._index_stamp:
+            try:
+                with open(self.index_path, 'r') as f:
+                    self._index = json.load(f)
+            except ValueError:
+                self._index = self._build_index()
+                stamp = self._stamp()
+        if stamp != self._index_stamp:
+            # another process has written reports, drop the cached ones which are no longer indexed
+            names = {entry["name"] for entry in self._index}
+            for name in [name for name in self._cache if name not in names]:
+                del self._cache[name]
+            self._index_stamp = stamp
+        return self._index
+
+    def save(self, report: Dict[str, Any]) -> str:
+        """
+        Save a report with a timestamped name, and add it to the index.
+        :param report: the report.
+        :return: the report file name.
+        """
+        now = datetime.now()
+        name = f"{REPORT_PREFIX}{now:%Y_%m_%d_%H%M%S_%f}.json"
+        with self._index_lock():
+            self._write_json(os.path.join(self.report_dir, name), report)
+            index = list(self._load_index())
+            index.append({"name": name, "created_at": now.isoformat()})
+            self._write_json(self.index_path, index)
+            self._index, self._index_stamp = index, self._stamp()
+            self._cache.pop(name, None)
+        return name
+
+    def list(self, limit: Optional[int] = None) -> List[Dict[str, str]]:
+        """
+        List the reports, the latest first.
+        :param limit: the maximum number of reports to list.
+        """
+        with self._lock:
+            entries = list(reversed(self._load_index()))
+        return entries[:limit] if limit else entries
+
+    def get(self, name: str) -> Optional[StoredReport]:
+        """
+        Get a report by its file name.
+        :param name: the report file name.
+        :return: the report, or None if it does not exist.
+        """
+        with self._lock:
+            entry = next((entry for entry in self._load_index() if entry["name"] == name), None)
+            if entry is None:
+                return None
+            return self._read(entry)
+
+    def latest(self) -> Optional[StoredReport]:
+        """
+        Get the latest report.
+        :return: the report, or None if there is no report.
+        """
+        with self._lock:
+            index = self._load_index()
+            if not index:
+                return None
+            return self._read(index[-1])
+
+    def _read(self, entry: Dict[str, str]) -> Optional[StoredReport]:
+        """
+        Read a report through the LRU cache. (Call with the lock held)
+        """
+        name = entry["name"]
+        if name in self._cache:
+            self._cache.move_to_end(name)
+            return self._cache[name]
+        try:
+            with open(os.path.join(self.report_dir, name), 'r') as f:
+                content = json.load(f)
+        except (OSError, ValueError):
+            return None
+        content.update({"file": name})
+        report = StoredReport(name, entry["created_at"], json.dumps(content).encode('utf-8'))
+        self._cache[name] = report
+        while len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
+        return report
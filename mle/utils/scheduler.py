@@ -0,0 +1,116 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Any, Callable, Optional, Set
+
+
+class TaskGraph:
+    """
+    TaskGraph: the dependency graph of the planned tasks. A task may depend on the tasks listed before
+     it in the plan (by name), the other references are dropped so the graph is always acyclic.
+    """
+
+    def __init__(self, tasks: List[Dict[str, Any]], work_dir: str = '.'):
+        """
+        Args:
+            tasks: the planned tasks, with the optional `dependencies` (task names) and `files` (paths) fields.
+            work_dir: the working directory, to resolve the relative file paths.
+        """
+        self.tasks = tasks
+        self.dependencies: List[Set[int]] = []
+        self.files: List[Set[str]] = []
+
+        index = {}
+        for i, task in enumerate(tasks):
+            names = [str(dependency).strip().lower() for dependency in task.get('dependencies') or []]
+            self.dependencies.append({index[name] for name in names if name in index})
+            index.setdefault(str(task.get('task', '')).strip().lower(), i)
+            self.files.append({
+                os.path.abspath(os.path.join(work_dir, path)) for path in task.get('files') or [] if path
+            })
+
+    def critical_path(self) -> int:
+        """
+        The number of tasks on the longest dependency chain.
+        """
+        depth = []
+        for dependencies in self.dependencies:
+            depth.append(1 + max((depth[i] for i in dependencies), default=0))
+        return max(depth, default=0)
+
+    def run(
+            self,
+            run_task: Callable[[Dict[str, Any], List[Any]], Any],
+            max_workers: int = 4,
+            on_event: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    ) -> List[Any]:
+        """
+        Run the tasks, each as soon as its dependencies are done and no running task declares the same files.
+        Args:
+            run_task: the function to run a task, called with the task and the results of its dependencies.
+            max_workers: the number of tasks running at the same time.
+            on_event: an optional callback, called with ("start" | "finish", task).
+
+        Returns:
+            list: the results of the tasks, in the plan order.
+        """
+        on_event = on_event or (lambda event, task: None)
+        results = [None] * len(self.tasks)
+        done, running = set(), {}
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while len(done) < len(self.tasks):
+                busy_files = set().union(*(self.files[i] for i in running.values()))
+                for i, task in enumerate(self.tasks):
+                    if len(running) >= max_workers:
+                        break
+                    if i in done or i in running.values() or not self.dependencies[i] <= done:
+                        continue
+                    if self.files[i] & busy_files:
+                        continue  # wait for the running task writing the same files
+                    busy_files |= self.files[i]
+                    on_event("start", task)
+                    dependency_results = [results[j] for j in sorted(self.dependencies[i])]
+                    running[executor.submit(self._run_locked, run_task, i, dependency_results)] = i
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    i = running.pop(future)
+                    # a failed task stops the scheduling, the running tasks are waited by the executor
+                    results[i] = future.result()
+                    done.add(i)
+                    on_event("finish", self.tasks[i])
+        return results
+
+    def _run_locked(self, run_task: Callable, i: int, dependency_results: List[Any]) -> Any:
+        """
+        Run a task holding the locks of its declared files, so the other tasks wait to write them.
+        """
+        locks = [file_lock(path) for path in sorted(self.files[i])]
+        for lock in locks:
+            lock.acquire()
+        try:
+            return run_task(self.tasks[i], dependency_results)
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+
+_FILE_LOCKS: Dict[str, threading.RLock] = {}
+_FILE_LOCKS_GUARD = threading.Lock()
+
+
+def file_lock(path: str) -> threading.RLock:
+    """
+    Get the (re-entrant) lock of a file, shared by the threads of the process.
+    Args:
+        path: the file path.
+
+    Returns:
+        The lock of the file.
+    """
+    path = os.path.abspath(path)
+    with _FILE_LOCKS_GUARD:
+        if path not in _FILE_LOCKS:
+            _FILE_LOCKS[path] = threading.RLock()
+        return _FILE_LOCKS[path]
@@ -2,6 +2,7 @@ import os
 import re
 import uuid
 import yaml
+import inspect
 import base64
 import shutil
 import fnmatch
@@ -12,6 +13,7 @@ import importlib.util
 from rich.panel import Panel
 from rich.prompt import Prompt
 from rich.console import Console
+from datetime import datetime
 from typing import Dict, Any, Optional, Callable, List, Union
 
 
@@ -394,7 +396,61 @@ def get_langfuse_observer(
         enabled=True,
     )
 
+    client = importlib.import_module("langfuse").Langfuse(
+        secret_key=secret_key,
+        public_key=public_key,
+        host=host,
+    )
+
+    def _get_usage(cls, messages, response):
+        # prefer the token usage reported by the provider, fall back to the length of the texts
+        usage = getattr(cls.model, "usage", None)
+        if usage:
+            return {
+                "input": usage.get("input_tokens", 0),
+                "output": usage.get("output_tokens", 0),
+                "unit": "TOKENS",
+            }
+        return {
+            "input": len(str(messages)),
+            "output": len(str(response)),
+            "unit": "TOKENS",
+        }
+
+    def _observe_stream(fn: Callable):
+        def stream(cls, *args, **kwargs):
+            model = getattr(cls.model, "model", None)
+            messages = getattr(cls.model, "chat_history", (args, kwargs))
+            trace = client.trace(name=fn.__name__, user_id=user_id, session_id=session_id)
+            generation = trace.generation(name=fn.__name__, model=model, input=messages, start_time=datetime.now())
+
+            chunks = []
+            completion_start_time = None
+            response = fn(cls, *args, **kwargs)
+            try:
+                for chunk in response:
+                    if completion_start_time is None:
+                        completion_start_time = datetime.now()
+                    if chunk:
+                        chunks.append(chunk)
+                    yield chunk
+            finally:
+                # close the inner stream first, so the stream metrics are settled before the span ends
+                response.close()
+                output = "".join(str(chunk) for chunk in chunks)
+                generation.end(
+                    output=output,
+                    completion_start_time=completion_start_time,
+                    metadata={**getattr(cls, "stream_metrics", {}), **getattr(cls.model, "usage", {})},
+                    usage=_get_usage(cls, messages, output),
+                )
+
+        return stream
+
     def _observe(fn: Callable):
+        if inspect.isgeneratorfunction(fn):
+            return _observe_stream(fn)
+
         @langfuse.observe(as_type="generation")
         def _fn(cls, *args, **kwargs):
             model = getattr(cls.model, "model", None)
@@ -404,11 +460,8 @@ def get_langfuse_observer(
                 model=model,
                 input=messages,
                 output=response,
-                usage={
-                    "input": len(str(messages)),
-                    "output": len(str(response)),
-                    "unit": "TOKENS",
-                }
+                usage=_get_usage(cls, messages, response),
+                metadata=getattr(cls.model, "usage", None),
             )
             return response
 
@@ -1,4 +1,4 @@
 from .chat import chat
 from .baseline import baseline
-from .report import report, report_local
+from .report import report, report_local, report_stream
 from .kaggle import kaggle, auto_kaggle
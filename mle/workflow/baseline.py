@@ -3,9 +3,11 @@ Baseline Mode: the mode to quickly generate the AI baseline based on the user's
 """
 import os
 import questionary
+from typing import Optional
+from contextlib import contextmanager
 from rich.console import Console
 from mle.model import load_model
-from mle.utils import print_in_box, ask_text, WorkflowCache
+from mle.utils import print_in_box, ask_text, WorkflowCache, TaskGraph
 from mle.agents import CodeAgent, DebugAgent, AdviseAgent, PlanAgent
 
 
@@ -22,6 +24,81 @@ def ask_data(data_str: str):
         return f"[green]Dataset:[/green] {data_str}"
 
 
+class TaskConsole:
+    """
+    TaskConsole: the console of a task developed in a worker thread. The live status of a console can not be
+     shared across the threads, so the status messages are logged to the shared console with the task name.
+    """
+
+    def __init__(self, console: Console, task_name: str):
+        self.console = console
+        self.task_name = task_name
+
+    @contextmanager
+    def status(self, message: str, **kwargs):
+        self.console.log(f"[cyan]\\[{self.task_name}][/cyan] {message}")
+        yield
+
+    def __getattr__(self, name):
+        return getattr(self.console, name)
+
+
+def debug_task(coder, debugger, task: dict, code_report: dict):
+    """
+    Run and debug the code of a task until the debugger reports success.
+    :param coder: the code agent of the task.
+    :param debugger: the debug agent of the task.
+    :param task: the task.
+    :param code_report: the code report of the task.
+    :return: the code report of the debugged code.
+    """
+    while str(code_report.get('debug')).lower() == 'true':
+        with debugger.console.status("MLE Debug Agent is executing and debugging the code..."):
+            debug_report = debugger.analyze(code_report)
+        if debug_report.get('status') == 'success':
+            break
+        code_report = coder.debug(task, debug_report)
+    coder.code_summary = code_report
+    return code_report
+
+
+def develop_task(
+        work_dir: str,
+        model_name: Optional[str],
+        advisor_report: str,
+        task: dict,
+        dependencies: list,
+        console: Console,
+):
+    """
+    Code and debug a planned task with its own model, code and debug agents, so the independent tasks can be
+     developed at the same time.
+    :param work_dir: the working directory.
+    :param model_name: the model to use.
+    :param advisor_report: the advisor report.
+    :param task: the task to develop.
+    :param dependencies: the developed tasks it depends on.
+    :param console: the shared console to log the progress.
+    :return: the developed task, with the `task`, the `code_report` and the `coder` and `debugger` agents.
+    """
+    # each task has its own model instance, the function call history and the usage are not shared
+    model = load_model(work_dir, model_name)
+    task_console = TaskConsole(console, task.get('task'))
+    coder = CodeAgent(model, work_dir, task_console)
+    coder.read_requirement(advisor_report)
+    debugger = DebugAgent(model, task_console)
+
+    task = dict(task)
+    if dependencies:
+        task['description'] = f"{task.get('description')}\n\nThe tasks it depends on have been completed:\n" + "\n".join(
+            f" - {report.get('task')}: {report.get('message')} (run with: {report.get('command')})"
+            for report in (dependency['code_report'] for dependency in dependencies)
+        )
+
+    code_report = debug_task(coder, debugger, task, coder.code(task))
+    return {"task": task, "code_report": code_report, "coder": coder, "debugger": debugger}
+
+
 def baseline(work_dir: str, model=None):
     """
     The workflow of the baseline mode.
@@ -30,7 +107,8 @@ def baseline(work_dir: str, model=None):
 
     console = Console()
     cache = WorkflowCache(work_dir, 'baseline')
-    model = load_model(work_dir, model)
+    model_name = model
+    model = load_model(work_dir, model_name)
 
     if not cache.is_empty():
         step = ask_text(f"MLE has finished the following steps: \n{cache}\n"
@@ -81,28 +159,38 @@ def baseline(work_dir: str, model=None):
 
     # code agent codes the tasks and debug with the debug agent
     with cache(step=5, name="MLE code&debug agents start to work") as ca:
-        coder = CodeAgent(model, work_dir, console)
-        coder.read_requirement(advisor_report)
-        debugger = DebugAgent(model, console)
-
         is_auto_mode = questionary.confirm(
             "MLE developer is about to start to code.\n"
             "Choose to debug or not (If no, MLE agent will only focus on coding tasks,"
             " and you have to run and debug the code yourself)?"
         ).ask()
 
-        for current_task in coding_plan.get('tasks'):
-            code_report = coder.interact(current_task)
-            is_debugging = code_report.get('debug')
-
-            if is_auto_mode:
-                while True:
-                    if is_debugging == 'true' or is_debugging == 'True':
-                        with console.status("MLE Debug Agent is executing and debugging the code..."):
-                            debug_report = debugger.analyze(code_report)
-                        if debug_report.get('status') == 'success':
-                            break
-                        else:
-                            code_report = coder.debug(current_task, debug_report)
-                    else:
-                        break
+        if is_auto_mode:
+            # the independent tasks are coded and debugged at the same time
+            graph = TaskGraph(coding_plan.get('tasks'), work_dir)
+            console.log(f"MLE developers are working on {len(graph.tasks)} tasks "
+                        f"({graph.critical_path()} on the critical path)...")
+
+            def log_event(event, task):
+                if event == "start":
+                    console.log(f"[cyan]Started[/cyan] task: {task.get('task')}")
+                else:
+                    console.log(f"[green]Finished[/green] task: {task.get('task')}")
+
+            developed_tasks = graph.run(
+                lambda task, dependencies: develop_task(
+                    work_dir, model_name, advisor_report, task, dependencies, console
+                ),
+                on_event=log_event,
+            )
+            # the feedback of the user, task by task, once all the tasks are developed
+            for developed in developed_tasks:
+                coder, debugger, task = developed["coder"], developed["debugger"], developed["task"]
+                code_report = developed["code_report"]
+                if coder.review(task) is not code_report:
+                    debug_task(coder, debugger, task, coder.code_summary)
+        else:
+            coder = CodeAgent(model, work_dir, console)
+            coder.read_requirement(advisor_report)
+            for current_task in coding_plan.get('tasks'):
+                coder.interact(current_task)
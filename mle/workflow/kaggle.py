@@ -2,14 +2,16 @@
 Kaggle Mode: the mode to generate ML pipeline for kaggle competitions.
 """
 import os
+import shutil
 import questionary
 from typing import List
 from rich.console import Console
 
 from mle.model import load_model
-from mle.function import execute_command
-from mle.integration import KaggleIntegration
-from mle.utils import ask_text, read_markdown, is_markdown_file, WorkflowCache, print_in_box
+from mle.function import execute_command, command_environment, DEFAULT_IDLE_TIMEOUT
+from mle.workflow.search import search_candidates
+from mle.integration import KaggleIntegration, describe_download
+from mle.utils import ask_text, read_markdown, is_markdown_file, WorkflowCache, print_in_box, dependency_manager
 from mle.agents import CodeAgent, DebugAgent, AdviseAgent, PlanAgent, GitHubSummaryAgent
 
 
@@ -21,7 +23,11 @@ def auto_kaggle(
         debug_max_attempt=5,
         sub_examples=None,
         competition_id=None,
-        model=None
+        model=None,
+        run_timeout=None,
+        idle_timeout=DEFAULT_IDLE_TIMEOUT,
+        candidates=1,
+        candidate_memory_mb=None,
 ):
     """
     The workflow of the kaggle mode.
@@ -33,14 +39,18 @@ def auto_kaggle(
     :param sub_examples: the path to the kaggle submission example file.
     :param competition_id: the competition id.
     :param model: the model to use.
+    :param run_timeout: the wall-clock timeout (in seconds) of each code execution, None means no limit.
+    :param idle_timeout: kill the code execution if it prints no output for this many seconds.
+    :param candidates: the number of candidate solutions developed and evaluated in parallel, the best one
+     is kept for debugging.
+    :param candidate_memory_mb: the memory limit (in MB) of each candidate run, None means no limit.
     """
     console = Console()
-    model = load_model(work_dir, model)
+    model_name, model = model, load_model(work_dir, model)
 
     # initialize the agents
     advisor = AdviseAgent(model, console, mode="precise")
     summarizer = GitHubSummaryAgent(model, console=console)
-    coder = CodeAgent(model, work_dir, console=console, single_file=True)
     debugger = DebugAgent(model, console, analyze_only=True)
 
     if is_markdown_file(description):
@@ -52,8 +62,6 @@ def auto_kaggle(
         for dataset in datasets:
             requirements += f" - {dataset}\n"
 
-        requirements += f"\nSUBMISSION FILE PATH: {submission}\n"
-
     suggestions = advisor.suggest(requirements, return_raw=True)
     requirements += f"""
     \nIMPLEMENTATION SUGGESTIONS:
@@ -67,7 +75,6 @@ def auto_kaggle(
     for trick in suggestions.get('tricks'):
         requirements += f"\n  - {trick}"
 
-    coder.read_requirement(requirements)
     if competition_id is None:
         competition_id = "kaggle competition"
 
@@ -75,8 +82,34 @@ def auto_kaggle(
         "task": competition_id,
         "description": requirements
     }
-    print_in_box(requirements, console, title="Kaggle Competition Requirement", color="green")
-    code_report = coder.code(coding_task)
+    run_dir, logs = None, None
+    if candidates > 1:
+        print_in_box(requirements, console, title="Kaggle Competition Requirement", color="green")
+        with console.status(f"MLE Agent is developing and evaluating {candidates} candidate solutions..."):
+            best = search_candidates(
+                candidates,
+                work_dir,
+                model_name,
+                requirements,
+                coding_task,
+                run_timeout=run_timeout,
+                idle_timeout=idle_timeout,
+                max_memory_mb=candidate_memory_mb,
+                console=console,
+            )
+        # continue with the best candidate, its first run is analyzed without running it again
+        coder, code_report, logs = best["coder"], best["code_report"], best["logs"]
+        coder.console = console
+        run_dir, run_submission = best["work_dir"], best["submission"]
+    else:
+        requirements += f"\nSUBMISSION FILE PATH: {submission}\n"
+        coding_task["description"] = requirements
+        coder = CodeAgent(model, work_dir, console=console, single_file=True)
+        coder.read_requirement(requirements)
+        print_in_box(requirements, console, title="Kaggle Competition Requirement", color="green")
+        code_report = coder.code(coding_task)
+        run_submission = submission
+
     debug_attempt = 0
     while True:
         if debug_attempt > debug_max_attempt:
@@ -85,18 +118,31 @@ def auto_kaggle(
 
         with console.status("MLE Debug Agent is executing and debugging the code..."):
             running_cmd = code_report.get('command')
-            logs = execute_command(running_cmd)
-            debug_report = debugger.analyze_with_log(running_cmd, logs)
+            env = dependency_manager.prepare(code_report.get('dependency'), work_dir)
+            if env["error"]:
+                console.log(f"Failed to install the dependencies: {env['error']}")
+            if logs is None:
+                logs = execute_command(
+                    running_cmd,
+                    timeout=run_timeout,
+                    idle_timeout=idle_timeout,
+                    cwd=run_dir,
+                    env=dependency_manager.variables(env),
+                )
+            # the commands of the debugger (e.g., installing a missing dependency) run in the same environment
+            with command_environment(dependency_manager.variables(env)):
+                debug_report = debugger.analyze_with_log(running_cmd, logs)
+            logs = None
         if debug_report.get('status') == 'success':
             # check the submission file
-            if not os.path.exists(submission):
-                console.log(f"The submission file ({submission}) is not found. Launch the coder to improve...")
+            if not os.path.exists(run_submission):
+                console.log(f"The submission file ({run_submission}) is not found. Launch the coder to improve...")
                 code_report = coder.debug(
                     coding_task,
                     {
                         "status": "error",
                         "changes": [
-                            f"make sure the submission file is generated in {submission}",
+                            f"make sure the submission file is generated in {run_submission}",
                             f"make sure the submission file is in the correct format. You can refer to the example submission file: {sub_examples}"
                         ],
                         "suggestion": f"Please update the code related to generating the submission file."
@@ -108,12 +154,16 @@ def auto_kaggle(
             debug_attempt += 1
             code_report = coder.debug(coding_task, debug_report)
 
+    if run_submission != submission and os.path.exists(run_submission):
+        shutil.copyfile(run_submission, submission)
+
 
-def kaggle(work_dir: str, model=None):
+def kaggle(work_dir: str, model=None, overview_path: str = None):
     """
     The workflow of the kaggle mode.
     :param work_dir: the working directory.
     :param model: the model to use.
+    :param overview_path: a local markdown file of the competition overview, fetched from Kaggle if not given.
     """
     console = Console()
     cache = WorkflowCache(work_dir, 'kaggle')
@@ -139,8 +189,10 @@ def kaggle(work_dir: str, model=None):
                 choices=integration.list_competition()
             ).ask()
             with console.status("MLE Agent is downloading the kaggle competition dataset..."):
-                dataset = integration.download_competition_dataset(
+                dataset, download_stats = integration.download_competition_dataset(
                     competition, os.path.join(os.getcwd(), 'data'))
+            for line in describe_download(download_stats):
+                console.print(line)
         ca.store("competition", competition)
         ca.store("dataset", dataset)
 
@@ -150,7 +202,8 @@ def kaggle(work_dir: str, model=None):
         if ml_requirement is None:
             with console.status("MLE Agent is fetching the kaggle competition overview..."):
                 summary = GitHubSummaryAgent(model, console=console)
-                ml_requirement = summary.kaggle_request_summarize(integration.fetch_competition_overview(competition))
+                overview = integration.fetch_competition_overview(competition, local_path=overview_path)
+                ml_requirement = summary.kaggle_request_summarize(overview)
         ca.store("ml_requirement", ml_requirement)
 
     # advisor agent gives suggestions in a report
@@ -2,7 +2,9 @@
 Report Mode: the mode to generate the AI report based on the user's requirements.
 """
 import os
+import queue
 import pickle
+import threading
 from rich.console import Console
 from mle.model import load_model
 from mle.utils.system import get_config, write_config, check_config
@@ -23,6 +25,32 @@ def ask_data(data_str: str):
         return f"[green]Dataset:[/green] {data_str}"
 
 
+def _load_integrations(console, github_token: str = None, interactive: bool = True):
+    """
+    Load the GitHub token and the Google Calendar events from the project integrations.
+    :param console: the console to use.
+    :param github_token: the GitHub token, loaded from the integrations if not provided.
+    :param interactive: whether to ask the user to log in to GitHub if no token is found.
+    :return: the GitHub token and the calendar events.
+    """
+    events = None
+    if check_config(console):
+        config = get_config()
+        if github_token is None:
+            if "github" in config.get("integration", {}).keys():
+                github_token = config["integration"]["github"].get("token")
+            elif interactive:
+                github_token = github_login()
+                config["integration"]["github"] = {"token": github_token}
+                write_config(config)
+
+        if "google_calendar" in config.get("integration", {}).keys():
+            google_token = pickle.loads(config["integration"]["google_calendar"].get("token"))
+            google_calendar = GoogleCalendarIntegration(google_token)
+            events = google_calendar.get_events()
+    return github_token, events
+
+
 def report(
         work_dir: str,
         github_repo: str,
@@ -43,22 +71,7 @@ def report(
     """
     console = Console()
     model = load_model(work_dir, model)
-
-    events = None
-    if check_config(console):
-        config = get_config()
-        if github_token is None:
-            if "github" in config.get("integration", {}).keys():
-                github_token = config["integration"]["github"].get("token")
-            else:
-                github_token = github_login()
-                config["integration"]["github"] = {"token": github_token}
-                write_config(config)
-
-        if "google_calendar" in config.get("integration", {}).keys():
-            google_token = pickle.loads(config["integration"]["google_calendar"].get("token"))
-            google_calendar = GoogleCalendarIntegration(google_token)
-            events = google_calendar.get_events()
+    github_token, events = _load_integrations(console, github_token)
 
     summarizer = GitHubSummaryAgent(
         model,
@@ -72,6 +85,80 @@ def report(
     return reporter.gen_report(github_summary, events, okr=okr_str)
 
 
+class _StreamClosed(Exception):
+    """
+    Raised in the summarizer thread of `report_stream` when the stream is closed, to stop it.
+    """
+
+
+def report_stream(
+        work_dir: str,
+        github_repo: str,
+        github_username: str,
+        github_token: str = None,
+        okr_str: str = None,
+        model=None
+):
+    """
+    The workflow of the report mode, streaming the progress as events: the `phase` events of the GitHub
+     fetching and the summarizer, the `token` events of the reporter, and the final `report` event.
+    :param work_dir: the working directory.
+    :param github_repo: the GitHub repository.
+    :param github_username: the GitHub username.
+    :param github_token: the GitHub token.
+    :param okr_str: the OKR string.
+    :param model: the model to use.
+    :return: the generator of (event, data) tuples.
+    """
+    console = Console(quiet=True)
+    yield "phase", "loading the model"
+    model = load_model(work_dir, model)
+    github_token, events = _load_integrations(console, github_token, interactive=False)
+
+    summarizer = GitHubSummaryAgent(
+        model,
+        github_repo=github_repo,
+        username=github_username,
+        github_token=github_token,
+        console=console,
+    )
+    reporter = ReportAgent(model, console)
+
+    # the summarizer runs in a thread and reports its phases through a queue, so they are yielded live
+    phases = queue.Queue()
+    result = {}
+    closed = threading.Event()
+
+    def _progress(phase):
+        # the stream is closed (e.g., the client is gone), stop the summarizer before its next phase
+        if closed.is_set():
+            raise _StreamClosed()
+        phases.put(phase)
+
+    def _summarize():
+        try:
+            result["summary"] = summarizer.summarize(on_progress=_progress)
+        except Exception as e:
+            result["error"] = e
+        finally:
+            phases.put(None)
+
+    threading.Thread(target=_summarize, daemon=True).start()
+    try:
+        for phase in iter(phases.get, None):
+            yield "phase", phase
+        if "error" in result:
+            raise result["error"]
+        github_summary = result["summary"]
+
+        yield "phase", "writing the report"
+        for content in reporter.stream_report(github_summary, events, okr=okr_str):
+            yield "token", content
+        yield "report", reporter.report
+    finally:
+        closed.set()
+
+
 def report_local(
         work_dir: str,
         git_path: str,
@@ -0,0 +1,238 @@
+"""
+Search Mode: develop several candidate solutions at the same time, run them in parallel with the resource
+ limits, and keep the best one (by the exit status and the validation metric in the logs) for debugging.
+"""
+import os
+import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+
+from rich.console import Console
+
+from mle.model import load_model
+from mle.agents import CodeAgent
+from mle.utils import dependency_manager
+from mle.function import run_command, format_command_result
+
+# the strategy of each candidate, in turn, so the candidates explore different solutions
+CANDIDATE_STRATEGIES = (
+    "Implement the suggested model and training strategy as described.",
+    "Implement a simple, fast and robust version of the suggested approach, which finishes quickly and reliably.",
+    "Implement an alternative model or algorithm to the suggested one, which is known to work well on this kind of task.",
+    "Implement the suggested approach with all the tricks above, and ensemble several models if it helps.",
+)
+# the sampling temperature of each candidate, in turn, None keeps the model default
+CANDIDATE_TEMPERATURES = (None, 0.9, 1.0, 0.5)
+# the environment variables limiting the threads of the numerical libraries
+THREAD_LIMIT_VARIABLES = (
+    "OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS", "VECLIB_MAXIMUM_THREADS"
+)
+# the metric names (and the substrings of them) which are better when lower
+LOWER_IS_BETTER = ("loss", "error", "mse", "mae", "rmse", "rmsle", "mape", "logloss", "deviance", "perplexity")
+
+_NUMBER = r"([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)"
+# the line the candidates are asked to print: "Validation metric (<name>, higher|lower is better): <value>"
+_METRIC_LINE = re.compile(
+    r"validation metric\s*\(\s*([^,)]*?)\s*(?:,\s*(higher|lower)[^)]*)?\)\s*[:=]\s*" + _NUMBER, re.IGNORECASE
+)
+# the common logging formats, e.g. "val_auc: 0.91", "Validation RMSE = 1.23", "CV score: 0.85"
+_METRIC_FALLBACK = re.compile(
+    r"\b(?:val|valid|validation|cv|oof)[ _-]?([a-z][a-z0-9_@-]*)?\s*(?:score)?\s*[:=]\s*" + _NUMBER, re.IGNORECASE
+)
+
+
+def parse_validation_metric(lines: List[str]) -> Optional[Dict[str, Any]]:
+    """
+    Parse the validation metric from the output lines, the last reported value wins.
+    :param lines: the output lines of the run.
+    :return: the metric with the `name`, the `value` and whether `higher_is_better`, or None if not found.
+    """
+    for pattern in (_METRIC_LINE, _METRIC_FALLBACK):
+        for line in reversed(lines):
+            matches = list(pattern.finditer(line))
+            if not matches:
+                continue
+            match = matches[-1]
+            name = (match.group(1) or "score").strip().lower()
+            if pattern is _METRIC_LINE and match.group(2):
+                higher_is_better = match.group(2).lower() == "higher"
+            else:
+                higher_is_better = not any(key in name for key in LOWER_IS_BETTER)
+            return {"name": name, "value": float(match.group(len(match.groups()))), "higher_is_better": higher_is_better}
+    return None
+
+
+def common_metric_name(candidates: List[Dict[str, Any]]) -> Optional[str]:
+    """
+    The metric name reported by the most candidates (the lowest index wins a tie), the only one whose values
+     are compared, as the values of different metrics are not comparable.
+    :param candidates: the candidates.
+    :return: the metric name, or None if no candidate reports a metric.
+    """
+    names = [candidate["metric"]["name"] for candidate in candidates if candidate.get("metric") is not None]
+    if not names:
+        return None
+    counts = Counter(names)
+    return max(names, key=lambda name: (counts[name], -names.index(name)))
+
+
+def rank_candidate(candidate: Dict[str, Any], metric_name: Optional[str] = None):
+    """
+    The sort key of a candidate, the best is the largest: it runs, writes the submission, and reports the
+     best validation metric.
+    :param candidate: the candidate.
+    :param metric_name: the metric compared across the candidates, a candidate reporting another metric is
+     ranked as if it reported none; None compares any metric.
+    """
+    result, metric = candidate.get("result"), candidate.get("metric")
+    succeeded = result is not None and result["exit_code"] == 0 and not result["timed_out"]
+    if metric is not None and metric_name is not None and metric["name"] != metric_name:
+        metric = None
+    score = 0.0
+    if metric is not None:
+        score = metric["value"] if metric["higher_is_better"] else -metric["value"]
+    return succeeded, os.path.exists(candidate["submission"]), metric is not None, score
+
+
+def develop_candidate(
+        index: int,
+        num_candidates: int,
+        project_dir: str,
+        model_name: Optional[str],
+        requirements: str,
+        coding_task: Dict[str, Any],
+        run_timeout: Optional[float] = None,
+        idle_timeout: Optional[float] = None,
+        max_memory_mb: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Code a candidate in its own directory with its own model and agent, then run it with the resource limits.
+    :param index: the index of the candidate.
+    :param num_candidates: the number of candidates developed at the same time.
+    :param project_dir: the project directory, the candidate is developed in `candidates/candidate_<index>`.
+    :param model_name: the model to use.
+    :param requirements: the competition requirements, without the submission file path.
+    :param coding_task: the coding task.
+    :param run_timeout: the wall-clock timeout (in seconds) of the run.
+    :param idle_timeout: kill the run if it prints no output for this many seconds.
+    :param max_memory_mb: the memory limit of the run in MB.
+    :return: the candidate, with the coder, the code report, the run result, the logs and the metric.
+    """
+    work_dir = os.path.join(project_dir, "candidates", f"candidate_{index}")
+    os.makedirs(work_dir, exist_ok=True)
+    submission = os.path.join(work_dir, "submission.csv")
+    if os.path.exists(submission):
+        os.remove(submission)  # the stale submission of a previous search
+    candidate = {"index": index, "work_dir": work_dir, "submission": submission, "result": None, "metric": None}
+
+    # each candidate has its own model instance, so the sampling temperature is not shared
+    model = load_model(project_dir, model_name)
+    temperature = CANDIDATE_TEMPERATURES[index % len(CANDIDATE_TEMPERATURES)]
+    if temperature is not None and hasattr(model.model, "temperature"):
+        model.model.temperature = temperature
+
+    requirements += (
+        f"\nSUBMISSION FILE PATH: {submission}\n"
+        f"\nCANDIDATE STRATEGY: {CANDIDATE_STRATEGIES[index % len(CANDIDATE_STRATEGIES)]}\n"
+        f"\nHold out a validation split, and print the validation score of the competition metric as the line "
+        f"\"Validation metric (<metric name>, higher is better): <value>\" (or \"lower is better\").\n"
+    )
+    coder = CodeAgent(model, work_dir, console=Console(quiet=True), single_file=True)
+    coder.read_requirement(requirements)
+    try:
+        candidate["code_report"] = coder.code(coding_task)
+    except Exception as e:
+        candidate["error"] = f"{type(e).__name__}: {e}"
+        return candidate
+    candidate["coder"] = coder
+
+    # share the cores among the candidates running at the same time
+    threads = str(max(1, (os.cpu_count() or 1) // num_candidates))
+    env = dependency_manager.prepare(candidate["code_report"].get("dependency"), project_dir)
+    try:
+        result = run_command(
+            candidate["code_report"].get("command"),
+            timeout=run_timeout,
+            idle_timeout=idle_timeout,
+            max_memory_mb=max_memory_mb,
+            verbose=False,
+            cwd=work_dir,
+            env={**dependency_manager.variables(env), **{variable: threads for variable in THREAD_LIMIT_VARIABLES}},
+        )
+    except Exception as e:
+        candidate["logs"] = f"Error running command: {str(e)}"
+        return candidate
+    candidate.update({
+        "result": result,
+        "logs": format_command_result(result),
+        "metric": parse_validation_metric(result["head"] + result["tail"]),
+    })
+    return candidate
+
+
+def search_candidates(
+        num_candidates: int,
+        work_dir: str,
+        model_name: Optional[str],
+        requirements: str,
+        coding_task: Dict[str, Any],
+        run_timeout: Optional[float] = None,
+        idle_timeout: Optional[float] = None,
+        max_memory_mb: Optional[int] = None,
+        console: Optional[Console] = None,
+) -> Dict[str, Any]:
+    """
+    Develop and evaluate the candidates in parallel, and return the best one.
+    :param num_candidates: the number of candidates.
+    :param work_dir: the working directory, the candidates are developed under `candidates/`.
+    :param model_name: the model to use.
+    :param requirements: the competition requirements, without the submission file path.
+    :param coding_task: the coding task.
+    :param run_timeout: the wall-clock timeout (in seconds) of each run.
+    :param idle_timeout: kill a run if it prints no output for this many seconds.
+    :param max_memory_mb: the memory limit of each run in MB.
+    :param console: the console to log the progress.
+    :return: the best candidate.
+    """
+    console = console or Console()
+    with ThreadPoolExecutor(max_workers=num_candidates) as executor:
+        futures = [
+            executor.submit(
+                develop_candidate,
+                i,
+                num_candidates,
+                work_dir,
+                model_name,
+                requirements,
+                coding_task,
+                run_timeout,
+                idle_timeout,
+                max_memory_mb,
+            )
+            for i in range(num_candidates)
+        ]
+        candidates = [future.result() for future in futures]
+
+    for candidate in candidates:
+        if candidate.get("error"):
+            status = f"[red]failed to code[/red] ({candidate['error']})"
+        elif candidate["result"] is None:
+            status = f"[red]failed to run[/red] ({candidate['logs']})"
+        else:
+            result, metric = candidate["result"], candidate["metric"]
+            status = f"exit code {result['exit_code']}" + (f", {result['timed_out']}" if result["timed_out"] else "")
+            status += f", {result['duration']}s"
+            if metric is not None:
+                status += f", {metric['name']} = {metric['value']}"
+            if not os.path.exists(candidate["submission"]):
+                status += ", no submission"
+        console.log(f"Candidate {candidate['index']}: {status}")
+
+    coded = [candidate for candidate in candidates if not candidate.get("error")]
+    if not coded:
+        raise RuntimeError(f"All the {num_candidates} candidates failed to code: {candidates[0]['error']}")
+    metric_name = common_metric_name(coded)
+    best = max(coded, key=lambda candidate: rank_candidate(candidate, metric_name))
+    console.log(f"Continue with candidate {best['index']} in {best['work_dir']}")
+    return best
@@ -0,0 +1,181 @@
+import os
+import gzip
+import shutil
+import tarfile
+import zipfile
+import tempfile
+import unittest
+
+from mle.utils.archive import extract_archive, inspect_archive
+
+
+class TestExtractArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.work_dir)
+        self.dest = os.path.join(self.work_dir, 'out')
+        self.members = {
+            'train.csv': b'id,label\n' + b'1,0\n' * 1000,
+            'test.csv': b'id\n' + b'2\n' * 500,
+            'images/a.png': b'\x89PNG' + b'\x00' * 100,
+        }
+
+    def _zip(self):
+        path = os.path.join(self.work_dir, 'data.zip')
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for name, content in self.members.items():
+                archive.writestr(name, content)
+        return path
+
+    def _tar(self):
+        source = os.path.join(self.work_dir, 'source')
+        for name, content in self.members.items():
+            os.makedirs(os.path.dirname(os.path.join(source, name)), exist_ok=True)
+            with open(os.path.join(source, name), 'wb') as f:
+                f.write(content)
+        path = os.path.join(self.work_dir, 'data.tar.gz')
+        with tarfile.open(path, 'w:gz') as archive:
+            for name in self.members:
+                archive.add(os.path.join(source, name), arcname=name)
+        return path
+
+    def _assert_extracted(self):
+        for name, content in self.members.items():
+            with open(os.path.join(self.dest, name), 'rb') as f:
+                self.assertEqual(f.read(), content)
+
+    def _assert_skips_up_to_date(self, path, **kwargs):
+        stats = extract_archive(path, self.dest, verbose=False, **kwargs)
+        self.assertEqual((stats['extracted'], stats['skipped']), (3, 0))
+        self._assert_extracted()
+
+        stats = extract_archive(path, self.dest, verbose=False, **kwargs)
+        self.assertEqual((stats['extracted'], stats['skipped']), (0, 3))
+
+        # a changed (e.g., truncated) file is extracted again
+        with open(os.path.join(self.dest, 'train.csv'), 'wb') as f:
+            f.write(b'id,label\n')
+        os.remove(os.path.join(self.dest, 'test.csv'))
+        stats = extract_archive(path, self.dest, verbose=False, **kwargs)
+        self.assertEqual((stats['extracted'], stats['skipped']), (2, 1))
+        self._assert_extracted()
+
+    def test_zip_skips_up_to_date_members(self):
+        path = self._zip()
+        self._assert_skips_up_to_date(path)
+        self.assertEqual(extract_archive(path, self.dest, verbose=False)['format'], 'zip')
+
+    def test_zip_verify_crc(self):
+        path = self._zip()
+        extract_archive(path, self.dest, verbose=False)
+        # same size and mtime, different content: only the CRC check notices
+        target = os.path.join(self.dest, 'test.csv')
+        stat = os.stat(target)
+        with open(target, 'wb') as f:
+            f.write(b'x' * stat.st_size)
+        os.utime(target, (stat.st_atime, stat.st_mtime))
+        self.assertEqual(extract_archive(path, self.dest, verbose=False)['extracted'], 0)
+        stats = extract_archive(path, self.dest, verify_crc=True, verbose=False)
+        self.assertEqual((stats['extracted'], stats['skipped']), (1, 2))
+        self._assert_extracted()
+
+    def test_tar_skips_up_to_date_members(self):
+        self._assert_skips_up_to_date(self._tar())
+
+    def test_patterns(self):
+        stats = extract_archive(self._zip(), self.dest, patterns=['*.csv'], verbose=False)
+        self.assertEqual(stats['extracted'], 2)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, 'images', 'a.png')))
+
+    def test_single_file(self):
+        path = os.path.join(self.work_dir, 'train.csv.gz')
+        with gzip.open(path, 'wb') as f:
+            f.write(self.members['train.csv'])
+        stats = extract_archive(path, self.dest, verbose=False)
+        self.assertEqual((stats['format'], stats['extracted']), ('single', 1))
+        self.assertEqual(extract_archive(path, self.dest, verbose=False)['skipped'], 1)
+
+    def test_rejects_members_outside_destination(self):
+        path = os.path.join(self.work_dir, 'evil.zip')
+        with zipfile.ZipFile(path, 'w') as archive:
+            archive.writestr('../evil.txt', b'x')
+        with self.assertRaises(ValueError):
+            extract_archive(path, self.dest, verbose=False)
+        self.assertFalse(os.path.exists(os.path.join(self.work_dir, 'evil.txt')))
+
+
+class TestInspectArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.work_dir)
+        self.source = os.path.join(self.work_dir, 'source')
+        members = {
+            'train.csv': 100,
+            'README': 10,
+            'images/train/a.png': 20,
+            'images/train/b.png': 30,
+            'images/test/c.JPG': 40,
+            '.cache/index': 5,
+            'images/.DS_Store': 1,
+        }
+        for name, size in members.items():
+            os.makedirs(os.path.dirname(os.path.join(self.source, name)), exist_ok=True)
+            with open(os.path.join(self.source, name), 'wb') as f:
+                f.write(b'x' * size)
+
+    def _assert_stats(self, stats):
+        self.assertEqual(stats['num_files'], 5)
+        self.assertEqual(stats['num_hidden'], 3)  # `.cache/`, `.cache/index` and `images/.DS_Store`
+        self.assertEqual(stats['total_size'], 200)
+        self.assertEqual(stats['directories'], {'images/': [3, 90], 'images/train/': [2, 50], 'images/test/': [1, 40]})
+        self.assertEqual(stats['num_dirs'], 3)
+        self.assertEqual(stats['extensions'], {'.csv': 1, '(no extension)': 1, '.png': 2, '.jpg': 1})
+        # the top-level files first
+        self.assertEqual(sorted(stats['files'][:2]), [('README', 10), ('train.csv', 100)])
+
+    def test_zip(self):
+        path = os.path.join(self.work_dir, 'data.zip')
+        with zipfile.ZipFile(path, 'w') as archive:
+            for root, dirs, files in os.walk(self.source):
+                for name in dirs + files:
+                    full_path = os.path.join(root, name)
+                    archive.write(full_path, os.path.relpath(full_path, self.source))
+        stats = inspect_archive(path)
+        self.assertEqual(stats['format'], 'zip')
+        self._assert_stats(stats)
+
+    def test_tar_of_current_directory(self):
+        # the members of `tar -C source -czf data.tar.gz .` are named `./...`, which are not hidden
+        path = os.path.join(self.work_dir, 'data.tar.gz')
+        with tarfile.open(path, 'w:gz') as archive:
+            archive.add(self.source, arcname='.')
+        stats = inspect_archive(path)
+        self.assertEqual(stats['format'], 'tar')
+        self._assert_stats(stats)
+
+    def test_show_hidden(self):
+        path = os.path.join(self.work_dir, 'data.tar')
+        with tarfile.open(path, 'w') as archive:
+            archive.add(self.source, arcname='.')
+        stats = inspect_archive(path, show_hidden=True)
+        self.assertEqual((stats['num_files'], stats['num_hidden'], stats['total_size']), (7, 0, 206))
+        self.assertEqual(stats['directories']['.cache/'], [1, 5])
+
+    def test_max_files(self):
+        path = os.path.join(self.work_dir, 'data.tar')
+        with tarfile.open(path, 'w') as archive:
+            archive.add(self.source, arcname='.')
+        self.assertEqual(len(inspect_archive(path, max_files=2)['files']), 2)
+
+    def test_not_an_archive(self):
+        path = os.path.join(self.work_dir, 'train.csv.gz')
+        with gzip.open(path, 'wb') as f:
+            f.write(b'id\n')
+        with self.assertRaises(ValueError):
+            inspect_archive(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
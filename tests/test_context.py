@@ -0,0 +1,89 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from mle.utils import context
+from mle.utils.context import ContextWindowManager
+
+
+def _turn(i):
+    return [
+        {"role": "user", "content": f"question {i}"},
+        {"role": "assistant", "content": None, "tool_calls": [{"id": f"call-{i}", "name": "read_file"}]},
+        {"role": "tool", "tool_call_id": f"call-{i}", "content": f"result {i}"},
+        {"role": "assistant", "content": f"answer {i}"},
+    ]
+
+
+class TestContextWindowManager(unittest.TestCase):
+
+    def setUp(self):
+        # count a character as a token, so the budgets do not depend on the tokenizer (or the network)
+        patcher = mock.patch.object(context, "count_text_tokens", lambda text, model_name=None: len(text))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.model = SimpleNamespace(model="gpt-4", model_type="OpenAI", query=mock.Mock(return_value="the summary"))
+        self.system = [
+            {"role": "system", "content": "You are a coder."},
+            {"role": "system", "content": "The project is a classifier."},
+        ]
+        self.turns = [_turn(i) for i in range(5)]
+        self.history = self.system + [msg for turn in self.turns for msg in turn]
+
+    def _manager(self, budget, **kwargs):
+        return ContextWindowManager(self.model, budget=budget, **kwargs)
+
+    def test_budget_is_capped_by_context_window(self):
+        manager = self._manager(budget=10 ** 9, output_reserve=1000)
+        self.assertEqual(manager.budget, 8192 - 1000)
+
+    def test_returns_history_as_is_when_it_fits(self):
+        manager = self._manager(budget=10 ** 4)
+        self.assertIs(manager.fit(self.history), self.history)
+
+    def test_pins_system_messages_and_last_turns(self):
+        manager = self._manager(budget=1, keep_turns=2)
+        trimmed = manager.fit(self.history)
+        # the pinned messages are kept even over the budget
+        self.assertEqual(trimmed, self.system + self.turns[3] + self.turns[4])
+
+    def test_keeps_newest_turns_in_order(self):
+        manager = self._manager(budget=10 ** 4, keep_turns=1)
+        manager.budget = manager.count_tokens(self.system + self.turns[2] + self.turns[3] + self.turns[4])
+        trimmed = manager.fit(self.history)
+        self.assertEqual(trimmed, self.system + self.turns[2] + self.turns[3] + self.turns[4])
+        self.assertLessEqual(manager.count_tokens(trimmed), manager.budget)
+
+    def test_never_separates_tool_call_from_result(self):
+        manager = self._manager(budget=10 ** 4, keep_turns=1)
+        # one message short of the two newest turns
+        manager.budget = manager.count_tokens(self.system + self.turns[3] + self.turns[4]) - 1
+        trimmed = manager.fit(self.history)
+        self.assertEqual(trimmed, self.system + self.turns[4])
+
+    def test_later_system_message_stays_in_its_turn(self):
+        note = {"role": "system", "content": "The tests failed."}
+        history = self.system + self.turns[0] + [note] + self.turns[1] + self.turns[2]
+        manager = self._manager(budget=1, keep_turns=2)
+        trimmed = manager.fit(history)
+        self.assertEqual(trimmed, self.system + self.turns[1] + self.turns[2])
+
+    def test_summarizes_dropped_turns(self):
+        manager = self._manager(budget=1, keep_turns=2, summarize=True)
+        trimmed = manager.fit(self.history)
+        self.assertEqual(self.model.query.call_count, 1)
+        conversation = self.model.query.call_args[0][0][1]["content"]
+        self.assertIn("question 0", conversation)
+        self.assertNotIn("question 4", conversation)
+        self.assertEqual(trimmed[:2], self.system)
+        self.assertEqual(trimmed[2], {"role": "system", "content": "Summary of the earlier conversation:\nthe summary"})
+        self.assertEqual(trimmed[3:], self.turns[3] + self.turns[4])
+
+        # the summary in the trimmed history is replaced, not summarized again as a turn
+        trimmed = manager.fit(trimmed + _turn(5))
+        self.assertEqual(self.model.query.call_count, 2)
+        self.assertEqual(trimmed, self.system + [manager.summary_message] + self.turns[4] + _turn(5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+
+from mle.function.execution import run_command, execute_command, command_environment
+
+
+@unittest.skipUnless(os.name == 'posix', "the commands are POSIX shell commands")
+class TestRunCommand(unittest.TestCase):
+
+    def test_exit_code_and_output(self):
+        result = run_command("echo hello; exit 3", verbose=False)
+        self.assertEqual(result["exit_code"], 3)
+        self.assertEqual(result["head"] + result["tail"], ["hello"])
+        self.assertEqual(result["omitted_lines"], 0)
+        self.assertIsNone(result["timed_out"])
+
+    def test_truncates_to_head_and_tail(self):
+        result = run_command("seq 1 100", max_lines=10, head_lines=3, verbose=False)
+        self.assertEqual(result["head"], ["1", "2", "3"])
+        self.assertEqual(result["tail"], [str(i) for i in range(91, 101)])
+        self.assertEqual(result["omitted_lines"], 87)
+
+    def test_default_head_lines(self):
+        result = run_command("seq 1 100", max_lines=9, verbose=False)
+        self.assertEqual(result["head"], ["1", "2", "3"])
+        self.assertEqual(len(result["tail"]), 9)
+
+    def test_wall_clock_timeout(self):
+        start = time.monotonic()
+        result = run_command("echo start; sleep 30", timeout=1, verbose=False)
+        self.assertLess(time.monotonic() - start, 15)
+        self.assertIn("wall-clock timeout", result["timed_out"])
+        self.assertEqual(result["head"] + result["tail"], ["start"])
+        self.assertNotEqual(result["exit_code"], 0)
+
+    def test_idle_timeout(self):
+        start = time.monotonic()
+        result = run_command("echo start; sleep 30", idle_timeout=1, verbose=False)
+        self.assertLess(time.monotonic() - start, 15)
+        self.assertIn("no output", result["timed_out"])
+
+    def test_idle_timeout_reset_by_output(self):
+        result = run_command("for i in 1 2 3; do echo $i; sleep 0.5; done", idle_timeout=2, verbose=False)
+        self.assertIsNone(result["timed_out"])
+        self.assertEqual(result["exit_code"], 0)
+
+    def test_cwd_and_env(self):
+        work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, work_dir)
+        result = run_command("pwd; echo $MLE_TEST_VAR", cwd=work_dir, env={"MLE_TEST_VAR": "42"}, verbose=False)
+        self.assertEqual(result["head"] + result["tail"], [os.path.realpath(work_dir), "42"])
+
+    def test_execute_command_uses_command_environment(self):
+        with command_environment({"MLE_TEST_VAR": "from-context"}):
+            output = execute_command("echo $MLE_TEST_VAR")
+        self.assertIn("from-context", output)
+        self.assertNotIn("from-context", execute_command("echo $MLE_TEST_VAR"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from mle.function.files import grep_file, tail_file
+
+
+class TestLargeFileTools(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.work_dir)
+
+    def _write(self, name, content):
+        path = os.path.join(self.work_dir, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_tail_file(self):
+        path = self._write('log.txt', ''.join(f"line {i}\n" for i in range(1, 1001)))
+        self.assertEqual(tail_file(path, lines=3), "line 998\nline 999\nline 1000\n")
+
+    def test_tail_file_without_trailing_newline(self):
+        path = self._write('log.txt', "a\nb\nc")
+        self.assertEqual(tail_file(path, lines=2), "b\nc")
+
+    def test_tail_file_shorter_than_requested(self):
+        path = self._write('log.txt', "a\nb\n")
+        self.assertEqual(tail_file(path, lines=10), "a\nb\n")
+
+    def test_tail_file_empty_and_missing(self):
+        path = self._write('empty.txt', "")
+        self.assertIn("empty", tail_file(path))
+        self.assertIn("File not found", tail_file(os.path.join(self.work_dir, 'missing.txt')))
+
+    def test_grep_file_marks_matches_with_context(self):
+        path = self._write('log.txt', ''.join(f"line {i}\n" for i in range(1, 21)))
+        output = grep_file(path, r"line 10$", context=1)
+        self.assertEqual(output.split("\n"), [" 9: line 9", ">10: line 10", " 11: line 11"])
+
+    def test_grep_file_anchors_match_per_line(self):
+        path = self._write('log.txt', "epoch 1 loss 0.5\nloss 0.4\nval loss 0.3\n")
+        self.assertEqual(grep_file(path, r"^loss", context=0), ">2: loss 0.4")
+
+    def test_grep_file_merges_overlapping_context(self):
+        path = self._write('log.txt', ''.join(f"line {i}\n" for i in range(1, 21)))
+        output = grep_file(path, r"line (5|7|15)$", context=1)
+        self.assertEqual(output.split("\n"), [
+            " 4: line 4", ">5: line 5", " 6: line 6", ">7: line 7", " 8: line 8",
+            "--",
+            " 14: line 14", ">15: line 15", " 16: line 16",
+        ])
+
+    def test_grep_file_max_matches_and_ignore_case(self):
+        path = self._write('log.txt', "Error a\nerror b\nERROR c\n")
+        output = grep_file(path, "error", context=0, max_matches=2, ignore_case=True)
+        self.assertEqual(output.split("\n"), [">1: Error a", ">2: error b", "... (stopped after 2 matches)"])
+
+    def test_grep_file_no_match_and_invalid_pattern(self):
+        path = self._write('log.txt', "a\nb\n")
+        self.assertIn("No matches found", grep_file(path, "c"))
+        self.assertIn("Invalid regular expression", grep_file(path, "("))
+
+
+if __name__ == '__main__':
+    unittest.main()
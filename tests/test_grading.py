@@ -0,0 +1,109 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from exp import grading
+from exp.grading import grade_submissions
+
+
+def _fake_grade(submission_path, competition_id, data_dir):
+    with open(submission_path) as f:
+        score = len(f.read())
+    report = {"competition_id": competition_id, "submission_path": submission_path, "score": score}
+    return {"report": report, "grade_seconds": 0.5}
+
+
+class TestGradeSubmissions(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.work_dir)
+        self.cache_dir = os.path.join(self.work_dir, 'cache')
+        # the grading in the worker processes needs MLE-bench, the cache logic does not
+        patcher = mock.patch.object(grading, "_grade_one", side_effect=_fake_grade)
+        self.grade_one = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _submission(self, name, content):
+        path = os.path.join(self.work_dir, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def _grade(self, submissions, **kwargs):
+        return grade_submissions(submissions, workers=1, cache_dir=self.cache_dir, **kwargs)
+
+    def test_reuses_cached_reports(self):
+        submissions = [
+            {"submission_path": self._submission('a.csv', 'id,y\n1,0\n'), "competition_id": "comp-a"},
+            {"submission_path": self._submission('b.csv', 'id,y\n1,1\n2,0\n'), "competition_id": "comp-b"},
+        ]
+        first = self._grade(submissions)
+        self.assertEqual(self.grade_one.call_count, 2)
+        self.assertEqual([report["cached"] for report in first], [False, False])
+
+        second = self._grade(submissions)
+        self.assertEqual(self.grade_one.call_count, 2)
+        self.assertEqual([report["cached"] for report in second], [True, True])
+        for old, new in zip(first, second):
+            self.assertEqual({**old, "cached": True}, new)
+
+    def test_regrades_changed_submissions_only(self):
+        submissions = [
+            {"submission_path": self._submission('a.csv', 'id,y\n1,0\n'), "competition_id": "comp-a"},
+            {"submission_path": self._submission('b.csv', 'id,y\n1,1\n'), "competition_id": "comp-b"},
+        ]
+        self._grade(submissions)
+        self._submission('b.csv', 'id,y\n1,0\n2,1\n')
+        reports = self._grade(submissions)
+        self.assertEqual(self.grade_one.call_count, 3)
+        self.assertEqual([report["cached"] for report in reports], [True, False])
+        self.assertEqual(reports[1]["score"], len('id,y\n1,0\n2,1\n'))
+
+    def test_key_is_content_and_competition(self):
+        path = self._submission('a.csv', 'id,y\n1,0\n')
+        self._grade([{"submission_path": path, "competition_id": "comp-a"}])
+
+        # the same content under another path is a hit, reported under its own path
+        copy = self._submission('copy.csv', 'id,y\n1,0\n')
+        report, = self._grade([{"submission_path": copy, "competition_id": "comp-a"}])
+        self.assertTrue(report["cached"])
+        self.assertEqual(report["submission_path"], copy)
+
+        # the same content for another competition is a miss
+        report, = self._grade([{"submission_path": path, "competition_id": "comp-b"}])
+        self.assertFalse(report["cached"])
+        self.assertEqual(self.grade_one.call_count, 2)
+
+    def test_cache_version_invalidates_entries(self):
+        submissions = [{"submission_path": self._submission('a.csv', 'id,y\n1,0\n'), "competition_id": "comp-a"}]
+        self._grade(submissions)
+        with mock.patch.object(grading, "GRADE_CACHE_VERSION", grading.GRADE_CACHE_VERSION + 1):
+            report, = self._grade(submissions)
+        self.assertFalse(report["cached"])
+
+    def test_use_cache_false_regrades_and_refreshes(self):
+        submissions = [{"submission_path": self._submission('a.csv', 'id,y\n1,0\n'), "competition_id": "comp-a"}]
+        self._grade(submissions)
+        report, = self._grade(submissions, use_cache=False)
+        self.assertFalse(report["cached"])
+        self.assertEqual(self.grade_one.call_count, 2)
+        report, = self._grade(submissions)
+        self.assertTrue(report["cached"])
+
+    def test_missing_submission_is_never_cached(self):
+        submissions = [{"submission_path": os.path.join(self.work_dir, 'missing.csv'), "competition_id": "comp-a"}]
+        self.grade_one.side_effect = lambda path, competition_id, data_dir: {
+            "report": {"competition_id": competition_id, "submission_exists": False}, "grade_seconds": 0.0,
+        }
+        self._grade(submissions)
+        report, = self._grade(submissions)
+        self.assertFalse(report["cached"])
+        self.assertEqual(self.grade_one.call_count, 2)
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
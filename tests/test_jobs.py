@@ -0,0 +1,139 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from mle.server.jobs import JobStore, JobQueue, QueueFullError, request_key
+
+
+class TestJobStore(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.work_dir)
+        self.store = JobStore(os.path.join(self.work_dir, 'jobs.db'))
+
+    def test_create_deduplicates_in_flight_jobs(self):
+        key = request_key('report', {'repo': 'a/b'})
+        job, created = self.store.create('report', key, {'repo': 'a/b'})
+        self.assertTrue(created)
+        self.assertEqual((job['status'], job['request']), ('queued', {'repo': 'a/b'}))
+
+        same, created = self.store.create('report', key, {'repo': 'a/b'})
+        self.assertFalse(created)
+        self.assertEqual(same['id'], job['id'])
+
+        # a finished job is not joined
+        self.store.update(job['id'], status='finished', result={'ok': True})
+        self.assertEqual(self.store.get(job['id'])['result'], {'ok': True})
+        new, created = self.store.create('report', key, {'repo': 'a/b'})
+        self.assertTrue(created)
+        self.assertNotEqual(new['id'], job['id'])
+        self.assertEqual(self.store.count_by_status(), {'finished': 1, 'queued': 1})
+
+    def test_request_key_ignores_field_order(self):
+        self.assertEqual(request_key('report', {'a': 1, 'b': 2}), request_key('report', {'b': 2, 'a': 1}))
+        self.assertNotEqual(request_key('report', {'a': 1}), request_key('chat', {'a': 1}))
+
+    def test_recover_interrupts_jobs_of_dead_processes(self):
+        job, _ = self.store.create('report', 'key', {})
+        self.assertEqual(self.store.recover(), 1)
+        self.assertEqual(self.store.get(job['id'])['status'], 'interrupted')
+        self.assertEqual(self.store.recover(), 0)
+
+
+class TestJobQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.work_dir)
+        self.queue = JobQueue(JobStore(os.path.join(self.work_dir, 'jobs.db')), max_workers=1, max_queued=1)
+        self.release = threading.Event()
+        self.addCleanup(self.queue.shutdown)
+        self.addCleanup(self.release.set)
+
+    def _blocked(self, value):
+        self.release.wait(30)
+        return value
+
+    def test_runs_jobs(self):
+        job, deduplicated = self.queue.submit('report', {'repo': 'a/b'}, lambda x: x * 2, 21)
+        self.assertFalse(deduplicated)
+        job = self.queue.wait(job['id'], timeout=30)
+        self.assertEqual((job['status'], job['result']), ('finished', 42))
+        self.assertEqual(self.queue.pending, 0)
+
+    def test_records_failures(self):
+        def fail():
+            raise RuntimeError("boom")
+
+        job, _ = self.queue.submit('report', {}, fail)
+        job = self.queue.wait(job['id'], timeout=30)
+        self.assertEqual((job['status'], job['error']), ('failed', 'boom'))
+
+    def test_deduplicates_identical_requests(self):
+        job, deduplicated = self.queue.submit('report', {'repo': 'a/b'}, self._blocked, 1)
+        self.assertFalse(deduplicated)
+        same, deduplicated = self.queue.submit('report', {'repo': 'a/b'}, self._blocked, 1)
+        self.assertTrue(deduplicated)
+        self.assertEqual(same['id'], job['id'])
+        self.assertEqual(self.queue.pending, 1)
+
+        # the secrets take part in the key, but are never stored
+        other, deduplicated = self.queue.submit('report', {'repo': 'a/b'}, self._blocked, 2, secrets={'token': 'x'})
+        self.assertFalse(deduplicated)
+        self.assertNotEqual(other['id'], job['id'])
+        self.assertEqual(other['request'], {'repo': 'a/b'})
+
+        self.release.set()
+        self.assertEqual(self.queue.wait(job['id'], timeout=30)['result'], 1)
+        self.assertEqual(self.queue.wait(other['id'], timeout=30)['result'], 2)
+
+    def test_rejects_jobs_when_full(self):
+        running, _ = self.queue.submit('report', {'n': 1}, self._blocked, 1)
+        queued, _ = self.queue.submit('report', {'n': 2}, self._blocked, 2)
+        self.assertTrue(self.queue.full)
+        with self.assertRaises(QueueFullError):
+            self.queue.submit('report', {'n': 3}, self._blocked, 3)
+        with self.assertRaises(QueueFullError):
+            with self.queue.slot():
+                pass
+        # an identical in-flight request is rejected too, the depth is checked first
+        with self.assertRaises(QueueFullError):
+            self.queue.submit('report', {'n': 1}, self._blocked, 1)
+
+        self.release.set()
+        self.queue.wait(running['id'], timeout=30)
+        self.queue.wait(queued['id'], timeout=30)
+        self.assertFalse(self.queue.full)
+        job, _ = self.queue.submit('report', {'n': 3}, lambda: 3)
+        self.assertEqual(self.queue.wait(job['id'], timeout=30)['result'], 3)
+
+    def test_slot_counts_in_queue_depth(self):
+        with self.queue.slot():
+            self.assertEqual(self.queue.pending, 1)
+            job, _ = self.queue.submit('report', {}, lambda: 1)
+            self.assertTrue(self.queue.full)
+            with self.assertRaises(QueueFullError):
+                self.queue.submit('report', {'n': 2}, lambda: 2)
+            # the job waits for the worker slot held by the stream
+            self.assertEqual(self.queue.wait(job['id'], timeout=0.5)['status'], 'queued')
+        self.assertEqual(self.queue.wait(job['id'], timeout=30)['status'], 'finished')
+
+    def test_shutdown_cancels_queued_jobs(self):
+        running, _ = self.queue.submit('report', {'n': 1}, self._blocked, 1)
+        queued, _ = self.queue.submit('report', {'n': 2}, self._blocked, 2)
+        while self.queue.store.get(running['id'])['status'] != 'running':
+            self.queue.wait(running['id'], timeout=0.05)
+        # the running job finishes after the queued job is cancelled
+        timer = threading.Timer(0.5, self.release.set)
+        timer.start()
+        self.queue.shutdown(wait=True)
+        timer.join()
+        self.assertEqual(self.queue.store.get(running['id'])['status'], 'finished')
+        self.assertEqual(self.queue.store.get(queued['id'])['status'], 'cancelled')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import time
+import unittest
+from unittest import mock
+
+from mle import model as model_module
+from mle.model import ObservableModel, TokenBudget
+
+
+class FakeStreamModel:
+
+    def __init__(self, chunks, delay=0.0):
+        self.chunks = chunks
+        self.delay = delay
+        self.closed = False
+        self.yielded = 0
+
+    def stream(self, chat_history, **kwargs):
+        try:
+            time.sleep(self.delay)
+            for chunk in self.chunks:
+                self.yielded += 1
+                yield chunk
+        finally:
+            self.closed = True
+
+
+class TestObservableModelStream(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(model_module, "token_budget", TokenBudget())
+        self.budget = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_yields_backend_chunks_as_they_arrive(self):
+        backend = FakeStreamModel(["Hel", "lo", "", "!"])
+        stream = ObservableModel(backend).stream([{"role": "user", "content": "hi"}])
+        self.assertEqual(next(stream), "Hel")
+        # the backend has not been drained ahead of the consumer
+        self.assertEqual(backend.yielded, 1)
+        self.assertEqual(list(stream), ["lo", "", "!"])
+
+    def test_records_stream_metrics(self):
+        model = ObservableModel(FakeStreamModel(["a", "b", "", "c"], delay=0.05))
+        self.assertEqual("".join(model.stream([])), "abc")
+        metrics = model.stream_metrics
+        self.assertGreaterEqual(metrics["time_to_first_token"], 0.05)
+        self.assertGreaterEqual(metrics["total_time"], metrics["time_to_first_token"])
+        # the empty chunks are not counted
+        self.assertEqual(metrics["output_tokens"], 3)
+        # the backend does not report the usage, the chunks are charged instead
+        self.assertEqual(self.budget.used, 3)
+
+    def test_closes_backend_when_consumer_stops(self):
+        backend = FakeStreamModel(["a", "b", "c"])
+        model = ObservableModel(backend)
+        stream = model.stream([])
+        next(stream)
+        stream.close()
+        self.assertTrue(backend.closed)
+        self.assertEqual(backend.yielded, 1)
+        self.assertEqual(model.stream_metrics["output_tokens"], 1)
+
+    def test_empty_stream(self):
+        model = ObservableModel(FakeStreamModel([]))
+        self.assertEqual(list(model.stream([])), [])
+        self.assertIsNone(model.stream_metrics["time_to_first_token"])
+        self.assertIsNone(model.stream_metrics["tokens_per_second"])
+
+
+if __name__ == '__main__':
+    unittest.main()